@@ -0,0 +1 @@
+"""Local micro-benchmarks for hot backend code paths (not run by pytest)."""
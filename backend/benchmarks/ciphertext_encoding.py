@@ -0,0 +1,55 @@
+"""Benchmark: cost of storing encrypted_text as DynamoDB binary.
+
+Usage (from backend/):
+    python -m benchmarks.ciphertext_encoding
+    python -m benchmarks.ciphertext_encoding --rounds 2000 --sizes 1024 10000 100000
+
+For each base64 payload size it reports the encode (base64 -> bytes, with the
+canonical round-trip check) and decode (bytes -> base64) latency, and the
+attribute size saved per item.
+"""
+
+import argparse
+import base64
+import os
+import statistics
+import time
+
+# shared.dynamo creates a boto3 resource at import; no AWS calls are made here
+os.environ.setdefault("AWS_DEFAULT_REGION", "eu-central-1")
+
+from shared.dynamo import decode_ciphertext, encode_ciphertext  # noqa: E402
+
+DEFAULT_SIZES = (1024, 10000, 100000)  # Base64 characters (inline / PIN / vault limits)
+
+
+def _time_us(func, arg, rounds: int) -> float:
+    """Median wall time of func(arg) in microseconds."""
+    samples = []
+    for _ in range(rounds):
+        start = time.perf_counter()
+        func(arg)
+        samples.append((time.perf_counter() - start) * 1_000_000)
+    return statistics.median(samples)
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--rounds", type=int, default=500)
+    parser.add_argument("--sizes", type=int, nargs="+", default=DEFAULT_SIZES)
+    args = parser.parse_args()
+
+    print(
+        f"{'base64 chars':>12} {'binary bytes':>12} {'saved':>7} {'encode us':>10} {'decode us':>10}"
+    )
+    for size in args.sizes:
+        text = base64.b64encode(os.urandom(size * 3 // 4)).decode("ascii")
+        raw = encode_ciphertext(text)
+        saved = 1 - len(raw) / len(text)
+        encode_us = _time_us(encode_ciphertext, text, args.rounds)
+        decode_us = _time_us(decode_ciphertext, raw, args.rounds)
+        print(f"{len(text):>12} {len(raw):>12} {saved:>7.1%} {encode_us:>10.1f} {decode_us:>10.1f}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,57 @@
+"""Benchmark: per-hash latency of the PIN KDF schemes.
+
+Usage (from backend/):
+    python -m benchmarks.pin_kdf
+    python -m benchmarks.pin_kdf --rounds 50 "pbkdf2-sha256$200000" "scrypt$32768$8$1"
+
+Run it on hardware comparable to the Lambda memory size in use (CPU share
+scales with memory) and pick the most expensive scheme that still fits the
+pin_upload_init / pin_verify latency budget. Set it with PIN_HASH_SCHEME.
+"""
+
+import argparse
+import statistics
+import time
+
+from shared.pin_utils import PIN_HASH_SCHEME, generate_salt, hash_pin
+
+DEFAULT_SCHEMES = (
+    "pbkdf2-sha256$100000",
+    "pbkdf2-sha256$200000",
+    "pbkdf2-sha256$600000",
+    "scrypt$16384$8$1",
+    "scrypt$32768$8$1",
+)
+
+
+def bench_scheme(scheme: str, rounds: int) -> list[float]:
+    """Hash a PIN `rounds` times with `scheme`. Returns latencies in ms."""
+    salt = generate_salt()
+    hash_pin("7a2B", salt, scheme)  # Warm up
+
+    latencies = []
+    for _ in range(rounds):
+        start = time.perf_counter()
+        hash_pin("7a2B", salt, scheme)
+        latencies.append((time.perf_counter() - start) * 1000)
+    return latencies
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("schemes", nargs="*", default=DEFAULT_SCHEMES)
+    parser.add_argument("--rounds", type=int, default=20)
+    args = parser.parse_args()
+
+    print(f"Current PIN_HASH_SCHEME: {PIN_HASH_SCHEME}")
+    print(f"{'scheme':<26} {'p50 ms':>9} {'p95 ms':>9} {'max ms':>9}")
+    for scheme in args.schemes:
+        latencies = sorted(bench_scheme(scheme, args.rounds))
+        p95 = latencies[min(len(latencies) - 1, int(len(latencies) * 0.95))]
+        print(
+            f"{scheme:<26} {statistics.median(latencies):>9.1f} {p95:>9.1f} {latencies[-1]:>9.1f}"
+        )
+
+
+if __name__ == "__main__":
+    main()
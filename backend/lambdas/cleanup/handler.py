@@ -6,9 +6,20 @@ import os
 import time
 from typing import Any
 
-from shared.dynamo import delete_file_record, get_table
+from shared.constants import S3_DELETE_BATCH_SIZE
+from shared.dynamo import (
+    batch_delete_file_records,
+    delete_scan_checkpoint,
+    get_scan_checkpoint,
+    is_stats_key,
+    parallel_scan,
+    payload_key,
+    query_due_items,
+    save_scan_checkpoint,
+    scan_segments_for_table,
+)
 from shared.response import error_response, success_response
-from shared.s3 import delete_file
+from shared.s3 import abort_multipart_upload, delete_files
 
 logger = logging.getLogger(__name__)
 logger.setLevel(logging.INFO)
@@ -16,6 +27,86 @@ logger.setLevel(logging.INFO)
 # Environment variables
 BUCKET_NAME = os.environ.get("BUCKET_NAME")
 TABLE_NAME = os.environ.get("TABLE_NAME")
+EXPIRY_INDEX_NAME = os.environ.get("EXPIRY_INDEX_NAME")
+# Parallel scan segments; derived from the table size when unset
+SCAN_SEGMENTS = os.environ.get("CLEANUP_SCAN_SEGMENTS")
+# Stop this long before the Lambda timeout to flush and checkpoint
+DEADLINE_MARGIN_MS = int(os.environ.get("CLEANUP_DEADLINE_MARGIN_MS", "30000"))
+
+CHECKPOINT_NAME = "cleanup"
+
+# Only the attributes cleanup needs (skips inline encrypted_text and friends)
+CLEANUP_PROJECTION = (
+    "file_id, expires_at, downloaded, content_type, s3_key, payload_split, upload_id"
+)
+
+
+def _flush(batch: list[dict[str, Any]]) -> tuple[int, int]:
+    """
+    Delete a batch of due items.
+
+    Unfinished multipart uploads are aborted first, then S3 objects are
+    removed with DeleteObjects. Records are removed last with BatchWriteItem,
+    skipping any whose S3 object could not be deleted so the next run retries
+    them instead of orphaning the object.
+
+    Args:
+        batch: Due items (file_id, content_type, s3_key, payload_split, upload_id)
+
+    Returns:
+        Tuple of (deleted count, error count)
+    """
+    error_count = 0
+    file_ids: dict[str, None] = {}
+    s3_keys: dict[str, str] = {}
+
+    for item in batch:
+        file_id = item["file_id"]
+        # BatchWriteItem rejects duplicate keys within one request
+        if file_id in file_ids:
+            continue
+        # Delete from S3 if it's a file, or a text offloaded to S3
+        if item.get("content_type", "file") == "file" or item.get("s3_key"):
+            s3_key = item.get("s3_key")
+            if not s3_key:
+                error_count += 1
+                logger.error(f"Error cleaning up {file_id}: missing s3_key")
+                continue
+            # Unfinished multipart upload: free its parts (there is no object yet)
+            if item.get("upload_id"):
+                try:
+                    abort_multipart_upload(BUCKET_NAME, s3_key, item["upload_id"])
+                except Exception as e:
+                    error_count += 1
+                    logger.error(f"Error aborting upload for {file_id}: {e}")
+                    continue
+            s3_keys[s3_key] = file_id
+        file_ids[file_id] = None
+        # Split text payloads go with their share (downloaded shares are not expired yet)
+        if item.get("payload_split"):
+            file_ids[payload_key(file_id)] = None
+
+    failed_keys = delete_files(BUCKET_NAME, list(s3_keys)) if s3_keys else {}
+    for s3_key, message in failed_keys.items():
+        error_count += 1
+        logger.error(f"Error cleaning up {s3_keys[s3_key]}: {message}")
+    skipped = {s3_keys[s3_key] for s3_key in failed_keys}
+
+    # Delete from DynamoDB (both files and text)
+    file_ids = [file_id for file_id in file_ids if file_id not in skipped]
+    failed_ids = batch_delete_file_records(TABLE_NAME, file_ids) if file_ids else []
+    for file_id in failed_ids:
+        error_count += 1
+        logger.error(f"Error cleaning up {file_id}: record delete failed")
+
+    return len(file_ids) - len(failed_ids), error_count
+
+
+def _time_is_up(context: Any) -> bool:
+    """Check whether the invocation is close to its timeout."""
+    if context is None or not hasattr(context, "get_remaining_time_in_millis"):
+        return False
+    return context.get_remaining_time_in_millis() < DEADLINE_MARGIN_MS
 
 
 def handler(event: dict[str, Any], context: Any) -> dict[str, Any]:
@@ -25,6 +116,13 @@ def handler(event: dict[str, Any], context: Any) -> dict[str, Any]:
     For files: Deletes from S3 and DynamoDB
     For text: Deletes from DynamoDB only
 
+    Deletes are batched: S3 DeleteObjects (up to 1000 keys per call) and
+    DynamoDB BatchWriteItem (25 records per call).
+
+    The run stops cleanly DEADLINE_MARGIN_MS before the Lambda timeout. A full
+    scan that is cut short saves its per-segment cursors to a checkpoint, and
+    the next invocation resumes from it instead of starting over.
+
     Runs on schedule (e.g., every hour via EventBridge).
     """
     try:
@@ -32,62 +130,118 @@ def handler(event: dict[str, Any], context: Any) -> dict[str, Any]:
         error_count = 0
         current_time = int(time.time())
 
-        # Scan for expired files with pagination
-        # Note: In production, consider using a GSI on expires_at for efficiency
-        table = get_table(TABLE_NAME)
+        # Query only the due expiry buckets when the index is available.
+        # A full scan is kept for the daily sweep ({"mode": "scan"}), which also
+        # catches records written before the index existed. An unfinished scan
+        # always takes priority so a large backlog keeps draining.
+        stats: dict[str, float] = {}
+        out_of_time = False
 
-        # Paginate through all items (DynamoDB scan returns max 1MB per request)
-        last_evaluated_key = None
+        def time_is_up() -> bool:
+            # Checked per item and, inside the scan/query, per page (filtered-out
+            # pages yield nothing but still consume time)
+            nonlocal out_of_time
+            out_of_time = out_of_time or _time_is_up(context)
+            return out_of_time
 
-        while True:
-            # Scan with pagination support
-            if last_evaluated_key:
-                response = table.scan(ExclusiveStartKey=last_evaluated_key)
+        checkpoint = get_scan_checkpoint(TABLE_NAME, CHECKPOINT_NAME)
+        mode = (event or {}).get("mode")
+        if EXPIRY_INDEX_NAME and mode != "scan" and checkpoint is None:
+            mode = "index"
+            items = query_due_items(
+                TABLE_NAME,
+                EXPIRY_INDEX_NAME,
+                current_time,
+                projection=CLEANUP_PROJECTION,
+                stats=stats,
+                should_stop=time_is_up,
+            )
+        else:
+            mode = "scan"
+            if checkpoint:
+                segments = checkpoint["total_segments"]
+                cursors = checkpoint["cursors"]
+                logger.info(f"Resuming cleanup scan from checkpoint ({segments} segments)")
             else:
-                response = table.scan()
+                segments = (
+                    int(SCAN_SEGMENTS) if SCAN_SEGMENTS else scan_segments_for_table(TABLE_NAME)
+                )
+                cursors = {}
+                logger.info(f"Scanning table with {segments} parallel segment(s)")
+            # Due-item test and STATS exclusion run server-side
+            items = parallel_scan(
+                TABLE_NAME,
+                segments,
+                stats=stats,
+                cursors=cursors,
+                should_stop=time_is_up,
+                ProjectionExpression=CLEANUP_PROJECTION,
+                FilterExpression=(
+                    "(expires_at <= :now OR downloaded = :true) "
+                    "AND file_id <> :stats AND NOT begins_with(file_id, :stats_shard)"
+                ),
+                ExpressionAttributeValues={
+                    ":now": current_time,
+                    ":true": True,
+                    ":stats": "STATS",
+                    ":stats_shard": "STATS#",
+                },
+                ReturnConsumedCapacity="TOTAL",
+            )
 
-            for item in response.get("Items", []):
-                file_id = item["file_id"]
+        # Collect due items and delete them in batches
+        batch: list[dict[str, Any]] = []
 
-                # Skip special records (statistics, etc.)
-                if file_id == "STATS":
-                    continue
+        for item in items:
+            file_id = item["file_id"]
 
-                content_type = item.get("content_type", "file")
-                expires_at = item.get("expires_at", 0)
-                downloaded = item.get("downloaded", False)
+            # Skip special records (statistics, etc.)
+            if is_stats_key(file_id):
+                continue
 
-                # Delete if expired or already downloaded
-                should_delete = expires_at <= current_time or downloaded
+            expires_at = item.get("expires_at", 0)
+            downloaded = item.get("downloaded", False)
 
-                if should_delete:
-                    try:
-                        # Delete from S3 only if it's a file (not text)
-                        if content_type == "file":
-                            s3_key = item["s3_key"]
-                            delete_file(BUCKET_NAME, s3_key)
+            # Delete if expired or already downloaded
+            should_delete = expires_at <= current_time or downloaded
 
-                        # Delete from DynamoDB (both files and text)
-                        delete_file_record(TABLE_NAME, file_id)
+            if should_delete:
+                batch.append(item)
+                if len(batch) >= S3_DELETE_BATCH_SIZE:
+                    deleted, errors = _flush(batch)
+                    deleted_count += deleted
+                    error_count += errors
+                    batch = []
 
-                        deleted_count += 1
-                        logger.info(f"Cleaned up {content_type}: {file_id}")
+            if time_is_up():
+                break
 
-                    except Exception as e:
-                        error_count += 1
-                        logger.error(f"Error cleaning up {file_id}: {e}")
+        # Stop the scan workers before reading the final cursors
+        items.close()
+        completed = not out_of_time
 
-            # Check if there are more items to scan
-            last_evaluated_key = response.get("LastEvaluatedKey")
-            if not last_evaluated_key:
-                break  # No more items to scan
+        if batch:
+            deleted, errors = _flush(batch)
+            deleted_count += deleted
+            error_count += errors
+
+        # Every yielded item has been handled, so the cursors are safe to save
+        if mode == "scan":
+            if completed:
+                if checkpoint:
+                    delete_scan_checkpoint(TABLE_NAME, CHECKPOINT_NAME)
+            else:
+                save_scan_checkpoint(TABLE_NAME, CHECKPOINT_NAME, segments, cursors)
 
         logger.info(
             json.dumps(
                 {
-                    "action": "cleanup_completed",
+                    "action": "cleanup_completed" if completed else "cleanup_paused",
+                    "mode": mode,
                     "deleted": deleted_count,
                     "errors": error_count,
+                    "scanned": int(stats.get("scanned", 0)),
+                    "consumed_rcu": stats.get("consumed_rcu", 0),
                 }
             )
         )
@@ -96,6 +250,8 @@ def handler(event: dict[str, Any], context: Any) -> dict[str, Any]:
             {
                 "deleted": deleted_count,
                 "errors": error_count,
+                "completed": completed,
+                "consumed_rcu": stats.get("consumed_rcu", 0),
             }
         )
 
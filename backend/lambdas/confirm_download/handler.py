@@ -4,6 +4,7 @@ import logging
 import os
 from typing import Any
 
+from shared.deferred import TASK_DELETE_CONSUMED, defer
 from shared.dynamo import confirm_download
 from shared.exceptions import (
     FileAlreadyDownloadedError,
@@ -31,7 +32,9 @@ def handler(event: dict[str, Any], context: Any) -> dict[str, Any]:
     This endpoint should be called by the frontend after successfully
     downloading and decrypting the content.
 
-    This marks the file as truly downloaded and increments statistics.
+    This marks the file as truly downloaded. Statistics and dropping the
+    consumed payload are deferred; the record stays as a tombstone so repeat
+    downloads get 410 until the scheduled cleanup removes it.
     """
     try:
         # Extract file ID from path
@@ -41,7 +44,15 @@ def handler(event: dict[str, Any], context: Any) -> dict[str, Any]:
         validate_file_id(file_id)
 
         # Confirm download (mark as downloaded)
-        confirm_download(TABLE_NAME, file_id)
+        record = confirm_download(TABLE_NAME, file_id)
+
+        # The stream deletes the S3 object; drop the payload, keep a tombstone record
+        defer(
+            TASK_DELETE_CONSUMED,
+            table_name=TABLE_NAME,
+            file_id=file_id,
+            payload_split=bool(record.get("payload_split")),
+        )
 
         logger.info(f"Download confirmed: file_id={file_id}")
 
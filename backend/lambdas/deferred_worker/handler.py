@@ -0,0 +1,46 @@
+"""Lambda function: Run deferred side effects from the SQS queue."""
+
+import json
+import logging
+from typing import Any
+
+from shared.deferred import run_tasks
+
+logger = logging.getLogger(__name__)
+logger.setLevel(logging.INFO)
+
+
+def handler(event: dict[str, Any], context: Any) -> dict[str, Any]:
+    """
+    Run a batch of deferred tasks (statistics, eager cleanup, abuse auto-delete).
+
+    Consumes SQS batches and hands all tasks to run_tasks at once, so download
+    counts become one statistics increment and record deletions share
+    BatchWriteItem calls.
+
+    Failed tasks are reported through batchItemFailures so only their
+    messages are retried; malformed messages are dropped.
+    """
+    records = event.get("Records", [])
+    tasks: dict[str, dict[str, Any]] = {}
+
+    for record in records:
+        try:
+            tasks[record["messageId"]] = json.loads(record["body"])
+        except (KeyError, json.JSONDecodeError) as e:
+            logger.error(f"Dropping malformed deferred task {record.get('messageId')}: {e}")
+
+    failed = run_tasks(tasks)
+
+    logger.info(
+        json.dumps(
+            {
+                "action": "deferred_tasks",
+                "records": len(records),
+                "succeeded": len(tasks) - len(failed),
+                "errors": len(failed),
+            }
+        )
+    )
+
+    return {"batchItemFailures": [{"itemIdentifier": message_id} for message_id in failed]}
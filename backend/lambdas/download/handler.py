@@ -4,8 +4,12 @@ import logging
 import os
 from typing import Any
 
-from shared.constants import ACCESS_MODE_MULTI, DOWNLOAD_URL_EXPIRY_SECONDS
-from shared.dynamo import get_file_record, increment_vault_download, reserve_download
+from shared.constants import (
+    ACCESS_MODE_MULTI,
+    DOWNLOAD_URL_EXPIRY_SECONDS,
+    NEGATIVE_CACHE_TTL_SECONDS,
+)
+from shared.dynamo import begin_download, load_text_payload
 from shared.exceptions import (
     FileAlreadyDownloadedError,
     FileExpiredError,
@@ -13,11 +17,11 @@ from shared.exceptions import (
     FileReservedError,
     ValidationError,
 )
-from shared.request_helpers import get_path_parameter
-from shared.response import error_response, success_response
+from shared.request_helpers import get_path_parameter, parse_json_body
+from shared.response import cache_control, error_response, success_response
 from shared.s3 import generate_download_url
 from shared.security import require_cloudfront_and_auth
-from shared.validation import validate_file_id
+from shared.validation import validate_access_mode, validate_file_id
 
 logger = logging.getLogger(__name__)
 logger.setLevel(logging.INFO)
@@ -34,11 +38,18 @@ def handler(event: dict[str, Any], context: Any) -> dict[str, Any]:
 
     Security verification (CloudFront origin + reCAPTCHA) is handled by decorator.
 
-    For files: Returns presigned S3 download URL
-    For text: Returns encrypted text directly
+    For files: Returns presigned S3 download URL (plus the chunk manifest, if
+    the uploader declared one, so the client can issue parallel Range GETs)
+    For text: Returns encrypted text directly, or a presigned URL to the
+    encrypted text when it was offloaded to S3 (download_url, no encrypted_text)
+
+    Both modes are handled by one conditional DynamoDB update, without a prior
+    read. The client sends the access_mode it got from /metadata so the
+    update can be built for that mode. Repeat vault downloads can be counted
+    by the deferred worker instead (VAULT_COUNT_DEFERRED).
 
     For one-time access:
-    - Uses atomic DynamoDB conditional update to reserve the download.
+    - Reserves the download atomically.
     - The frontend must call /confirm endpoint after successful download.
 
     For multi-access (vault):
@@ -50,29 +61,40 @@ def handler(event: dict[str, Any], context: Any) -> dict[str, Any]:
         # Extract file ID from path
         file_id = get_path_parameter(event, "file_id")
 
+        # Access mode from /metadata (optional; older clients do not send it)
+        requested_mode = parse_json_body(event).get("access_mode")
+
         # Validate input
         validate_file_id(file_id)
+        if requested_mode is not None:
+            validate_access_mode(requested_mode)
 
-        # First, get the record to check access mode
-        initial_record = get_file_record(TABLE_NAME, file_id)
-        if not initial_record:
-            raise FileNotFoundError("File not found")
-
-        access_mode = initial_record.get("access_mode", "one_time")
-
-        # Handle based on access mode
-        if access_mode == ACCESS_MODE_MULTI:
-            # Vault (multi-access) - just increment download count
-            record = increment_vault_download(TABLE_NAME, file_id)
-        else:
-            # One-time access - atomically reserve for download
-            record = reserve_download(TABLE_NAME, file_id)
+        # Reserve (one-time) or count (vault) with a conditional update per mode
+        record = begin_download(TABLE_NAME, file_id, requested_mode)
+        access_mode = record.get("access_mode", "one_time")
 
         # Check content type and return appropriate response
         content_type = record.get("content_type", "file")
 
+        if content_type == "text" and record.get("s3_key"):
+            # Large text secret offloaded to S3 - the client fetches it like a file
+            logger.info(f"Offloaded text download: file_id={file_id}, access_mode={access_mode}")
+            return success_response(
+                {
+                    "content_type": "text",
+                    "download_url": generate_download_url(
+                        bucket_name=BUCKET_NAME,
+                        s3_key=record["s3_key"],
+                        expires_in=DOWNLOAD_URL_EXPIRY_SECONDS,
+                    ),
+                    "file_size": record["file_size"],
+                    "access_mode": access_mode,
+                }
+            )
+
         if content_type == "text":
-            # Text secret - return encrypted text directly
+            # Text secret - return encrypted text directly (large ones live in a payload item)
+            record = load_text_payload(TABLE_NAME, record)
             log_suffix = f"score={event.get('_recaptcha_score', 'N/A')}"
             if access_mode == ACCESS_MODE_MULTI:
                 logger.info(
@@ -106,14 +128,15 @@ def handler(event: dict[str, Any], context: Any) -> dict[str, Any]:
             else:
                 logger.info(f"File download reserved: file_id={file_id}, {log_suffix}")
 
-            return success_response(
-                {
-                    "content_type": "file",
-                    "download_url": download_url,
-                    "file_size": record["file_size"],
-                    "access_mode": access_mode,
-                }
-            )
+            response = {
+                "content_type": "file",
+                "download_url": download_url,
+                "file_size": record["file_size"],
+                "access_mode": access_mode,
+            }
+            if record.get("chunk_manifest"):
+                response["chunk_manifest"] = record["chunk_manifest"]
+            return success_response(response)
 
     except ValidationError as e:
         logger.warning(f"Validation error: {e}")
@@ -121,7 +144,7 @@ def handler(event: dict[str, Any], context: Any) -> dict[str, Any]:
 
     except FileNotFoundError as e:
         logger.info(f"File not found: {e}")
-        return error_response("File not found", 404)
+        return error_response("File not found", 404, cache_control(NEGATIVE_CACHE_TTL_SECONDS))
 
     except FileReservedError as e:
         logger.info(f"File currently reserved: {e}")
@@ -129,11 +152,13 @@ def handler(event: dict[str, Any], context: Any) -> dict[str, Any]:
 
     except FileAlreadyDownloadedError as e:
         logger.info(f"File already downloaded: {e}")
-        return error_response("File already downloaded", 410)
+        return error_response(
+            "File already downloaded", 410, cache_control(NEGATIVE_CACHE_TTL_SECONDS)
+        )
 
     except FileExpiredError as e:
         logger.info(f"File expired: {e}")
-        return error_response("File expired", 410)
+        return error_response("File expired", 410, cache_control(NEGATIVE_CACHE_TTL_SECONDS))
 
     except Exception:
         logger.exception("Unexpected error in download")
@@ -5,10 +5,12 @@ import os
 import time
 from typing import Any
 
-from shared.dynamo import get_file_record
-from shared.exceptions import ValidationError
+from botocore.exceptions import ClientError
+from shared.constants import NEGATIVE_CACHE_TTL_SECONDS
+from shared.dynamo import check_negative_result, get_cached_record, remember_negative_result
+from shared.exceptions import FileExpiredError, FileNotFoundError, ValidationError
 from shared.request_helpers import get_path_parameter
-from shared.response import error_response, success_response
+from shared.response import cache_control, error_response, success_response
 from shared.security import require_cloudfront_only
 from shared.validation import validate_file_id
 
@@ -18,6 +20,21 @@ logger.setLevel(logging.INFO)
 # Environment variables
 TABLE_NAME = os.environ.get("TABLE_NAME")
 
+# Write-once fields the metadata response is built from (never the inline
+# payload or PIN hash); cached per container
+METADATA_ATTRIBUTES = (
+    "file_id",
+    "content_type",
+    "file_size",
+    "expires_at",
+    "access_mode",
+    "salt",
+    "encrypted_key",
+)
+
+# Mutable state the metadata response needs, read fresh on every request
+METADATA_MUTABLE_ATTRIBUTES = ("downloaded", "download_count", "upload_id")
+
 
 @require_cloudfront_only
 def handler(event: dict[str, Any], context: Any) -> dict[str, Any]:
@@ -27,7 +44,13 @@ def handler(event: dict[str, Any], context: Any) -> dict[str, Any]:
     Security verification (CloudFront origin only) is handled by decorator.
     No reCAPTCHA needed for read-only endpoint.
 
-    Returns file info if available, 404 if not found or expired.
+    Returns file info if available, 404 if not found, 410 if expired. A file
+    whose multipart upload is still pending is reported as not available.
+    404/410 are cached in the container and, via Cache-Control, at CloudFront.
+
+    A vault's download_count is eventually consistent: with VAULT_COUNT_DEFERRED
+    repeat downloads are added by the deferred worker, so the count can lag
+    behind by the downloads still waiting in the queue.
     """
     try:
         # Extract file ID from path
@@ -36,23 +59,40 @@ def handler(event: dict[str, Any], context: Any) -> dict[str, Any]:
         # Validate input
         validate_file_id(file_id)
 
-        # Get file record
-        record = get_file_record(TABLE_NAME, file_id)
+        # Missing and expired IDs are answered from the negative cache for a while
+        check_negative_result("metadata", file_id)
+
+        # Get file record (immutable fields cached, mutable state read fresh)
+        try:
+            record = get_cached_record(
+                TABLE_NAME,
+                file_id,
+                METADATA_MUTABLE_ATTRIBUTES,
+                immutable_attributes=METADATA_ATTRIBUTES,
+                scope="metadata",
+            )
+        except ClientError as e:
+            # A failed read is reported as missing, but not cached as such
+            logger.error(f"Error getting file record {file_id}: {e}")
+            return error_response("File not found", 404)
 
         if not record:
-            return error_response("File not found", 404)
+            raise FileNotFoundError("File not found")
 
         # Check if expired (DynamoDB TTL can take up to 48h)
         current_time = int(time.time())
         if record.get("expires_at", 0) <= current_time:
-            return error_response("File expired", 410)
+            raise FileExpiredError("File expired")
 
         # Build metadata response
         access_mode = record.get("access_mode", "one_time")
 
+        # A pending multipart upload is not available until /complete clears upload_id
         # For multi-access (vault), always available until expired
         # For one-time, check downloaded flag
-        if access_mode == "multi":
+        if record.get("upload_id"):
+            available = False
+        elif access_mode == "multi":
             available = True
         else:
             available = not record.get("downloaded", False)
@@ -79,6 +119,14 @@ def handler(event: dict[str, Any], context: Any) -> dict[str, Any]:
         logger.warning(f"Validation error: {e}")
         return error_response(str(e), 400)
 
+    except FileNotFoundError as e:
+        remember_negative_result("metadata", file_id, e)
+        return error_response("File not found", 404, cache_control(NEGATIVE_CACHE_TTL_SECONDS))
+
+    except FileExpiredError as e:
+        remember_negative_result("metadata", file_id, e)
+        return error_response("File expired", 410, cache_control(NEGATIVE_CACHE_TTL_SECONDS))
+
     except Exception:
         logger.exception("Unexpected error in get_metadata")
         return error_response("Internal server error", 500)
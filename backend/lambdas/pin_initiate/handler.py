@@ -4,6 +4,7 @@ import logging
 import os
 from typing import Any
 
+from shared.constants import NEGATIVE_CACHE_TTL_SECONDS
 from shared.dynamo import initiate_pin_session
 from shared.exceptions import (
     FileAlreadyDownloadedError,
@@ -13,7 +14,7 @@ from shared.exceptions import (
     ValidationError,
 )
 from shared.request_helpers import parse_json_body
-from shared.response import error_response, success_response
+from shared.response import cache_control, error_response, success_response
 from shared.security import require_cloudfront_and_auth
 from shared.validation import validate_pin_file_id
 
@@ -52,11 +53,13 @@ def handler(event: dict[str, Any], context: Any) -> dict[str, Any]:
         logger.warning(f"Validation error: {e}")
         return error_response(str(e), 400)
     except FileNotFoundError:
-        return error_response("File not found", 404)
+        return error_response("File not found", 404, cache_control(NEGATIVE_CACHE_TTL_SECONDS))
     except FileExpiredError:
-        return error_response("File has expired", 410)
+        return error_response("File has expired", 410, cache_control(NEGATIVE_CACHE_TTL_SECONDS))
     except FileAlreadyDownloadedError:
-        return error_response("File has already been downloaded", 410)
+        return error_response(
+            "File has already been downloaded", 410, cache_control(NEGATIVE_CACHE_TTL_SECONDS)
+        )
     except FileLockedException as e:
         return error_response(str(e), 423)
     except Exception:
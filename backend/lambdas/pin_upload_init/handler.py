@@ -6,16 +6,17 @@ import time
 from typing import Any
 
 from shared.constants import (
+    TEXT_OFFLOAD_THRESHOLD_BYTES,
     TTL_TO_SECONDS,
     UPLOAD_URL_EXPIRY_SECONDS,
 )
 from shared.dynamo import create_pin_file_record
 from shared.exceptions import ValidationError
-from shared.pin_utils import generate_pin_file_id, generate_salt, hash_pin
+from shared.pin_utils import generate_salt, hash_pin
 from shared.request_helpers import get_source_ip, parse_json_body
 from shared.response import error_response, success_response
 from shared.s3 import generate_upload_url
-from shared.security import hash_ip_secure, require_cloudfront_and_auth
+from shared.security import get_pin_id_key, hash_ip_secure, require_cloudfront_and_auth
 from shared.validation import validate_file_size, validate_pin, validate_ttl
 
 logger = logging.getLogger(__name__)
@@ -24,9 +25,8 @@ logger.setLevel(logging.INFO)
 # Environment variables
 BUCKET_NAME = os.environ.get("BUCKET_NAME")
 TABLE_NAME = os.environ.get("TABLE_NAME")
-
-# Maximum retries for generating a unique 6-digit file ID
-MAX_ID_RETRIES = 5
+# Text secrets larger than this are stored in S3 (0 keeps all text in DynamoDB)
+TEXT_OFFLOAD_BYTES = int(os.environ.get("TEXT_OFFLOAD_BYTES", TEXT_OFFLOAD_THRESHOLD_BYTES))
 
 
 def ttl_to_seconds(ttl) -> int:
@@ -46,6 +46,11 @@ def ttl_to_seconds(ttl) -> int:
     return int(ttl) * 60
 
 
+def _offload_text(encrypted_text: str) -> bool:
+    """Check whether a text secret goes to S3 rather than DynamoDB."""
+    return bool(TEXT_OFFLOAD_BYTES) and len(encrypted_text) > TEXT_OFFLOAD_BYTES
+
+
 @require_cloudfront_and_auth
 def handler(event: dict[str, Any], context: Any) -> dict[str, Any]:
     """
@@ -103,92 +108,86 @@ def handler(event: dict[str, Any], context: Any) -> dict[str, Any]:
         source_ip = get_source_ip(event)
         ip_hash = hash_ip_secure(source_ip)
 
-        # Retry loop for 6-digit ID collisions
-        for _ in range(MAX_ID_RETRIES):
-            candidate_id = generate_pin_file_id()
-            try:
-                if content_type == "text":
-                    encrypted_text = body.get("encrypted_text")
-                    if not encrypted_text:
-                        raise ValidationError("encrypted_text is required for text secrets")
-                    if len(encrypted_text) > 10000:
-                        raise ValidationError("Text secret too large")
-
-                    create_pin_file_record(
-                        table_name=TABLE_NAME,
-                        file_id=candidate_id,
-                        file_size=len(encrypted_text),
-                        expires_at=expires_at,
-                        ip_hash=ip_hash,
-                        pin_hash=pin_hash,
-                        salt=salt,
-                        content_type="text",
-                        encrypted_text=encrypted_text,
-                        one_time=(access_mode == "one_time"),
-                    )
-
-                    logger.info(f"PIN text created: file_id={candidate_id}, ttl={ttl}")
-
-                    return success_response(
-                        {
-                            "file_id": candidate_id,
-                            "salt": salt,
-                            "expires_at": expires_at,
-                        }
-                    )
-
-                else:
-                    file_size = body.get("file_size")
-                    validate_file_size(file_size)
-                    s3_key = f"files/{candidate_id}"
-
-                    create_pin_file_record(
-                        table_name=TABLE_NAME,
-                        file_id=candidate_id,
-                        file_size=file_size,
-                        expires_at=expires_at,
-                        ip_hash=ip_hash,
-                        pin_hash=pin_hash,
-                        salt=salt,
-                        content_type="file",
-                        s3_key=s3_key,
-                        file_name=file_name,
-                        one_time=(access_mode == "one_time"),
-                    )
-
-                    upload_url = generate_upload_url(
-                        bucket_name=BUCKET_NAME,
-                        s3_key=s3_key,
-                        expires_in=UPLOAD_URL_EXPIRY_SECONDS,
-                    )
-
-                    logger.info(
-                        f"PIN file upload init: file_id={candidate_id}, size={file_size}, ttl={ttl}"
-                    )
-
-                    return success_response(
-                        {
-                            "file_id": candidate_id,
-                            "upload_url": upload_url,
-                            "salt": salt,
-                            "expires_at": expires_at,
-                        }
-                    )
-
-            except ValueError as e:
-                if "already exists" in str(e):
-                    logger.warning(f"PIN file ID collision: {candidate_id}, retrying...")
-                    continue
-                raise
-
-        # Exhausted all retries
-        logger.error("Failed to generate unique PIN file ID after max retries")
-        return error_response("Failed to generate unique file ID. Please try again.", 500)
+        # 6-digit ID comes from the counter + keyed permutation (no random retries)
+        id_key = get_pin_id_key()
+
+        if content_type == "text":
+            encrypted_text = body.get("encrypted_text")
+            if not encrypted_text:
+                raise ValidationError("encrypted_text is required for text secrets")
+            if len(encrypted_text) > 10000:
+                raise ValidationError("Text secret too large")
+
+            record = create_pin_file_record(
+                table_name=TABLE_NAME,
+                file_id=None,
+                file_size=len(encrypted_text),
+                expires_at=expires_at,
+                ip_hash=ip_hash,
+                pin_hash=pin_hash,
+                salt=salt,
+                content_type="text",
+                encrypted_text=encrypted_text,
+                one_time=(access_mode == "one_time"),
+                id_key=id_key,
+                text_bucket=BUCKET_NAME if _offload_text(encrypted_text) else None,
+            )
+            file_id = record["file_id"]
+
+            logger.info(f"PIN text created: file_id={file_id}, ttl={ttl}")
+
+            return success_response(
+                {
+                    "file_id": file_id,
+                    "salt": salt,
+                    "expires_at": expires_at,
+                }
+            )
+
+        else:
+            file_size = body.get("file_size")
+            validate_file_size(file_size)
+
+            record = create_pin_file_record(
+                table_name=TABLE_NAME,
+                file_id=None,
+                file_size=file_size,
+                expires_at=expires_at,
+                ip_hash=ip_hash,
+                pin_hash=pin_hash,
+                salt=salt,
+                content_type="file",
+                file_name=file_name,
+                one_time=(access_mode == "one_time"),
+                id_key=id_key,
+            )
+            file_id = record["file_id"]
+
+            upload_url = generate_upload_url(
+                bucket_name=BUCKET_NAME,
+                s3_key=record["s3_key"],
+                expires_in=UPLOAD_URL_EXPIRY_SECONDS,
+            )
+
+            logger.info(f"PIN file upload init: file_id={file_id}, size={file_size}, ttl={ttl}")
+
+            return success_response(
+                {
+                    "file_id": file_id,
+                    "upload_url": upload_url,
+                    "salt": salt,
+                    "expires_at": expires_at,
+                }
+            )
 
     except ValidationError as e:
         logger.warning(f"Validation error: {e}")
         return error_response(str(e), 400)
 
+    except RuntimeError as e:
+        logger.error(str(e))
+        return error_response("Failed to generate unique file ID. Please try again.", 500)
+
     except Exception:
         logger.exception("Unexpected error in pin_upload_init")
         return error_response("Internal server error", 500)
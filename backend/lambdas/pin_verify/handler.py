@@ -5,7 +5,8 @@ import os
 from typing import Any
 
 from shared.constants import DOWNLOAD_URL_EXPIRY_SECONDS
-from shared.dynamo import increment_download_counter, verify_pin_and_download
+from shared.deferred import TASK_COUNT_DOWNLOADS, defer
+from shared.dynamo import load_text_payload, verify_pin_and_download
 from shared.exceptions import (
     FileAlreadyDownloadedError,
     FileExpiredError,
@@ -45,18 +46,34 @@ def handler(event: dict[str, Any], context: Any) -> dict[str, Any]:
 
         record = verify_pin_and_download(TABLE_NAME, file_id, pin)
 
-        # Increment global stats (non-blocking)
-        try:
-            increment_download_counter(TABLE_NAME, file_size=record.get("file_size", 0))
-        except Exception as stats_err:
-            logger.warning(f"Failed to increment stats for PIN download: {stats_err}")
+        # Count globally after the response
+        defer(
+            TASK_COUNT_DOWNLOADS, table_name=TABLE_NAME, file_size=int(record.get("file_size", 0))
+        )
 
         content_type = record.get("content_type", "file")
         salt = record.get("salt")
 
         file_name = record.get("file_name", "")
 
+        if content_type == "text" and record.get("s3_key"):
+            # Large text offloaded to S3 - the client fetches it like a file
+            logger.info(f"PIN offloaded text download: file_id={file_id}")
+            return success_response(
+                {
+                    "content_type": "text",
+                    "download_url": generate_download_url(
+                        bucket_name=BUCKET_NAME,
+                        s3_key=record["s3_key"],
+                        expires_in=DOWNLOAD_URL_EXPIRY_SECONDS,
+                    ),
+                    "salt": salt,
+                    "file_size": record["file_size"],
+                    "file_name": file_name,
+                }
+            )
         if content_type == "text":
+            record = load_text_payload(TABLE_NAME, record)
             logger.info(f"PIN text download: file_id={file_id}")
             return success_response(
                 {
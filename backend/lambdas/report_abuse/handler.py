@@ -6,11 +6,13 @@ import os
 from typing import Any
 
 from shared.constants import AUTO_DELETE_THRESHOLD
+from shared.deferred import TASK_ABUSE_THRESHOLD, defer
 from shared.dynamo import get_file_record, increment_report_count
 from shared.exceptions import ValidationError
-from shared.request_helpers import get_path_parameter, parse_json_body
+from shared.metrics import emit_metrics
+from shared.request_helpers import get_path_parameter, get_source_ip, parse_json_body
 from shared.response import error_response, success_response
-from shared.security import require_cloudfront_and_recaptcha
+from shared.security import hash_ip_secure, require_cloudfront_and_recaptcha
 from shared.validation import validate_file_id
 
 logger = logging.getLogger(__name__)
@@ -18,6 +20,9 @@ logger.setLevel(logging.INFO)
 
 # Environment variables
 TABLE_NAME = os.environ.get("TABLE_NAME")
+BUCKET_NAME = os.environ.get("BUCKET_NAME")
+# Opt-in: delete shares at the threshold instead of only flagging them for review
+ABUSE_AUTO_DELETE = os.environ.get("ABUSE_AUTO_DELETE", "false").lower() == "true"
 
 
 @require_cloudfront_and_recaptcha
@@ -27,7 +32,10 @@ def handler(event: dict[str, Any], context: Any) -> dict[str, Any]:
 
     Security verification (CloudFront origin + reCAPTCHA) is handled by decorator.
 
-    If report count reaches threshold, file should be reviewed/deleted.
+    Reports are counted once per reporter (hashed source IP). When the count
+    of distinct reporters reaches the threshold, the share is flagged for
+    review (critical log and AbuseThresholdReached metric). Deleting it
+    automatically is opt-in (ABUSE_AUTO_DELETE), since rotating IPs is cheap.
     """
     try:
         # Parse request
@@ -43,8 +51,9 @@ def handler(event: dict[str, Any], context: Any) -> dict[str, Any]:
         if not record:
             return error_response("File not found", 404)
 
-        # Increment report count
-        new_count = increment_report_count(TABLE_NAME, file_id)
+        # Increment report count (once per reporter)
+        reporter_hash = hash_ip_secure(get_source_ip(event))
+        new_count = increment_report_count(TABLE_NAME, file_id, reporter_hash)
 
         logger.warning(
             json.dumps(
@@ -58,9 +67,18 @@ def handler(event: dict[str, Any], context: Any) -> dict[str, Any]:
             )
         )
 
-        # TODO: If count >= threshold, trigger admin review or auto-delete
         if new_count >= AUTO_DELETE_THRESHOLD:
             logger.critical(f"File {file_id} reached abuse threshold: {new_count} reports")
+            emit_metrics({"AbuseThresholdReached": 1})
+
+        if new_count >= AUTO_DELETE_THRESHOLD and ABUSE_AUTO_DELETE:
+            defer(
+                TASK_ABUSE_THRESHOLD,
+                table_name=TABLE_NAME,
+                bucket_name=BUCKET_NAME,
+                file_id=file_id,
+                report_count=new_count,
+            )
 
         return success_response(
             {
@@ -0,0 +1,136 @@
+"""Lambda function: Delete S3 objects as records expire or are consumed (DynamoDB Streams)."""
+
+import json
+import logging
+import os
+from typing import Any
+
+from boto3.dynamodb.types import TypeDeserializer
+from shared.constants import ACCESS_MODE_PIN
+from shared.dynamo import adjust_live_pin_ids
+from shared.s3 import delete_files
+
+logger = logging.getLogger(__name__)
+logger.setLevel(logging.INFO)
+
+# Environment variables
+BUCKET_NAME = os.environ.get("BUCKET_NAME")
+TABLE_NAME = os.environ.get("TABLE_NAME")
+
+_deserializer = TypeDeserializer()
+
+
+def _deserialize(image: dict[str, Any] | None) -> dict[str, Any]:
+    """Convert a stream image from DynamoDB JSON to plain Python values."""
+    return {key: _deserializer.deserialize(value) for key, value in (image or {}).items()}
+
+
+def _is_ttl_removal(record: dict[str, Any]) -> bool:
+    """Check whether a REMOVE event was issued by DynamoDB TTL."""
+    identity = record.get("userIdentity") or {}
+    return identity.get("type") == "Service" and identity.get("principalId") == (
+        "dynamodb.amazonaws.com"
+    )
+
+
+def s3_key_to_delete(record: dict[str, Any]) -> str | None:
+    """
+    Work out which S3 object a stream record makes obsolete.
+
+    - TTL REMOVE: the expired record's file object.
+    - MODIFY where downloaded flips to true: the consumed one-time file.
+
+    PIN records are skipped on MODIFY because pin_verify marks them downloaded
+    before the client has fetched the object; they are removed on expiry or by
+    the scheduled cleanup instead. Text secrets only have an S3 object when
+    they were offloaded (s3_key set).
+
+    Args:
+        record: A single DynamoDB Streams record
+
+    Returns:
+        S3 key to delete, or None
+    """
+    event_name = record.get("eventName")
+    change = record.get("dynamodb", {})
+
+    if event_name == "REMOVE" and _is_ttl_removal(record):
+        image = _deserialize(change.get("OldImage"))
+    elif event_name == "MODIFY":
+        old_image = _deserialize(change.get("OldImage"))
+        image = _deserialize(change.get("NewImage"))
+        if not image.get("downloaded") or old_image.get("downloaded"):
+            return None
+        if image.get("access_mode") == ACCESS_MODE_PIN:
+            return None
+    else:
+        return None
+
+    # Text secrets have no s3_key unless offloaded
+    return image.get("s3_key")
+
+
+def is_pin_removal(record: dict[str, Any]) -> bool:
+    """Check whether a record removes a PIN share (TTL expiry or cleanup)."""
+    if record.get("eventName") != "REMOVE":
+        return False
+    old_image = record.get("dynamodb", {}).get("OldImage") or {}
+    return old_image.get("access_mode", {}).get("S") == ACCESS_MODE_PIN
+
+
+def handler(event: dict[str, Any], context: Any) -> dict[str, Any]:
+    """
+    Delete S3 objects for expired and consumed shares as soon as they change.
+
+    Consumes DynamoDB Streams batches (NEW_AND_OLD_IMAGES) and removes the
+    matching objects with one DeleteObjects call per batch. The scheduled
+    cleanup only has to catch stragglers.
+
+    Removed PIN shares are subtracted from the live PIN ID count used for the
+    ID-space utilization metric.
+
+    Failed deletes are reported through batchItemFailures so Lambda retries
+    the batch from the first failed record.
+    """
+    records = event.get("Records", [])
+    keys: dict[str, str] = {}
+
+    for record in records:
+        s3_key = s3_key_to_delete(record)
+        if s3_key:
+            # Keep the earliest sequence number per key for retry reporting
+            keys.setdefault(s3_key, record["dynamodb"]["SequenceNumber"])
+
+    failed = delete_files(BUCKET_NAME, list(keys)) if keys else {}
+    for s3_key, message in failed.items():
+        logger.error(f"Error deleting {s3_key} from stream event: {message}")
+
+    first_failed = min((keys[s3_key] for s3_key in failed), key=int) if failed else None
+
+    # Records from first_failed on are redelivered, so only count the ones before it
+    pin_removed = sum(
+        1
+        for record in records
+        if is_pin_removal(record)
+        and (first_failed is None or int(record["dynamodb"]["SequenceNumber"]) < int(first_failed))
+    )
+    if pin_removed:
+        adjust_live_pin_ids(TABLE_NAME, -pin_removed)
+
+    if keys or pin_removed:
+        logger.info(
+            json.dumps(
+                {
+                    "action": "stream_cleanup",
+                    "records": len(records),
+                    "deleted": len(keys) - len(failed),
+                    "errors": len(failed),
+                    "pin_removed": pin_removed,
+                }
+            )
+        )
+
+    if not failed:
+        return {"batchItemFailures": []}
+
+    return {"batchItemFailures": [{"itemIdentifier": first_failed}]}
@@ -1,24 +1,40 @@
 """Lambda function: Initialize file upload."""
 
+import base64
+import binascii
 import logging
+import math
 import os
+import secrets
 import time
 from typing import Any
 
+from botocore.exceptions import ClientError
 from shared.constants import (
     ACCESS_MODE_MULTI,
     ACCESS_MODE_ONE_TIME,
+    DIRECT_UPLOAD_MAX_BYTES,
+    MULTIPART_PART_SIZE_BYTES,
+    PART_URL_EXPIRY_SECONDS,
+    TEXT_OFFLOAD_THRESHOLD_BYTES,
     TTL_TO_SECONDS,
     UPLOAD_URL_EXPIRY_SECONDS,
 )
-from shared.dynamo import create_file_record, generate_unique_file_id
+from shared.dynamo import create_file_record, delete_file_record, start_multipart_upload
 from shared.exceptions import ValidationError
 from shared.request_helpers import get_source_ip, parse_json_body
 from shared.response import error_response, success_response
-from shared.s3 import generate_upload_url
-from shared.security import hash_ip_secure, require_cloudfront_and_auth
+from shared.s3 import (
+    abort_multipart_upload,
+    create_multipart_upload,
+    generate_part_upload_urls,
+    generate_upload_url,
+    put_file,
+)
+from shared.security import hash_ip_secure, hash_upload_token, require_cloudfront_and_auth
 from shared.validation import (
     validate_access_mode,
+    validate_chunk_manifest,
     validate_encrypted_key,
     validate_file_size,
     validate_salt,
@@ -31,6 +47,10 @@ logger.setLevel(logging.INFO)
 # Environment variables
 BUCKET_NAME = os.environ.get("BUCKET_NAME")
 TABLE_NAME = os.environ.get("TABLE_NAME")
+# Largest ciphertext accepted inline as encrypted_data (0 disables direct uploads)
+DIRECT_UPLOAD_MAX = int(os.environ.get("DIRECT_UPLOAD_MAX_BYTES", DIRECT_UPLOAD_MAX_BYTES))
+# Text secrets larger than this are stored in S3 (0 keeps all text in DynamoDB)
+TEXT_OFFLOAD_BYTES = int(os.environ.get("TEXT_OFFLOAD_BYTES", TEXT_OFFLOAD_THRESHOLD_BYTES))
 
 
 def ttl_to_seconds(ttl) -> int:
@@ -50,6 +70,118 @@ def ttl_to_seconds(ttl) -> int:
     return int(ttl) * 60
 
 
+def _offload_text(encrypted_text: str) -> bool:
+    """Check whether a text secret goes to S3 rather than DynamoDB."""
+    return bool(TEXT_OFFLOAD_BYTES) and len(encrypted_text) > TEXT_OFFLOAD_BYTES
+
+
+def _decode_direct_upload(encrypted_data: Any) -> bytes:
+    """
+    Decode an inline file payload, enforcing the direct upload limit.
+
+    Raises:
+        ValidationError: If the payload is not base64 or is too large
+    """
+    if not isinstance(encrypted_data, str) or not encrypted_data:
+        raise ValidationError("encrypted_data must be a base64 string")
+
+    # Checked on the encoded length first so oversized bodies are not decoded
+    if len(encrypted_data) > 4 * math.ceil(DIRECT_UPLOAD_MAX / 3):
+        raise ValidationError(
+            f"encrypted_data exceeds the direct upload limit ({DIRECT_UPLOAD_MAX} bytes); "
+            "request an upload_url instead"
+        )
+
+    try:
+        data = base64.b64decode(encrypted_data, validate=True)
+    except binascii.Error as e:
+        raise ValidationError("encrypted_data must be a base64 string") from e
+
+    if len(data) > DIRECT_UPLOAD_MAX:
+        raise ValidationError(
+            f"encrypted_data exceeds the direct upload limit ({DIRECT_UPLOAD_MAX} bytes); "
+            "request an upload_url instead"
+        )
+    return data
+
+
+def _store_direct_upload(record: dict[str, Any], data: bytes) -> None:
+    """
+    Write an inline file payload to S3 in the same invocation.
+
+    If the write fails the record is removed, so the ID never points at a
+    missing object.
+    """
+    try:
+        put_file(BUCKET_NAME, record["s3_key"], data)
+    except ClientError:
+        try:
+            delete_file_record(TABLE_NAME, record["file_id"])
+        except ClientError:
+            logger.exception(f"Failed to remove record after upload error: {record['file_id']}")
+        raise
+
+
+def _init_multipart_upload(
+    file_id: str, s3_key: str, upload_size: int, expires_at: int
+) -> dict[str, Any]:
+    """
+    Start a multipart upload for a new file record and sign all part URLs.
+
+    Parts are laid out over upload_size (the ciphertext length when a chunk
+    manifest is given); any remainder goes into the last part. Parts can be
+    uploaded in parallel and in any order. The upload state lives
+    in the record, so a client can resume (or re-sign expired URLs) through
+    /upload/{file_id}/parts with the returned upload_token.
+
+    If the upload cannot be started the record is removed, so the ID never
+    points at a missing object.
+    """
+    part_count = max(1, math.ceil(upload_size / MULTIPART_PART_SIZE_BYTES))
+    upload_token = secrets.token_urlsafe(32)
+
+    upload_id = None
+    try:
+        upload_id = create_multipart_upload(BUCKET_NAME, s3_key)
+        start_multipart_upload(
+            TABLE_NAME,
+            file_id,
+            upload_id=upload_id,
+            part_size=MULTIPART_PART_SIZE_BYTES,
+            part_count=part_count,
+            upload_token_hash=hash_upload_token(upload_token),
+        )
+    except ClientError:
+        # Like _store_direct_upload: never leave a record without its upload
+        try:
+            if upload_id:
+                abort_multipart_upload(BUCKET_NAME, s3_key, upload_id)
+            delete_file_record(TABLE_NAME, file_id)
+        except ClientError:
+            logger.exception(f"Failed to remove record after upload error: {file_id}")
+        raise
+    part_urls = generate_part_upload_urls(
+        BUCKET_NAME,
+        s3_key,
+        upload_id,
+        list(range(1, part_count + 1)),
+        expires_in=PART_URL_EXPIRY_SECONDS,
+    )
+
+    logger.info(f"Multipart upload initialized: file_id={file_id}, parts={part_count}")
+
+    return success_response(
+        {
+            "file_id": file_id,
+            "upload_token": upload_token,
+            "part_size": MULTIPART_PART_SIZE_BYTES,
+            "part_count": part_count,
+            "part_urls": [{"part_number": number, "url": url} for number, url in part_urls.items()],
+            "expires_at": expires_at,
+        }
+    )
+
+
 @require_cloudfront_and_auth
 def handler(event: dict[str, Any], context: Any) -> dict[str, Any]:
     """
@@ -65,6 +197,24 @@ def handler(event: dict[str, Any], context: Any) -> dict[str, Any]:
         "recaptcha_token": "token"
     }
 
+    Expected request body (multipart file, any access mode):
+    {
+        "content_type": "file",
+        "file_size": 104857600,
+        "ttl": "1h",
+        "multipart": true,
+        "recaptcha_token": "token"
+    }
+
+    Small files (up to DIRECT_UPLOAD_MAX_BYTES of ciphertext, 256 KB by default)
+    can be sent inline instead of PUT to a presigned URL; the response then has
+    no upload_url and the link works immediately:
+        "encrypted_data": "base64-ciphertext"
+
+    Files may also declare their ciphertext chunk layout for parallel ranged
+    downloads (see validate_chunk_manifest):
+        "chunk_manifest": {"chunk_size": 4194304, "chunk_count": 25, "total_size": 104858300}
+
     Expected request body (text):
     {
         "content_type": "text",
@@ -100,9 +250,17 @@ def handler(event: dict[str, Any], context: Any) -> dict[str, Any]:
     Returns:
     {
         "file_id": "uuid",
-        "upload_url": "presigned-s3-url",  // Only for files
+        "upload_url": "presigned-s3-url",  // Only for single-PUT files
         "expires_at": 1234567890
     }
+
+    Multipart files get instead of upload_url:
+    {
+        "upload_token": "...",  // Required by /upload/{file_id}/{parts,complete,abort}
+        "part_size": 16777216,
+        "part_count": 7,
+        "part_urls": [{"part_number": 1, "url": "presigned-s3-url"}, ...]
+    }
     """
     try:
         # Parse request body
@@ -133,9 +291,6 @@ def handler(event: dict[str, Any], context: Any) -> dict[str, Any]:
         source_ip = get_source_ip(event)
         ip_hash = hash_ip_secure(source_ip)
 
-        # Generate a unique short file ID
-        file_id = generate_unique_file_id(TABLE_NAME)
-
         # Handle based on content type
         if content_type == "text":
             encrypted_text = body.get("encrypted_text")
@@ -160,9 +315,10 @@ def handler(event: dict[str, Any], context: Any) -> dict[str, Any]:
                     raise ValidationError("text_size cannot exceed encrypted text length")
                 file_size = raw_text_size
 
-            create_file_record(
+            # Short file ID is allocated by the conditional put
+            record = create_file_record(
                 table_name=TABLE_NAME,
-                file_id=file_id,
+                file_id=None,
                 file_size=file_size,
                 expires_at=expires_at,
                 ip_hash=ip_hash,
@@ -171,7 +327,9 @@ def handler(event: dict[str, Any], context: Any) -> dict[str, Any]:
                 access_mode=access_mode,
                 salt=salt,
                 encrypted_key=encrypted_key,
+                text_bucket=BUCKET_NAME if _offload_text(encrypted_text) else None,
             )
+            file_id = record["file_id"]
 
             logger.info(
                 f"Text secret created: file_id={file_id}, size={file_size}, ttl={ttl}, access_mode={access_mode}"
@@ -188,20 +346,48 @@ def handler(event: dict[str, Any], context: Any) -> dict[str, Any]:
             file_size = body.get("file_size")
             validate_file_size(file_size)
 
-            s3_key = f"files/{file_id}"
-
-            create_file_record(
+            # Optional ciphertext chunk layout, returned by download for ranged GETs
+            chunk_manifest = None
+            if body.get("chunk_manifest") is not None:
+                chunk_manifest = validate_chunk_manifest(body["chunk_manifest"], file_size)
+
+            # Small files may be sent inline, saving the presigned PUT round trip
+            data = None
+            if body.get("encrypted_data") is not None:
+                if not DIRECT_UPLOAD_MAX:
+                    raise ValidationError("Direct uploads are disabled")
+                if body.get("multipart") is True:
+                    raise ValidationError("encrypted_data cannot be combined with multipart")
+                data = _decode_direct_upload(body["encrypted_data"])
+                if chunk_manifest and chunk_manifest["total_size"] != len(data):
+                    raise ValidationError("chunk_manifest.total_size does not match encrypted_data")
+
+            # Short file ID (and s3_key files/<file_id>) is allocated by the conditional put
+            record = create_file_record(
                 table_name=TABLE_NAME,
-                file_id=file_id,
+                file_id=None,
                 file_size=file_size,
                 expires_at=expires_at,
                 ip_hash=ip_hash,
                 content_type="file",
-                s3_key=s3_key,
                 access_mode=access_mode,
                 salt=salt,
                 encrypted_key=encrypted_key,
+                chunk_manifest=chunk_manifest,
             )
+            file_id = record["file_id"]
+            s3_key = record["s3_key"]
+
+            if data is not None:
+                _store_direct_upload(record, data)
+                logger.info(
+                    f"File uploaded directly: file_id={file_id}, size={file_size}, ttl={ttl}, access_mode={access_mode}"
+                )
+                return success_response({"file_id": file_id, "expires_at": expires_at})
+
+            if body.get("multipart") is True:
+                upload_size = chunk_manifest["total_size"] if chunk_manifest else file_size
+                return _init_multipart_upload(file_id, s3_key, upload_size, expires_at)
 
             upload_url = generate_upload_url(
                 bucket_name=BUCKET_NAME,
@@ -0,0 +1,200 @@
+"""Lambda function: Resume, complete or abort a multipart upload."""
+
+import logging
+import os
+from typing import Any
+
+from botocore.exceptions import ClientError
+from shared.constants import (
+    CHUNK_MAX_OVERHEAD_BYTES,
+    HTTP_BAD_REQUEST,
+    HTTP_GONE,
+    HTTP_PAYLOAD_TOO_LARGE,
+    PART_URL_EXPIRY_SECONDS,
+)
+from shared.dynamo import delete_pending_upload, finish_multipart_upload, get_multipart_upload
+from shared.exceptions import FileExpiredError, FileNotFoundError, ValidationError
+from shared.request_helpers import get_path_parameter, parse_json_body
+from shared.response import error_response, success_response
+from shared.s3 import (
+    abort_multipart_upload,
+    complete_multipart_upload,
+    generate_part_upload_urls,
+    list_uploaded_parts,
+)
+from shared.security import hash_upload_token, require_cloudfront_only
+from shared.validation import validate_file_id
+
+logger = logging.getLogger(__name__)
+logger.setLevel(logging.INFO)
+
+# Environment variables
+BUCKET_NAME = os.environ.get("BUCKET_NAME")
+TABLE_NAME = os.environ.get("TABLE_NAME")
+
+
+def _parts(record: dict[str, Any], body: dict[str, Any]) -> dict[str, Any]:
+    """
+    Report uploaded parts and sign URLs for the rest (resume).
+
+    Optional body "part_numbers" re-signs only those parts (e.g. a URL that
+    expired mid-upload); by default every part S3 has not received is signed.
+    """
+    part_count = int(record["part_count"])
+    uploaded = list_uploaded_parts(BUCKET_NAME, record["s3_key"], record["upload_id"])
+    uploaded_numbers = {part["PartNumber"] for part in uploaded}
+
+    requested = body.get("part_numbers")
+    if requested is None:
+        part_numbers = [n for n in range(1, part_count + 1) if n not in uploaded_numbers]
+    else:
+        if not isinstance(requested, list) or not all(
+            type(n) is int and 1 <= n <= part_count for n in requested
+        ):
+            raise ValidationError(f"part_numbers must be integers from 1 to {part_count}")
+        part_numbers = sorted(set(requested))
+
+    part_urls = generate_part_upload_urls(
+        BUCKET_NAME,
+        record["s3_key"],
+        record["upload_id"],
+        part_numbers,
+        expires_in=PART_URL_EXPIRY_SECONDS,
+    )
+
+    return success_response(
+        {
+            "file_id": record["file_id"],
+            "part_size": int(record["part_size"]),
+            "part_count": part_count,
+            "uploaded_parts": [
+                {"part_number": part["PartNumber"], "size": part["Size"]} for part in uploaded
+            ],
+            "part_urls": [{"part_number": number, "url": url} for number, url in part_urls.items()],
+        }
+    )
+
+
+def _discard_upload(record: dict[str, Any]) -> None:
+    """Abort the S3 upload and remove the share, ignoring parts already gone."""
+    try:
+        abort_multipart_upload(BUCKET_NAME, record["s3_key"], record["upload_id"])
+        delete_pending_upload(TABLE_NAME, record["file_id"], record["upload_id"])
+    except (ClientError, FileNotFoundError) as e:
+        logger.warning(f"Failed to discard upload {record['file_id']}: {e}")
+
+
+def _declared_size_range(record: dict[str, Any]) -> tuple[int, int]:
+    """Smallest and largest object size the upload was initialized for."""
+    manifest = record.get("chunk_manifest")
+    if manifest:
+        total_size = int(manifest["total_size"])
+        return total_size, total_size
+    # A single encrypted blob: plaintext plus IV and tag
+    file_size = int(record["file_size"])
+    return file_size, file_size + CHUNK_MAX_OVERHEAD_BYTES
+
+
+def _complete(record: dict[str, Any], body: dict[str, Any]) -> dict[str, Any]:
+    """
+    Assemble the parts once S3 has all of them, then open the file for download.
+
+    The part list (ETags and sizes) comes from S3 itself, not from the client.
+    Presigned part URLs do not limit the body size, so the layout is checked
+    before completing: every part but the last must be part_size bytes and
+    the total must match the declared size. Otherwise the upload is aborted.
+    """
+    part_count = int(record["part_count"])
+    uploaded = list_uploaded_parts(BUCKET_NAME, record["s3_key"], record["upload_id"])
+    uploaded_numbers = {part["PartNumber"] for part in uploaded}
+    missing = [n for n in range(1, part_count + 1) if n not in uploaded_numbers]
+    if missing:
+        raise ValidationError(f"Upload incomplete: {len(missing)} of {part_count} parts missing")
+
+    part_size = int(record["part_size"])
+    total_size = sum(part["Size"] for part in uploaded)
+    min_size, max_size = _declared_size_range(record)
+    if total_size > max_size:
+        _discard_upload(record)
+        return error_response(
+            f"Upload exceeds the declared size ({max_size} bytes)", HTTP_PAYLOAD_TOO_LARGE
+        )
+    if total_size < min_size or any(part["Size"] != part_size for part in uploaded[:-1]):
+        _discard_upload(record)
+        return error_response("Upload does not match the declared part layout", HTTP_BAD_REQUEST)
+
+    complete_multipart_upload(BUCKET_NAME, record["s3_key"], record["upload_id"], uploaded)
+    finish_multipart_upload(TABLE_NAME, record["file_id"], record["upload_id"])
+
+    return success_response({"file_id": record["file_id"], "expires_at": record["expires_at"]})
+
+
+def _abort(record: dict[str, Any], body: dict[str, Any]) -> dict[str, Any]:
+    """Abort the S3 upload (freeing stored parts) and remove the share."""
+    abort_multipart_upload(BUCKET_NAME, record["s3_key"], record["upload_id"])
+    delete_pending_upload(TABLE_NAME, record["file_id"], record["upload_id"])
+
+    return success_response({"message": "Upload aborted", "file_id": record["file_id"]})
+
+
+ACTIONS = {"parts": _parts, "complete": _complete, "abort": _abort}
+
+
+@require_cloudfront_only
+def handler(event: dict[str, Any], context: Any) -> dict[str, Any]:
+    """
+    Manage a multipart upload started by upload_init ("multipart": true).
+
+    Security verification (CloudFront origin) is handled by decorator. The
+    upload token returned by upload_init authorizes the uploader; a wrong
+    token gets the same 404 as a missing upload.
+
+    POST /upload/{file_id}/parts    { upload_token, part_numbers? }
+    POST /upload/{file_id}/complete { upload_token }
+    POST /upload/{file_id}/abort    { upload_token }
+
+    Incomplete uploads are aborted by cleanup when the share expires (and by
+    the bucket lifecycle rule after one day, which makes resuming return 410).
+    """
+    try:
+        file_id = get_path_parameter(event, "file_id")
+        action = get_path_parameter(event, "action")
+        body = parse_json_body(event)
+
+        validate_file_id(file_id)
+        if action not in ACTIONS:
+            raise ValidationError("Unknown upload action")
+        upload_token = body.get("upload_token")
+        if not isinstance(upload_token, str) or not upload_token:
+            raise ValidationError("upload_token is required")
+
+        record = get_multipart_upload(TABLE_NAME, file_id, hash_upload_token(upload_token))
+
+        try:
+            response = ACTIONS[action](record, body)
+        except ClientError as e:
+            if e.response["Error"]["Code"] != "NoSuchUpload":
+                raise
+            # Aborted by the bucket lifecycle rule; the client has to start over
+            _discard_upload(record)
+            logger.info(f"Multipart upload gone: file_id={file_id}")
+            return error_response("Upload no longer exists, start a new upload", HTTP_GONE)
+
+        logger.info(f"Multipart upload {action}: file_id={file_id}")
+        return response
+
+    except ValidationError as e:
+        logger.warning(f"Validation error: {e}")
+        return error_response(str(e), 400)
+
+    except FileNotFoundError as e:
+        logger.info(f"Upload not found: {e}")
+        return error_response("Upload not found", 404)
+
+    except FileExpiredError as e:
+        logger.info(f"Upload expired: {e}")
+        return error_response("File expired", 410)
+
+    except Exception:
+        logger.exception("Unexpected error in upload_multipart")
+        return error_response("Internal server error", 500)
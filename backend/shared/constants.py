@@ -23,11 +23,62 @@ MAX_CUSTOM_TTL_MINUTES: Final[int] = 10080  # 7 days (7 * 24 * 60)
 UPLOAD_URL_EXPIRY_SECONDS: Final[int] = 900  # 15 minutes
 DOWNLOAD_URL_EXPIRY_SECONDS: Final[int] = 300  # 5 minutes
 
+# Direct uploads (small files sent inline to upload_init, no presigned PUT)
+DIRECT_UPLOAD_MAX_BYTES: Final[int] = 262144  # 256 KB of ciphertext
+
+# Multipart uploads (parallel presigned part PUTs, resumable)
+MULTIPART_PART_SIZE_BYTES: Final[int] = 16777216  # 16 MB (S3 minimum is 5 MB)
+MULTIPART_MAX_PARTS: Final[int] = 10000  # S3 limit
+PART_URL_EXPIRY_SECONDS: Final[int] = 3600  # 1 hour; expired URLs are re-issued on resume
+
+# Chunk manifest (ciphertext layout for parallel ranged downloads)
+CHUNK_MIN_SIZE_BYTES: Final[int] = 65536  # 64 KB
+CHUNK_MAX_COUNT: Final[int] = 10000
+CHUNK_MAX_OVERHEAD_BYTES: Final[int] = 64  # Per chunk (AES-GCM IV + tag is 28)
+
+# Text payloads larger than this live in a separate write-once item
+INLINE_TEXT_MAX_BYTES: Final[int] = 1024
+# ... and larger than this in S3 (texts/<file_id>). 0 = off: offloaded texts are
+# returned as download_url, which clients do not follow yet
+TEXT_OFFLOAD_THRESHOLD_BYTES: Final[int] = 0
+
+# Short file ID allocation (conditional put retries on collision)
+FILE_ID_MAX_RETRIES: Final[int] = 10
+
 # Download reservation timeout (in seconds)
 DOWNLOAD_RESERVATION_TIMEOUT: Final[int] = 600  # 10 minutes
 
+# Container cache of immutable record fields (entries per container)
+RECORD_CACHE_MAX_ENTRIES: Final[int] = 128
+
+# Negative-result cache (missing, expired, consumed and locked IDs)
+NEGATIVE_CACHE_TTL_SECONDS: Final[int] = 30  # Also the Cache-Control max-age on 404/410
+NEGATIVE_CACHE_MAX_ENTRIES: Final[int] = 4096
+
+# Vault IDs remembered per container (deferred vault counting)
+VAULT_KNOWN_IDS_MAX: Final[int] = 1024
+
+# Expiry index (write-sharded GSI used by cleanup)
+EXPIRY_BUCKET_SECONDS: Final[int] = 3600  # 1 hour buckets
+EXPIRY_INDEX_SHARDS: Final[int] = 8
+EXPIRY_INDEX_LOOKBACK_HOURS: Final[int] = 48  # Matches DynamoDB TTL deletion lag
+
+# Parallel segmented scan (cleanup and maintenance jobs)
+PARALLEL_SCAN_BYTES_PER_SEGMENT: Final[int] = 134217728  # 128 MB
+PARALLEL_SCAN_MAX_SEGMENTS: Final[int] = 16
+
+# Batched deletes (cleanup)
+DYNAMODB_BATCH_WRITE_SIZE: Final[int] = 25  # BatchWriteItem limit
+DYNAMODB_BATCH_WRITE_MAX_RETRIES: Final[int] = 5
+S3_DELETE_BATCH_SIZE: Final[int] = 1000  # DeleteObjects limit
+
+# Global statistics counter (write-sharded; BatchGetItem reads at most 100 keys,
+# one of which is the legacy unsharded record)
+STATS_DEFAULT_SHARDS: Final[int] = 10
+STATS_MAX_SHARDS: Final[int] = 99
+
 # Abuse reporting
-AUTO_DELETE_THRESHOLD: Final[int] = 3  # Number of reports before auto-delete
+AUTO_DELETE_THRESHOLD: Final[int] = 3  # Distinct reporters before review (or opt-in delete)
 
 # Access modes
 ACCESS_MODE_ONE_TIME: Final[str] = "one_time"
@@ -45,8 +96,11 @@ PIN_FILE_ID_LENGTH: Final[int] = 6
 PIN_MAX_ATTEMPTS: Final[int] = 3
 PIN_LOCKOUT_SECONDS: Final[int] = 43200  # 12 hours
 PIN_SESSION_TIMEOUT_SECONDS: Final[int] = 60
-PIN_PBKDF2_ITERATIONS: Final[int] = 100000
+PIN_PBKDF2_ITERATIONS: Final[int] = 100000  # Also the cost of legacy (unversioned) hashes
+PIN_HASH_DEFAULT_SCHEME: Final[str] = f"pbkdf2-sha256${PIN_PBKDF2_ITERATIONS}"
 PIN_SALT_BYTES: Final[int] = 32
+PIN_ID_SPACE: Final[int] = 1000000  # 000000-999999
+PIN_ID_MAX_RETRIES: Final[int] = 5  # Only hit after the counter wraps
 
 # HTTP Status Codes (for documentation and consistency)
 HTTP_OK: Final[int] = 200
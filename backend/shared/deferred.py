@@ -0,0 +1,247 @@
+"""Deferred side effects (statistics, abuse auto-delete, eager cleanup).
+
+Handlers enqueue non-critical writes with defer() once their critical write
+has committed. The tasks are sent to an SQS queue (DEFERRED_QUEUE_URL) that is
+consumed in batches by the deferred_worker Lambda, which coalesces them with
+run_tasks(). Without a queue configured, tasks run inline as before.
+
+Tests swap the queue for an InMemoryQueue with set_queue().
+"""
+
+import json
+import logging
+import os
+from collections import defaultdict
+from typing import Any, Protocol
+
+import boto3
+
+logger = logging.getLogger(__name__)
+
+DEFERRED_QUEUE_URL = os.environ.get("DEFERRED_QUEUE_URL")
+
+# Task types
+TASK_COUNT_DOWNLOADS = "count_downloads"  # table_name, file_size, downloads
+TASK_COUNT_VAULT_DOWNLOADS = "count_vault_downloads"  # table_name, file_id, file_size
+TASK_DELETE_CONSUMED = "delete_consumed"  # table_name, file_id, payload_split (payload only)
+TASK_ABUSE_THRESHOLD = "abuse_threshold"  # table_name, bucket_name, file_id, report_count
+
+
+class DeferredQueue(Protocol):
+    """Destination for deferred tasks."""
+
+    def send(self, task: dict[str, Any]) -> None: ...
+
+
+class SqsQueue:
+    """Send deferred tasks to an SQS queue, one message per task."""
+
+    def __init__(self, queue_url: str):
+        self.queue_url = queue_url
+        self.client = boto3.client("sqs")
+
+    def send(self, task: dict[str, Any]) -> None:
+        self.client.send_message(QueueUrl=self.queue_url, MessageBody=json.dumps(task))
+
+
+class InMemoryQueue:
+    """Collect deferred tasks in memory (tests and local runs)."""
+
+    def __init__(self):
+        self.tasks: list[dict[str, Any]] = []
+
+    def send(self, task: dict[str, Any]) -> None:
+        self.tasks.append(task)
+
+    def drain(self) -> list[str]:
+        """Run and clear the collected tasks; returns the IDs of failed ones."""
+        tasks = {str(i): task for i, task in enumerate(self.tasks)}
+        self.tasks = []
+        return run_tasks(tasks)
+
+
+_queue: DeferredQueue | None = SqsQueue(DEFERRED_QUEUE_URL) if DEFERRED_QUEUE_URL else None
+
+
+def set_queue(queue: DeferredQueue | None) -> None:
+    """Replace the deferred queue (None runs tasks inline)."""
+    global _queue
+    _queue = queue
+
+
+def defer(task_type: str, **payload: Any) -> None:
+    """
+    Enqueue a side effect for the deferred worker.
+
+    The enqueue itself (one SendMessage) runs synchronously on the request
+    path; only the task runs later.
+
+    Never raises: if the task cannot be enqueued it runs inline instead, and
+    inline failures are only logged, matching the old best-effort behaviour.
+
+    Args:
+        task_type: One of the TASK_* constants
+        **payload: JSON-serializable task arguments
+    """
+    task = {"type": task_type, **payload}
+
+    if _queue is not None:
+        try:
+            _queue.send(task)
+            return
+        except Exception as e:
+            # ClientError, BotoCoreError (connection/read timeouts), bad payloads
+            logger.warning(f"Failed to enqueue {task_type}, running inline: {e}")
+
+    try:
+        failed = run_tasks({task_type: task})
+    except Exception as e:
+        logger.warning(f"Deferred task {task_type} raised inline: {e}")
+        return
+    if failed:
+        logger.warning(f"Deferred task {task_type} failed inline")
+
+
+def run_tasks(tasks: dict[str, dict[str, Any]]) -> list[str]:
+    """
+    Run a batch of deferred tasks, coalescing writes of the same kind.
+
+    - count_downloads: one statistics increment per table for the whole batch
+    - count_vault_downloads: one download_count ADD per vault, then counted
+      globally with count_downloads. Only a failed ADD retries the task; if
+      the global increment fails, the vault downloads are re-enqueued as a
+      separate count_downloads task so the ADD is not repeated
+    - delete_consumed: the consumed record keeps a tombstone for the 410 (see
+      strip_consumed_records); split payload items are deleted in one
+      BatchWriteItem run per table
+    - abuse_threshold: deleted one by one (object, record and payload item)
+
+    Args:
+        tasks: Task ID (e.g. SQS message ID) to task
+
+    Returns:
+        IDs of the tasks that failed and should be retried
+    """
+    from .dynamo import (
+        add_vault_downloads,
+        batch_delete_file_records,
+        increment_download_counter,
+        payload_key,
+        strip_consumed_records,
+    )
+
+    failed: list[str] = []
+    counts: dict[str, list[str]] = defaultdict(list)
+    vault_counts: dict[str, list[str]] = defaultdict(list)
+    deletes: dict[str, list[str]] = defaultdict(list)
+
+    for task_id, task in tasks.items():
+        task_type = task.get("type")
+        if task_type == TASK_COUNT_DOWNLOADS:
+            counts[task["table_name"]].append(task_id)
+        elif task_type == TASK_COUNT_VAULT_DOWNLOADS:
+            vault_counts[task["table_name"]].append(task_id)
+        elif task_type == TASK_DELETE_CONSUMED:
+            deletes[task["table_name"]].append(task_id)
+        elif task_type == TASK_ABUSE_THRESHOLD:
+            if not _delete_reported_share(task):
+                failed.append(task_id)
+        else:
+            # Retrying cannot fix an unknown task; drop it
+            logger.error(f"Dropping unknown deferred task {task_id}: {task_type}")
+
+    # Vault downloads already added to their vault, per table: [downloads, bytes]
+    vault_totals: dict[str, list[int]] = defaultdict(lambda: [0, 0])
+    for table_name, task_ids in vault_counts.items():
+        by_vault: dict[str, list[str]] = defaultdict(list)
+        for task_id in task_ids:
+            by_vault[tasks[task_id]["file_id"]].append(task_id)
+        failed_ids = add_vault_downloads(
+            table_name, {file_id: len(ids) for file_id, ids in by_vault.items()}
+        )
+        for file_id, ids in by_vault.items():
+            if file_id in failed_ids:
+                failed.extend(ids)
+                continue
+            vault_totals[table_name][0] += len(ids)
+            vault_totals[table_name][1] += sum(int(tasks[i].get("file_size", 0)) for i in ids)
+
+    for table_name in dict.fromkeys([*counts, *vault_totals]):
+        task_ids = counts.get(table_name, [])
+        vault_downloads, vault_bytes = vault_totals.get(table_name, (0, 0))
+        downloads = sum(int(tasks[task_id].get("downloads", 1)) for task_id in task_ids)
+        file_size = sum(int(tasks[task_id].get("file_size", 0)) for task_id in task_ids)
+        try:
+            increment_download_counter(
+                table_name, file_size=file_size + vault_bytes, downloads=downloads + vault_downloads
+            )
+        except Exception as e:
+            logger.warning(f"Failed to increment download counter: {e}")
+            failed.extend(task_ids)
+            if vault_downloads:
+                defer(
+                    TASK_COUNT_DOWNLOADS,
+                    table_name=table_name,
+                    file_size=vault_bytes,
+                    downloads=vault_downloads,
+                )
+
+    for table_name, task_ids in deletes.items():
+        records = {tasks[task_id]["file_id"]: task_id for task_id in task_ids}
+        payloads = {
+            payload_key(file_id): task_id
+            for file_id, task_id in records.items()
+            if tasks[task_id].get("payload_split")
+        }
+        failed_ids = strip_consumed_records(table_name, list(records))
+        failed_payloads = batch_delete_file_records(table_name, list(payloads)) if payloads else []
+        failed.extend(
+            dict.fromkeys(
+                [records[file_id] for file_id in failed_ids]
+                + [payloads[key] for key in failed_payloads]
+            )
+        )
+
+    return failed
+
+
+def _delete_reported_share(task: dict[str, Any]) -> bool:
+    """
+    Auto-delete a share reported by AUTO_DELETE_THRESHOLD distinct reporters.
+
+    Returns:
+        True if the share is gone (or was already gone)
+    """
+    from .dynamo import batch_delete_file_records, get_file_record, payload_key
+    from .s3 import delete_files
+
+    table_name = task["table_name"]
+    file_id = task["file_id"]
+
+    record = get_file_record(table_name, file_id, ["content_type", "s3_key", "payload_split"])
+    if record is None:
+        return True
+
+    # Files and offloaded texts have an S3 object
+    if record.get("s3_key"):
+        failed_keys = delete_files(task["bucket_name"], [record["s3_key"]])
+        if failed_keys:
+            logger.error(f"Error deleting reported file {file_id}: {failed_keys}")
+            return False
+
+    file_ids = [file_id]
+    if record.get("payload_split"):
+        file_ids.append(payload_key(file_id))
+    if batch_delete_file_records(table_name, file_ids):
+        return False
+
+    logger.warning(
+        json.dumps(
+            {
+                "action": "abuse_auto_deleted",
+                "file_id": file_id,
+                "report_count": task.get("report_count"),
+            }
+        )
+    )
+    return True
@@ -1,11 +1,25 @@
 """DynamoDB helper functions."""
 
+import base64
+import binascii
+import functools
+import hmac
 import logging
+import math
+import os
+import queue
+import random
+import secrets
+import threading
 import time
+from collections import OrderedDict
+from collections.abc import Callable, Iterator, Sequence
+from concurrent.futures import ThreadPoolExecutor
 from datetime import datetime
-from typing import Any
+from typing import Any, NoReturn
 
 import boto3
+from boto3.dynamodb.types import Binary, TypeDeserializer
 from botocore.exceptions import ClientError
 
 from .constants import (
@@ -13,10 +27,28 @@ from .constants import (
     ACCESS_MODE_ONE_TIME,
     ACCESS_MODE_PIN,
     DOWNLOAD_RESERVATION_TIMEOUT,
+    DYNAMODB_BATCH_WRITE_MAX_RETRIES,
+    DYNAMODB_BATCH_WRITE_SIZE,
+    EXPIRY_BUCKET_SECONDS,
+    EXPIRY_INDEX_LOOKBACK_HOURS,
+    EXPIRY_INDEX_SHARDS,
+    FILE_ID_MAX_RETRIES,
+    INLINE_TEXT_MAX_BYTES,
+    NEGATIVE_CACHE_MAX_ENTRIES,
+    NEGATIVE_CACHE_TTL_SECONDS,
+    PARALLEL_SCAN_BYTES_PER_SEGMENT,
+    PARALLEL_SCAN_MAX_SEGMENTS,
+    PIN_ID_MAX_RETRIES,
+    PIN_ID_SPACE,
     PIN_LOCKOUT_SECONDS,
     PIN_MAX_ATTEMPTS,
     PIN_SESSION_TIMEOUT_SECONDS,
+    RECORD_CACHE_MAX_ENTRIES,
+    STATS_DEFAULT_SHARDS,
+    STATS_MAX_SHARDS,
+    VAULT_KNOWN_IDS_MAX,
 )
+from .deferred import TASK_COUNT_DOWNLOADS, TASK_COUNT_VAULT_DOWNLOADS, defer
 from .exceptions import (
     FileAlreadyDownloadedError,
     FileExpiredError,
@@ -26,22 +58,189 @@ from .exceptions import (
     SessionExpiredError,
     ValidationError,
 )
-from .pin_utils import generate_short_file_id
+from .metrics import emit_metrics
+from .pin_utils import generate_short_file_id, permute_pin_file_id
 
 logger = logging.getLogger(__name__)
 
+# Separate write-once item for large text payloads ("<file_id>#payload")
+PAYLOAD_KEY_SUFFIX = "#payload"
+
+# Mutable PIN share state that verify_pin_and_download must read fresh
+PIN_SESSION_ATTRIBUTES = ("downloaded", "attempts_left", "session_expires", "locked_until")
+
+# Counter record for 6-digit PIN file IDs (next_index, live_count)
+PIN_ID_COUNTER_KEY = "PIN_ID_COUNTER"
+
+# Global download statistics, write-sharded as "STATS#<shard>". The unsharded
+# "STATS" record predates sharding and is still summed by get_statistics.
+# Raise STATS_SHARDS freely; lowering it hides the counts in the dropped shards.
+STATS_KEY = "STATS"
+STATS_SHARD_SEPARATOR = "#"
+
+
+def _stats_shard_count(value: str | int) -> int:
+    """Clamp a configured shard count to [1, STATS_MAX_SHARDS] (one BatchGetItem)."""
+    shards = int(value)
+    clamped = max(1, min(STATS_MAX_SHARDS, shards))
+    if clamped != shards:
+        logger.warning(f"STATS_SHARDS={shards} is out of range, using {clamped}")
+    return clamped
+
+
+STATS_SHARDS = _stats_shard_count(os.environ.get("STATS_SHARDS", STATS_DEFAULT_SHARDS))
+
+# Deferred vault download counting. Containers remember the vault IDs they
+# have served and send their later downloads to the deferred queue instead of
+# updating the record, so the worker writes one ADD per vault per batch.
+VAULT_COUNT_DEFERRED = os.environ.get("VAULT_COUNT_DEFERRED", "false").lower() == "true"
+
 # Initialize DynamoDB client
 dynamodb = boto3.resource("dynamodb")
 
+# boto3 resources are not thread-safe; parallel scan workers get their own
+_thread_local = threading.local()
+
+# Error responses are not unmarshalled by the resource layer
+_deserializer = TypeDeserializer()
+
+# Container cache of immutable record fields (0 disables). Entries are only
+# used while their record_version still matches the item in the table.
+RECORD_CACHE_TTL_SECONDS = float(os.environ.get("RECORD_CACHE_TTL_SECONDS", "300"))
+
+# Fields that never change after a record (or payload item) is written and that
+# the download paths need (callers of get_cached_record pick their own subset)
+IMMUTABLE_RECORD_ATTRIBUTES = (
+    "file_id",
+    "content_type",
+    "file_size",
+    "file_name",
+    "created_at",
+    "expires_at",
+    "access_mode",
+    "one_time",
+    "s3_key",
+    "chunk_manifest",
+    "payload_split",
+    "encrypted_text",
+    "salt",
+    "encrypted_key",
+    "pin_hash",
+)
+
+# Vault IDs this container has served (with VAULT_COUNT_DEFERRED, their later
+# downloads are read and their counts deferred)
+_known_vaults: dict[str, None] = {}
+
 
 def get_table(table_name: str):
     """Get DynamoDB table resource."""
     return dynamodb.Table(table_name)
 
 
+def _get_thread_table(table_name: str):
+    """Get a DynamoDB table resource owned by the current thread."""
+    resource = getattr(_thread_local, "dynamodb", None)
+    if resource is None:
+        resource = boto3.session.Session().resource("dynamodb")
+        _thread_local.dynamodb = resource
+    return resource.Table(table_name)
+
+
+def _condition_failure_item(error: ClientError) -> dict[str, Any] | None:
+    """
+    Get the item returned with a ConditionalCheckFailedException.
+
+    Requires ReturnValuesOnConditionCheckFailure="ALL_OLD" on the request.
+    The item comes back in DynamoDB JSON, so it is deserialized here.
+
+    Args:
+        error: ClientError raised by a conditional write
+
+    Returns:
+        Current item, or None if it does not exist
+    """
+    item = error.response.get("Item")
+    if not item:
+        return None
+    return {key: _deserializer.deserialize(value) for key, value in item.items()}
+
+
+def encode_ciphertext(encrypted_text: str) -> bytes | str:
+    """
+    Convert base64 ciphertext to raw bytes for a DynamoDB binary attribute.
+
+    Binary is ~25% smaller than the base64 string, which shrinks item size and
+    read/write capacity. Text that would not survive the round trip unchanged
+    (non-canonical or invalid base64) is stored as the original string.
+
+    Args:
+        encrypted_text: Base64 ciphertext from the client
+
+    Returns:
+        Raw ciphertext bytes, or the original string
+    """
+    try:
+        raw = base64.b64decode(encrypted_text, validate=True)
+    except (binascii.Error, ValueError):
+        return encrypted_text
+    if base64.b64encode(raw).decode("ascii") != encrypted_text:
+        return encrypted_text
+    return raw
+
+
+def decode_ciphertext(value: Binary | bytes | str) -> str:
+    """
+    Convert a stored encrypted_text back to the base64 string clients expect.
+
+    Accepts both binary (current) and string (legacy) attributes.
+    """
+    if isinstance(value, Binary):
+        value = value.value
+    if isinstance(value, bytes | bytearray):
+        return base64.b64encode(value).decode("ascii")
+    return value
+
+
+def _record_page_stats(stats: dict[str, float] | None, response: dict[str, Any]) -> None:
+    """Accumulate item counts and consumed capacity from a Scan/Query page."""
+    if stats is None:
+        return
+    stats["pages"] = stats.get("pages", 0) + 1
+    stats["scanned"] = stats.get("scanned", 0) + response.get("ScannedCount", 0)
+    stats["returned"] = stats.get("returned", 0) + response.get("Count", 0)
+    capacity = response.get("ConsumedCapacity", {}).get("CapacityUnits", 0)
+    stats["consumed_rcu"] = stats.get("consumed_rcu", 0) + float(capacity)
+
+
+def expiry_bucket_for(timestamp: int, shard: int | None = None) -> str:
+    """
+    Build the expiry index partition key for a Unix timestamp.
+
+    Records are grouped into hourly buckets and spread over EXPIRY_INDEX_SHARDS
+    partitions so that uploads expiring in the same hour do not all land on a
+    single GSI partition.
+
+    Args:
+        timestamp: Unix timestamp the record becomes due for cleanup
+        shard: Shard number (random when omitted)
+
+    Returns:
+        Index key in the form "<epoch_hour>#<shard>"
+    """
+    if shard is None:
+        shard = random.randrange(EXPIRY_INDEX_SHARDS)
+    return f"{timestamp // EXPIRY_BUCKET_SECONDS}#{shard}"
+
+
+def new_record_version() -> str:
+    """Generate the record_version that validates cached immutable fields."""
+    return secrets.token_hex(8)
+
+
 def create_file_record(
     table_name: str,
-    file_id: str,
+    file_id: str | None,
     file_size: int,
     expires_at: int,
     ip_hash: str,
@@ -51,27 +250,41 @@ def create_file_record(
     access_mode: str = ACCESS_MODE_ONE_TIME,
     salt: str | None = None,
     encrypted_key: str | None = None,
+    chunk_manifest: dict[str, int] | None = None,
+    text_bucket: str | None = None,
 ) -> dict[str, Any]:
     """
     Create a new file or text secret record in DynamoDB.
 
+    When file_id is None a short ID is allocated here. Uniqueness relies only on
+    the conditional put: a collision retries with a new ID (no pre-read), and
+    the allocation/collision counts are emitted as metrics.
+
     Args:
         table_name: DynamoDB table name
-        file_id: Unique file/secret ID (8-char URL-safe string)
+        file_id: Unique file/secret ID (8-char URL-safe string), or None to allocate
         file_size: File size in bytes (or encrypted text size)
         expires_at: Unix timestamp when secret expires
         ip_hash: SHA256 hash of uploader IP
         content_type: "file" or "text" (default: "file")
-        s3_key: S3 object key (required for files)
+        s3_key: S3 object key (required for files; files/<file_id> when allocated)
         encrypted_text: Base64 encrypted text (required for text secrets)
         access_mode: "one_time" (default) or "multi" for vault
         salt: Base64 salt for PBKDF2 (required for multi access)
         encrypted_key: Base64 encrypted AES key (required for multi access)
+        chunk_manifest: Ciphertext chunk layout for ranged downloads (files only)
+        text_bucket: Store the text in this S3 bucket (texts/<file_id>) instead of DynamoDB
 
     Returns:
-        Created record
+        Created record (includes the allocated file_id and s3_key)
+
+    Raises:
+        ValueError: If an explicit file_id already exists
+        RuntimeError: If a unique ID cannot be allocated within FILE_ID_MAX_RETRIES
     """
     table = get_table(table_name)
+    allocate_id = file_id is None
+    derive_s3_key = allocate_id and not s3_key
 
     record = {
         "file_id": file_id,
@@ -83,17 +296,28 @@ def create_file_record(
         "ip_hash": ip_hash,
         "report_count": 0,
         "access_mode": access_mode,
+        "expiry_bucket": expiry_bucket_for(expires_at),
+        "record_version": new_record_version(),
     }
 
     # Add type-specific fields
     if content_type == "file":
-        if not s3_key:
+        if not s3_key and not derive_s3_key:
             raise ValueError("s3_key required for file content_type")
         record["s3_key"] = s3_key
+        if chunk_manifest:
+            record["chunk_manifest"] = chunk_manifest
     elif content_type == "text":
         if not encrypted_text:
             raise ValueError("encrypted_text required for text content_type")
-        record["encrypted_text"] = encrypted_text
+        if text_bucket:
+            # Offloaded to S3 (see offload_text_payload); downloads get a presigned URL
+            record["s3_key"] = text_s3_key(file_id) if file_id else None
+        elif len(encrypted_text) > INLINE_TEXT_MAX_BYTES:
+            # Large payload goes to its own write-once item (see put_text_payload)
+            record["payload_split"] = True
+        else:
+            record["encrypted_text"] = encode_ciphertext(encrypted_text)
 
     # Add password-protection fields when present (any access mode)
     if salt:
@@ -104,67 +328,620 @@ def create_file_record(
     if access_mode == ACCESS_MODE_MULTI:
         record["download_count"] = 0
 
-    try:
-        table.put_item(Item=record, ConditionExpression="attribute_not_exists(file_id)")
-    except ClientError as e:
-        if e.response["Error"]["Code"] == "ConditionalCheckFailedException":
-            raise ValueError(f"File ID {file_id} already exists") from e
-        raise
+    collisions = 0
+    for _ in range(FILE_ID_MAX_RETRIES if allocate_id else 1):
+        if allocate_id:
+            file_id = generate_short_file_id()
+            record["file_id"] = file_id
+            if content_type == "file" and derive_s3_key:
+                record["s3_key"] = f"files/{file_id}"
+            elif text_bucket:
+                record["s3_key"] = text_s3_key(file_id)
+        try:
+            table.put_item(Item=record, ConditionExpression="attribute_not_exists(file_id)")
+            break
+        except ClientError as e:
+            if e.response["Error"]["Code"] != "ConditionalCheckFailedException":
+                raise
+            if not allocate_id:
+                raise ValueError(f"File ID {file_id} already exists") from e
+            collisions += 1
+            logger.warning(f"Short file ID collision: {file_id} (attempt {collisions})")
+    else:
+        emit_metrics({"FileIdAllocations": 1, "FileIdCollisions": collisions})
+        raise RuntimeError("Failed to generate unique file ID after max retries")
+
+    if record.get("payload_split"):
+        put_text_payload(table_name, record, encrypted_text)
+    elif content_type == "text" and text_bucket:
+        offload_text_payload(table_name, text_bucket, record, encrypted_text)
+    if allocate_id:
+        emit_metrics({"FileIdAllocations": 1, "FileIdCollisions": collisions})
     logger.info(f"Created {content_type} record ({access_mode}): {file_id}")
 
     return record
 
 
-def get_file_record(table_name: str, file_id: str) -> dict[str, Any] | None:
+class RecordCache:
+    """
+    Bounded TTL + LRU cache of immutable record fields.
+
+    Entries are keyed by file_id and stored with the record_version they were
+    read at, so a record that was deleted and re-created under the same ID
+    (short IDs and PIN IDs are reused) never serves stale fields.
+    """
+
+    def __init__(self, max_entries: int, ttl_seconds: float):
+        self.max_entries = max_entries
+        self.ttl_seconds = ttl_seconds
+        self._entries: OrderedDict[str, tuple[float, str, dict[str, Any]]] = OrderedDict()
+
+    def get(self, key: str, version: str | None = None) -> tuple[str, dict[str, Any]] | None:
+        """Get (version, fields) for a live entry, optionally requiring a version."""
+        entry = self._entries.get(key)
+        if entry is None:
+            return None
+        stored_at, stored_version, fields = entry
+        if time.monotonic() - stored_at > self.ttl_seconds or (
+            version is not None and version != stored_version
+        ):
+            del self._entries[key]
+            return None
+        self._entries.move_to_end(key)
+        return stored_version, fields
+
+    def put(self, key: str, version: str, fields: dict[str, Any]) -> None:
+        """Store fields read at a record version, evicting the least recently used."""
+        if self.ttl_seconds <= 0 or self.max_entries <= 0:
+            return
+        self._entries[key] = (time.monotonic(), version, fields)
+        self._entries.move_to_end(key)
+        while len(self._entries) > self.max_entries:
+            self._entries.popitem(last=False)
+
+    def discard(self, key: str) -> None:
+        """Drop an entry (e.g. the record is gone)."""
+        self._entries.pop(key, None)
+
+    def clear(self) -> None:
+        self._entries.clear()
+
+
+_record_cache = RecordCache(RECORD_CACHE_MAX_ENTRIES, RECORD_CACHE_TTL_SECONDS)
+
+
+# Results that stay true for a while, so repeating the read is wasted work
+NEGATIVE_RESULT_ERRORS = (
+    FileNotFoundError,
+    FileExpiredError,
+    FileAlreadyDownloadedError,
+    FileLockedException,
+)
+
+# file_id lookups by scope ("metadata:<id>") -> (cached until, error type, message)
+_negative_results: OrderedDict[str, tuple[float, type[Exception], str]] = OrderedDict()
+
+
+def check_negative_result(scope: str, file_id: str) -> None:
+    """
+    Re-raise a cached negative result for a lookup, if there is a live one.
+
+    Args:
+        scope: Operation the result belongs to (e.g. "download")
+        file_id: File ID
+
+    Raises:
+        The cached NEGATIVE_RESULT_ERRORS error
+    """
+    key = f"{scope}:{file_id}"
+    entry = _negative_results.get(key)
+    if entry is None:
+        return
+    cached_until, error_type, message = entry
+    if time.monotonic() >= cached_until:
+        del _negative_results[key]
+        return
+    raise error_type(message)
+
+
+def remember_negative_result(scope: str, file_id: str, error: Exception) -> None:
+    """
+    Cache a negative result for NEGATIVE_CACHE_TTL_SECONDS.
+
+    Scanners probing random IDs and clients re-polling consumed links get the
+    cached error instead of another DynamoDB read. The TTL is short so a
+    re-used ID (or a new share under a probed ID) is visible again quickly.
+
+    Args:
+        scope: Operation the result belongs to (e.g. "download")
+        file_id: File ID
+        error: One of NEGATIVE_RESULT_ERRORS
+    """
+    key = f"{scope}:{file_id}"
+    _negative_results[key] = (
+        time.monotonic() + NEGATIVE_CACHE_TTL_SECONDS,
+        type(error),
+        str(error),
+    )
+    _negative_results.move_to_end(key)
+    while len(_negative_results) > NEGATIVE_CACHE_MAX_ENTRIES:
+        _negative_results.popitem(last=False)
+
+
+def _negative_cached(scope: str) -> Callable[[Callable], Callable]:
+    """Serve and record NEGATIVE_RESULT_ERRORS of a (table_name, file_id) operation."""
+
+    def decorator(func: Callable) -> Callable:
+        @functools.wraps(func)
+        def wrapper(table_name: str, file_id: str, *args: Any, **kwargs: Any) -> Any:
+            check_negative_result(scope, file_id)
+            try:
+                return func(table_name, file_id, *args, **kwargs)
+            except NEGATIVE_RESULT_ERRORS as e:
+                remember_negative_result(scope, file_id, e)
+                raise
+
+        return wrapper
+
+    return decorator
+
+
+def _projection(attributes: Sequence[str]) -> dict[str, Any]:
+    """Build ProjectionExpression kwargs (placeholders avoid reserved words)."""
+    names = {f"#a{i}": name for i, name in enumerate(attributes)}
+    return {"ProjectionExpression": ", ".join(names), "ExpressionAttributeNames": names}
+
+
+def get_cached_record(
+    table_name: str,
+    file_id: str,
+    mutable_attributes: Sequence[str],
+    *,
+    immutable_attributes: Sequence[str],
+    scope: str,
+) -> dict[str, Any] | None:
+    """
+    Get a record, serving its immutable fields from the container cache.
+
+    Every call still does one GetItem: on a cache hit only mutable_attributes
+    and record_version are read, and the cached fields are used if the version
+    still matches, otherwise the record is read in full again. A hit saves
+    transferring (and unmarshalling) the immutable fields, not the request.
+    Mutable state is therefore always fresh. Records written before
+    record_version existed are never cached.
+
+    Each caller passes the immutable fields it needs and a scope naming its
+    cache entries, so one caller never caches (or sees) another's fields.
+
+    Args:
+        table_name: DynamoDB table name
+        file_id: File ID
+        mutable_attributes: Attributes that must be read from the table
+        immutable_attributes: Write-once attributes to read once and cache
+        scope: Caller the cache entries belong to (e.g. "metadata")
+
+    Returns:
+        Immutable fields merged with fresh mutable attributes, or None if the
+        record does not exist
+
+    Raises:
+        ClientError: If the read fails
+    """
+    table = get_table(table_name)
+    key = f"{scope}:{file_id}"
+    cached = _record_cache.get(key)
+
+    if cached is not None:
+        version, fields = cached
+        response = table.get_item(
+            Key={"file_id": file_id}, **_projection([*mutable_attributes, "record_version"])
+        )
+        fresh = response.get("Item")
+        if fresh is None:
+            _record_cache.discard(key)
+            return None
+        if fresh.get("record_version") == version:
+            return {**fields, **fresh}
+
+    attributes = dict.fromkeys([*immutable_attributes, *mutable_attributes, "record_version"])
+    response = table.get_item(Key={"file_id": file_id}, **_projection(list(attributes)))
+    record = response.get("Item")
+    if record is None:
+        _record_cache.discard(key)
+    elif record.get("record_version"):
+        fields = {name: record[name] for name in immutable_attributes if name in record}
+        _record_cache.put(key, record["record_version"], fields)
+    return record
+
+
+def get_file_record(
+    table_name: str, file_id: str, attributes: Sequence[str] | None = None
+) -> dict[str, Any] | None:
     """
     Get file record from DynamoDB.
 
     Args:
         table_name: DynamoDB table name
         file_id: File ID
+        attributes: Only fetch these attributes (skips e.g. inline encrypted_text)
 
     Returns:
         File record or None if not found
     """
     table = get_table(table_name)
+    kwargs = _projection(attributes) if attributes else {}
 
     try:
-        response = table.get_item(Key={"file_id": file_id})
+        response = table.get_item(Key={"file_id": file_id}, **kwargs)
         return response.get("Item")
     except ClientError as e:
         logger.error(f"Error getting file record {file_id}: {e}")
         return None
 
 
-def generate_unique_file_id(table_name: str, max_retries: int = 10) -> str:
+# Attributes of a pending multipart upload (upload_id is removed on completion)
+MULTIPART_ATTRIBUTES = (
+    "file_id",
+    "s3_key",
+    "file_size",
+    "expires_at",
+    "upload_id",
+    "part_size",
+    "part_count",
+    "upload_token_hash",
+    "chunk_manifest",
+)
+
+
+def start_multipart_upload(
+    table_name: str,
+    file_id: str,
+    upload_id: str,
+    part_size: int,
+    part_count: int,
+    upload_token_hash: str,
+) -> None:
+    """
+    Attach a pending multipart upload to a newly created file record.
+
+    The record keeps everything needed to resume: the S3 upload ID, the part
+    layout and the hash of the uploader's token. Downloads are refused while
+    upload_id is set (see begin_download).
+
+    Args:
+        table_name: DynamoDB table name
+        file_id: File ID (record must exist)
+        upload_id: S3 upload ID
+        part_size: Size of every part but the last, in bytes
+        part_count: Number of parts
+        upload_token_hash: SHA256 of the upload token
+    """
+    table = get_table(table_name)
+
+    try:
+        table.update_item(
+            Key={"file_id": file_id},
+            UpdateExpression=(
+                "SET upload_id = :upload_id, part_size = :part_size, "
+                "part_count = :part_count, upload_token_hash = :token_hash"
+            ),
+            ConditionExpression="attribute_exists(file_id)",
+            ExpressionAttributeValues={
+                ":upload_id": upload_id,
+                ":part_size": part_size,
+                ":part_count": part_count,
+                ":token_hash": upload_token_hash,
+            },
+        )
+        logger.info(f"Started multipart upload for {file_id} ({part_count} parts)")
+    except ClientError as e:
+        logger.error(f"Error starting multipart upload for {file_id}: {e}")
+        raise
+
+
+def get_multipart_upload(table_name: str, file_id: str, upload_token_hash: str) -> dict[str, Any]:
     """
-    Generate a short file ID that does not already exist in DynamoDB.
+    Get a pending multipart upload for its uploader.
+
+    A wrong token is reported like a missing upload, so the endpoint does not
+    reveal which IDs have uploads in progress.
+
+    Args:
+        table_name: DynamoDB table name
+        file_id: File ID
+        upload_token_hash: SHA256 of the token presented by the client
+
+    Returns:
+        Record with MULTIPART_ATTRIBUTES
 
     Raises:
-        RuntimeError: If a unique ID cannot be found within max_retries attempts
+        FileNotFoundError: If there is no pending upload for this token
+        FileExpiredError: If the share expired before the upload finished
+    """
+    table = get_table(table_name)
+
+    response = table.get_item(
+        Key={"file_id": file_id}, ConsistentRead=True, **_projection(MULTIPART_ATTRIBUTES)
+    )
+    record = response.get("Item")
+    if (
+        not record
+        or not record.get("upload_id")
+        or not hmac.compare_digest(record.get("upload_token_hash", ""), upload_token_hash)
+    ):
+        raise FileNotFoundError("Upload not found")
+
+    if record.get("expires_at", 0) <= int(time.time()):
+        raise FileExpiredError("File has expired")
+
+    return record
+
+
+def finish_multipart_upload(table_name: str, file_id: str, upload_id: str) -> None:
     """
-    for attempt in range(max_retries):
-        candidate = generate_short_file_id()
-        if get_file_record(table_name, candidate) is None:
-            return candidate
-        logger.warning(f"Short file ID collision: {candidate} (attempt {attempt + 1})")
-    raise RuntimeError("Failed to generate unique file ID after max retries")
+    Mark a multipart upload complete, making the file downloadable.
 
+    Args:
+        table_name: DynamoDB table name
+        file_id: File ID
+        upload_id: S3 upload ID that was completed
 
-def reserve_download(table_name: str, file_id: str) -> dict[str, Any]:
+    Raises:
+        FileNotFoundError: If the upload is no longer pending
     """
-    Atomically reserve file for download using conditional update.
+    table = get_table(table_name)
 
-    This prevents race conditions when multiple users try to download simultaneously.
-    A reservation is valid for DOWNLOAD_RESERVATION_TIMEOUT seconds (10 minutes).
-    If a previous reservation has expired, a new reservation can be made.
+    try:
+        table.update_item(
+            Key={"file_id": file_id},
+            UpdateExpression="REMOVE upload_id, upload_token_hash",
+            ConditionExpression="upload_id = :upload_id",
+            ExpressionAttributeValues={":upload_id": upload_id},
+        )
+        logger.info(f"Finished multipart upload for {file_id}")
+    except ClientError as e:
+        if e.response["Error"]["Code"] == "ConditionalCheckFailedException":
+            raise FileNotFoundError("Upload not found") from e
+        logger.error(f"Error finishing multipart upload for {file_id}: {e}")
+        raise
+
+
+def delete_pending_upload(table_name: str, file_id: str, upload_id: str) -> None:
+    """
+    Delete the record of an aborted multipart upload.
 
     Args:
         table_name: DynamoDB table name
         file_id: File ID
+        upload_id: S3 upload ID that was aborted
+
+    Raises:
+        FileNotFoundError: If the upload is no longer pending (e.g. completed)
+    """
+    table = get_table(table_name)
+
+    try:
+        table.delete_item(
+            Key={"file_id": file_id},
+            ConditionExpression="upload_id = :upload_id",
+            ExpressionAttributeValues={":upload_id": upload_id},
+        )
+        logger.info(f"Deleted aborted upload: {file_id}")
+    except ClientError as e:
+        if e.response["Error"]["Code"] == "ConditionalCheckFailedException":
+            raise FileNotFoundError("Upload not found") from e
+        logger.error(f"Error deleting aborted upload {file_id}: {e}")
+        raise
+
+
+def payload_key(file_id: str) -> str:
+    """Key of the write-once payload item belonging to a share."""
+    return f"{file_id}{PAYLOAD_KEY_SUFFIX}"
+
+
+def put_text_payload(table_name: str, record: dict[str, Any], encrypted_text: str) -> None:
+    """
+    Store a large encrypted text in its own write-once item.
+
+    The share record keeps only small mutable state (reservation, counters,
+    PIN attempts and session), so the frequent conditional updates on it are
+    billed for ~1 KB instead of the full payload. The payload item carries
+    the share's expires_at so TTL removes both.
+
+    If the payload cannot be written, the share record is removed again so no
+    share without content is left behind.
+
+    Args:
+        table_name: DynamoDB table name
+        record: Share record that was just created (payload_split set)
+        encrypted_text: Base64 encrypted text
+    """
+    table = get_table(table_name)
+
+    try:
+        table.put_item(
+            Item={
+                "file_id": payload_key(record["file_id"]),
+                "content_type": "payload",
+                "encrypted_text": encode_ciphertext(encrypted_text),
+                "expires_at": record["expires_at"],
+                "record_version": record["record_version"],
+            }
+        )
+    except ClientError as e:
+        logger.error(f"Error storing payload for {record['file_id']}: {e}")
+        try:
+            delete_file_record(table_name, record["file_id"])
+        except ClientError:
+            pass  # Already logged; TTL removes the record
+        raise
+
+
+def text_s3_key(file_id: str) -> str:
+    """S3 key of an offloaded text payload."""
+    return f"texts/{file_id}"
+
+
+def offload_text_payload(
+    table_name: str, bucket_name: str, record: dict[str, Any], encrypted_text: str
+) -> None:
+    """
+    Store a large encrypted text as an S3 object instead of in DynamoDB.
+
+    The share record then stays small whatever the text size, and the object
+    is deleted by the same stream and scheduled cleanup paths as files. As
+    with put_text_payload, the share record is removed again if the object
+    cannot be written.
+
+    Args:
+        table_name: DynamoDB table name
+        bucket_name: S3 bucket name
+        record: Share record that was just created (s3_key set to text_s3_key)
+        encrypted_text: Base64 encrypted text, stored as-is
+    """
+    from .s3 import put_file
+
+    try:
+        put_file(bucket_name, record["s3_key"], encrypted_text.encode("utf-8"))
+    except ClientError:
+        try:
+            delete_file_record(table_name, record["file_id"])
+        except ClientError:
+            pass  # Already logged; TTL removes the record
+        raise
+
+
+def load_text_payload(table_name: str, record: dict[str, Any]) -> dict[str, Any]:
+    """
+    Get a text record with encrypted_text as the base64 string clients expect.
+
+    Fetches the payload item when it is stored separately and decodes binary
+    ciphertext (string values from older records pass through). Payload items
+    are write-once, so they are cached for as long as the share's
+    record_version matches.
+
+    Args:
+        table_name: DynamoDB table name
+        record: Share record
 
     Returns:
-        File record with reservation timestamp
+        Record with base64 encrypted_text
+
+    Raises:
+        FileNotFoundError: If the payload item is missing (already cleaned up)
+    """
+    if record.get("payload_split"):
+        key = payload_key(record["file_id"])
+        version = record.get("record_version")
+        cached = _record_cache.get(key, version) if version else None
+        if cached is not None:
+            encrypted_text = cached[1]["encrypted_text"]
+        else:
+            payload = get_file_record(table_name, key)
+            if not payload:
+                raise FileNotFoundError("File not found")
+            encrypted_text = payload["encrypted_text"]
+            if version and payload.get("record_version") == version:
+                _record_cache.put(key, version, {"encrypted_text": encrypted_text})
+    else:
+        encrypted_text = record["encrypted_text"]
+    return {**record, "encrypted_text": decode_ciphertext(encrypted_text)}
+
+
+def _download_update(vault: bool, current_time: int) -> dict[str, Any]:
+    """
+    Build the begin_download update for one access mode.
+
+    One-time records only get reserved_at; vaults only get last_downloaded_at
+    and download_count. Each condition also rejects the other mode, so a wrong
+    mode fails instead of writing the wrong attributes.
+    """
+    if vault:
+        return {
+            "UpdateExpression": "SET last_downloaded_at = :now_iso ADD download_count :inc",
+            "ConditionExpression": (
+                "expires_at > :now AND attribute_not_exists(upload_id) AND access_mode = :multi"
+            ),
+            "ExpressionAttributeValues": {
+                ":now": current_time,
+                ":now_iso": datetime.utcnow().isoformat(),
+                ":multi": ACCESS_MODE_MULTI,
+                ":inc": 1,
+            },
+        }
+    return {
+        "UpdateExpression": "SET reserved_at = :now",
+        "ConditionExpression": (
+            "expires_at > :now AND attribute_not_exists(upload_id) AND "
+            "(attribute_not_exists(access_mode) OR access_mode <> :multi) AND "
+            "downloaded = :false AND "
+            "(attribute_not_exists(reserved_at) OR reserved_at < :cutoff)"
+        ),
+        "ExpressionAttributeValues": {
+            ":false": False,
+            ":now": current_time,
+            ":cutoff": current_time - DOWNLOAD_RESERVATION_TIMEOUT,
+            ":multi": ACCESS_MODE_MULTI,
+        },
+    }
+
+
+def _raise_download_failure(
+    record: dict[str, Any] | None, current_time: int, error: ClientError
+) -> NoReturn:
+    """Raise the error a failed begin_download condition stands for (ALL_OLD item)."""
+    if not record:
+        raise FileNotFoundError("File not found") from error
+
+    # Multipart upload still in progress (transient, so not negative-cached)
+    if record.get("upload_id"):
+        raise FileReservedError("File upload not complete") from error
+
+    if record.get("access_mode") != ACCESS_MODE_MULTI and record.get("downloaded"):
+        raise FileAlreadyDownloadedError("File already downloaded") from error
+
+    if record.get("expires_at", 0) <= current_time:
+        raise FileExpiredError("File has expired") from error
+
+    # File is currently reserved (reservation not expired yet)
+    reserved_at = record.get("reserved_at", 0)
+    if reserved_at >= current_time - DOWNLOAD_RESERVATION_TIMEOUT:
+        raise FileReservedError("File is currently being downloaded") from error
+
+    # Unknown condition failure
+    raise error
+
+
+@_negative_cached("download")
+def begin_download(table_name: str, file_id: str, access_mode: str | None = None) -> dict[str, Any]:
+    """
+    Start a download with a conditional update built for its access mode.
+
+    The caller does not read the record first to learn its access_mode:
+    - One-time: reserves the file for DOWNLOAD_RESERVATION_TIMEOUT seconds
+      (10 minutes). If a previous reservation has expired, a new reservation
+      can be made. The frontend must call confirm afterwards.
+    - Multi-access (vault): increments download_count until the TTL expires.
+
+    The update is built for the access_mode the client read from /metadata,
+    so a download is a single write. Without a mode (older clients) the
+    one-time update is used. A wrong mode fails its condition (the ALL_OLD
+    item shows the real one) and is retried once with the other update.
+
+    Not-found, expired and already-downloaded results are cached per container
+    for NEGATIVE_CACHE_TTL_SECONDS (see remember_negative_result).
+
+    With VAULT_COUNT_DEFERRED set, vaults this container has already served
+    are read instead of updated and their counts go to the deferred queue
+    (see add_vault_downloads), keeping the write off hot vault links.
+
+    Args:
+        table_name: DynamoDB table name
+        file_id: File ID
+        access_mode: Access mode the client expects (None = one-time)
+
+    Returns:
+        Updated file record (reserved_at / download_count set)
 
     Raises:
         FileReservedError: If file is currently reserved for download
@@ -174,54 +951,160 @@ def reserve_download(table_name: str, file_id: str) -> dict[str, Any]:
     """
     table = get_table(table_name)
     current_time = int(time.time())
-    reservation_cutoff = current_time - DOWNLOAD_RESERVATION_TIMEOUT
 
-    try:
-        response = table.update_item(
-            Key={"file_id": file_id},
-            UpdateExpression="SET reserved_at = :now",
-            ConditionExpression=(
-                "downloaded = :false AND expires_at > :current AND "
-                "(attribute_not_exists(reserved_at) OR reserved_at < :cutoff)"
-            ),
-            ExpressionAttributeValues={
-                ":false": False,
-                ":now": current_time,
-                ":current": current_time,
-                ":cutoff": reservation_cutoff,
-            },
-            ReturnValues="ALL_NEW",
+    if VAULT_COUNT_DEFERRED and file_id in _known_vaults:
+        record = _begin_deferred_vault_download(table_name, file_id, current_time)
+        if record is not None:
+            return record
+
+    vault = access_mode == ACCESS_MODE_MULTI
+    for attempt in range(2):
+        try:
+            response = table.update_item(
+                Key={"file_id": file_id},
+                ReturnValues="ALL_NEW",
+                ReturnValuesOnConditionCheckFailure="ALL_OLD",
+                **_download_update(vault, current_time),
+            )
+            record = response["Attributes"]
+            break
+
+        except ClientError as e:
+            if e.response["Error"]["Code"] != "ConditionalCheckFailedException":
+                logger.error(f"Error starting download for {file_id}: {e}")
+                raise
+
+            # Check why the update failed (item returned with the error)
+            current = _condition_failure_item(e)
+            if (
+                attempt == 0
+                and current
+                and (current.get("access_mode") == ACCESS_MODE_MULTI) != vault
+            ):
+                # Client sent the wrong access mode; retry with the matching update
+                vault = not vault
+                continue
+            _raise_download_failure(current, current_time, e)
+
+    if record.get("access_mode") == ACCESS_MODE_MULTI:
+        logger.info(f"Vault download #{record.get('download_count', 1)} for: {file_id}")
+        if VAULT_COUNT_DEFERRED:
+            _remember_vault(file_id)
+
+        # Count globally after the response (one-time files count on confirm)
+        defer(
+            TASK_COUNT_DOWNLOADS, table_name=table_name, file_size=int(record.get("file_size", 0))
         )
+    else:
         logger.info(f"Reserved file for download: {file_id}")
-        return response["Attributes"]
 
-    except ClientError as e:
-        error_code = e.response["Error"]["Code"]
+    return record
 
-        if error_code == "ConditionalCheckFailedException":
-            # Check why reservation failed
-            record = get_file_record(table_name, file_id)
 
-            if not record:
-                raise FileNotFoundError("File not found") from e
+def _remember_vault(file_id: str) -> None:
+    """Remember a vault file_id so later downloads defer their count."""
+    if len(_known_vaults) >= VAULT_KNOWN_IDS_MAX:
+        # Drop the oldest entry (dicts keep insertion order)
+        del _known_vaults[next(iter(_known_vaults))]
+    _known_vaults[file_id] = None
 
-            if record.get("downloaded"):
-                raise FileAlreadyDownloadedError("File already downloaded") from e
 
-            if record.get("expires_at", 0) <= current_time:
-                raise FileExpiredError("File has expired") from e
+def _begin_deferred_vault_download(
+    table_name: str, file_id: str, current_time: int
+) -> dict[str, Any] | None:
+    """
+    Serve a known vault download from a read, deferring its count.
 
-            # File is currently reserved (reservation not expired yet)
-            reserved_at = record.get("reserved_at", 0)
-            if reserved_at >= reservation_cutoff:
-                raise FileReservedError("File is currently being downloaded") from e
+    The expiry check moves from the update condition to the read path. The
+    download count and global statistics are added by the deferred worker
+    (add_vault_downloads), so the returned download_count does not include
+    downloads still waiting in the queue.
 
-            # Unknown condition failure
-            raise
+    Args:
+        table_name: DynamoDB table name
+        file_id: Vault file ID remembered by this container
+        current_time: Current Unix timestamp
 
-        logger.error(f"Error reserving file for download {file_id}: {e}")
+    Returns:
+        File record with this download included in download_count, or None if
+        the record is no longer a vault (the caller falls back to the
+        conditional update)
+
+    Raises:
+        FileExpiredError: If the vault has expired
+        FileNotFoundError: If the vault no longer exists
+    """
+    try:
+        record = get_cached_record(
+            table_name,
+            file_id,
+            ["download_count"],
+            immutable_attributes=IMMUTABLE_RECORD_ATTRIBUTES,
+            scope="download",
+        )
+    except ClientError as e:
+        logger.error(f"Error reading vault {file_id}: {e}")
         raise
 
+    if not record:
+        _known_vaults.pop(file_id, None)
+        raise FileNotFoundError("File not found")
+
+    if record.get("access_mode") != ACCESS_MODE_MULTI:
+        _known_vaults.pop(file_id, None)
+        return None
+
+    if record.get("expires_at", 0) <= current_time:
+        raise FileExpiredError("File has expired")
+
+    download_count = int(record.get("download_count", 0)) + 1
+    logger.info(f"Vault download #{download_count} for: {file_id} (deferred)")
+
+    defer(
+        TASK_COUNT_VAULT_DOWNLOADS,
+        table_name=table_name,
+        file_id=file_id,
+        file_size=int(record.get("file_size", 0)),
+    )
+    return {**record, "download_count": download_count}
+
+
+def add_vault_downloads(table_name: str, downloads: dict[str, int]) -> list[str]:
+    """
+    Add deferred vault download counts with ADD, one update per vault.
+
+    Each update (download_count, last_downloaded_at) is guarded on the record
+    still existing, so a deleted vault is not recreated; its downloads are
+    treated as written.
+
+    Args:
+        table_name: DynamoDB table name
+        downloads: Vault file_id to number of downloads
+
+    Returns:
+        File IDs whose count could not be written (to retry)
+    """
+    table = get_table(table_name)
+    now_iso = datetime.utcnow().isoformat()
+    failed: list[str] = []
+
+    for file_id, count in downloads.items():
+        try:
+            table.update_item(
+                Key={"file_id": file_id},
+                UpdateExpression="SET last_downloaded_at = :now_iso ADD download_count :inc",
+                ConditionExpression="attribute_exists(file_id)",
+                ExpressionAttributeValues={":now_iso": now_iso, ":inc": count},
+            )
+        except ClientError as e:
+            if e.response["Error"]["Code"] == "ConditionalCheckFailedException":
+                logger.info(f"Vault {file_id} was deleted before its downloads were counted")
+            else:
+                logger.warning(f"Failed to add vault downloads for {file_id}: {e}")
+                failed.append(file_id)
+
+    return failed
+
 
 def mark_downloaded(table_name: str, file_id: str) -> dict[str, Any]:
     """
@@ -247,15 +1130,19 @@ def mark_downloaded(table_name: str, file_id: str) -> dict[str, Any]:
     try:
         response = table.update_item(
             Key={"file_id": file_id},
-            UpdateExpression="SET downloaded = :true, downloaded_at = :now",
+            UpdateExpression=(
+                "SET downloaded = :true, downloaded_at = :now, expiry_bucket = :bucket"
+            ),
             ConditionExpression="downloaded = :false AND expires_at > :current",
             ExpressionAttributeValues={
                 ":true": True,
                 ":false": False,
                 ":now": datetime.utcnow().isoformat(),
                 ":current": current_time,
+                ":bucket": expiry_bucket_for(current_time),
             },
             ReturnValues="ALL_NEW",
+            ReturnValuesOnConditionCheckFailure="ALL_OLD",
         )
         logger.info(f"Marked file as downloaded: {file_id}")
         return response["Attributes"]
@@ -265,7 +1152,7 @@ def mark_downloaded(table_name: str, file_id: str) -> dict[str, Any]:
 
         if error_code == "ConditionalCheckFailedException":
             # File was already downloaded or expired - check which
-            record = get_file_record(table_name, file_id)
+            record = _condition_failure_item(e)
 
             if not record:
                 raise FileNotFoundError("File not found") from e
@@ -306,24 +1193,31 @@ def confirm_download(table_name: str, file_id: str) -> dict[str, Any]:
     try:
         response = table.update_item(
             Key={"file_id": file_id},
-            UpdateExpression="SET downloaded = :true, downloaded_at = :now",
-            ConditionExpression="downloaded = :false AND attribute_exists(reserved_at)",
+            UpdateExpression=(
+                "SET downloaded = :true, downloaded_at = :now, expiry_bucket = :bucket"
+            ),
+            # Vaults carry reserved_at too (begin_download) but are never consumed
+            ConditionExpression=(
+                "downloaded = :false AND attribute_exists(reserved_at) AND "
+                "(attribute_not_exists(access_mode) OR access_mode <> :multi)"
+            ),
             ExpressionAttributeValues={
                 ":true": True,
                 ":false": False,
                 ":now": datetime.utcnow().isoformat(),
+                ":bucket": expiry_bucket_for(int(time.time())),
+                ":multi": ACCESS_MODE_MULTI,
             },
             ReturnValues="ALL_NEW",
+            ReturnValuesOnConditionCheckFailure="ALL_OLD",
         )
         record = response["Attributes"]
         logger.info(f"Confirmed download for file: {file_id}")
 
-        # Increment global download counter
-        try:
-            increment_download_counter(table_name, file_size=record.get("file_size", 0))
-        except Exception as e:
-            # Don't fail confirmation if counter increment fails
-            logger.warning(f"Failed to increment download counter: {e}")
+        # Count globally after the response
+        defer(
+            TASK_COUNT_DOWNLOADS, table_name=table_name, file_size=int(record.get("file_size", 0))
+        )
 
         return record
 
@@ -332,7 +1226,7 @@ def confirm_download(table_name: str, file_id: str) -> dict[str, Any]:
 
         if error_code == "ConditionalCheckFailedException":
             # Check why confirmation failed
-            record = get_file_record(table_name, file_id)
+            record = _condition_failure_item(e)
 
             if not record:
                 raise FileNotFoundError("File not found") from e
@@ -340,168 +1234,476 @@ def confirm_download(table_name: str, file_id: str) -> dict[str, Any]:
             if record.get("downloaded"):
                 raise FileAlreadyDownloadedError("File already confirmed as downloaded") from e
 
+            if record.get("access_mode") == ACCESS_MODE_MULTI:
+                raise FileNotFoundError("Vault downloads need no confirmation") from e
+
             # No reservation exists - shouldn't happen in normal flow
             logger.warning(f"Confirmation attempted without reservation: {file_id}")
             raise FileNotFoundError("No active download reservation found") from e
 
-        logger.error(f"Error confirming download for {file_id}: {e}")
-        raise
+        logger.error(f"Error confirming download for {file_id}: {e}")
+        raise
+
+
+def increment_report_count(table_name: str, file_id: str, reporter_hash: str) -> int:
+    """
+    Increment abuse report count for a file, once per reporter.
+
+    The reporter hash is added to the record's reporters set in the same
+    update, so repeated reports from one reporter do not raise the count.
+
+    Args:
+        table_name: DynamoDB table name
+        file_id: File ID
+        reporter_hash: Hashed reporter identity (e.g. hash_ip_secure of the source IP)
+
+    Returns:
+        Report count (unchanged if this reporter already reported the file)
+    """
+    table = get_table(table_name)
+
+    try:
+        response = table.update_item(
+            Key={"file_id": file_id},
+            UpdateExpression=(
+                "SET report_count = if_not_exists(report_count, :zero) + :inc "
+                "ADD reporters :reporters"
+            ),
+            ConditionExpression="NOT contains(reporters, :reporter)",
+            ExpressionAttributeValues={
+                ":inc": 1,
+                ":zero": 0,
+                ":reporters": {reporter_hash},
+                ":reporter": reporter_hash,
+            },
+            ReturnValues="UPDATED_NEW",
+            ReturnValuesOnConditionCheckFailure="ALL_OLD",
+        )
+        new_count = response["Attributes"]["report_count"]
+        logger.info(f"Incremented report count for {file_id}: {new_count}")
+        return int(new_count)
+
+    except ClientError as e:
+        if e.response["Error"]["Code"] == "ConditionalCheckFailedException":
+            item = _condition_failure_item(e) or {}
+            logger.info(f"Duplicate abuse report ignored for {file_id}")
+            return int(item.get("report_count", 0))
+
+        logger.error(f"Error incrementing report count for {file_id}: {e}")
+        raise
+
+
+def delete_file_record(table_name: str, file_id: str) -> None:
+    """
+    Delete file record from DynamoDB.
+
+    Args:
+        table_name: DynamoDB table name
+        file_id: File ID
+    """
+    table = get_table(table_name)
+
+    try:
+        table.delete_item(Key={"file_id": file_id})
+        logger.info(f"Deleted file record: {file_id}")
+    except ClientError as e:
+        logger.error(f"Error deleting file record {file_id}: {e}")
+        raise
+
+
+def strip_consumed_records(table_name: str, file_ids: list[str]) -> list[str]:
+    """
+    Turn consumed one-time records into tombstones.
+
+    The inline encrypted_text is removed, but the record itself (downloaded,
+    expires_at) stays until the scheduled cleanup, so repeat downloads still
+    get 410 "already downloaded" rather than 404. Records that are gone or not
+    consumed are left alone.
+
+    Args:
+        table_name: DynamoDB table name
+        file_ids: Consumed file IDs
+
+    Returns:
+        File IDs that could not be stripped (to retry)
+    """
+    table = get_table(table_name)
+    failed: list[str] = []
+
+    for file_id in file_ids:
+        try:
+            table.update_item(
+                Key={"file_id": file_id},
+                UpdateExpression="REMOVE encrypted_text",
+                ConditionExpression="downloaded = :true",
+                ExpressionAttributeValues={":true": True},
+            )
+        except ClientError as e:
+            if e.response["Error"]["Code"] != "ConditionalCheckFailedException":
+                logger.warning(f"Failed to strip consumed record {file_id}: {e}")
+                failed.append(file_id)
+
+    return failed
+
+
+def batch_delete_file_records(table_name: str, file_ids: list[str]) -> list[str]:
+    """
+    Delete many file records using BatchWriteItem.
+
+    Records are deleted in chunks of DYNAMODB_BATCH_WRITE_SIZE (25). Unprocessed
+    items are retried with exponential backoff, up to
+    DYNAMODB_BATCH_WRITE_MAX_RETRIES times.
+
+    Args:
+        table_name: DynamoDB table name
+        file_ids: File IDs to delete
+
+    Returns:
+        File IDs that could not be deleted
+    """
+    failed: list[str] = []
+
+    for start in range(0, len(file_ids), DYNAMODB_BATCH_WRITE_SIZE):
+        chunk = file_ids[start : start + DYNAMODB_BATCH_WRITE_SIZE]
+        requests = [{"DeleteRequest": {"Key": {"file_id": file_id}}} for file_id in chunk]
+
+        for attempt in range(DYNAMODB_BATCH_WRITE_MAX_RETRIES + 1):
+            if attempt:
+                time.sleep(min(0.05 * 2**attempt, 1.0))
+            try:
+                response = dynamodb.batch_write_item(RequestItems={table_name: requests})
+            except ClientError as e:
+                logger.error(f"Error batch deleting {len(requests)} records: {e}")
+                break
+            requests = response.get("UnprocessedItems", {}).get(table_name, [])
+            if not requests:
+                break
+
+        failed.extend(request["DeleteRequest"]["Key"]["file_id"] for request in requests)
+
+    logger.info(f"Deleted {len(file_ids) - len(failed)} file records ({len(failed)} failed)")
+    return failed
+
+
+def query_due_items(
+    table_name: str,
+    index_name: str,
+    current_time: int,
+    lookback_hours: int = EXPIRY_INDEX_LOOKBACK_HOURS,
+    projection: str | None = None,
+    stats: dict[str, float] | None = None,
+    should_stop: Callable[[], bool] | None = None,
+) -> Iterator[dict[str, Any]]:
+    """
+    Yield records that are due for cleanup using the expiry index.
+
+    Queries every shard of each hourly bucket from lookback_hours ago up to the
+    current hour. Downloaded records are moved into the current bucket when they
+    are consumed, so they are picked up by the next run as well.
+
+    Args:
+        table_name: DynamoDB table name
+        index_name: Name of the expiry GSI (expiry_bucket / expires_at)
+        current_time: Unix timestamp used as the expiry cutoff
+        lookback_hours: Number of past hourly buckets to query
+        projection: Optional ProjectionExpression limiting returned attributes
+        stats: Optional dict that accumulates page counts and consumed RCU
+        should_stop: Optional callback checked after every page (including
+            pages the filter leaves empty); returning True ends the query
+
+    Yields:
+        Records that are expired or already downloaded
+    """
+    table = get_table(table_name)
+    current_bucket = current_time // EXPIRY_BUCKET_SECONDS
+
+    for bucket in range(current_bucket - lookback_hours, current_bucket + 1):
+        for shard in range(EXPIRY_INDEX_SHARDS):
+            query_kwargs: dict[str, Any] = {
+                "IndexName": index_name,
+                "KeyConditionExpression": "expiry_bucket = :bucket",
+                "FilterExpression": "expires_at <= :now OR downloaded = :true",
+                "ExpressionAttributeValues": {
+                    ":bucket": f"{bucket}#{shard}",
+                    ":now": current_time,
+                    ":true": True,
+                },
+                "ReturnConsumedCapacity": "TOTAL",
+            }
+            if projection:
+                query_kwargs["ProjectionExpression"] = projection
+
+            # Paginate through the bucket (Query returns max 1MB per request)
+            while True:
+                response = table.query(**query_kwargs)
+                _record_page_stats(stats, response)
+                yield from response.get("Items", [])
+                if should_stop is not None and should_stop():
+                    return
+
+                last_evaluated_key = response.get("LastEvaluatedKey")
+                if not last_evaluated_key:
+                    break
+                query_kwargs["ExclusiveStartKey"] = last_evaluated_key
+
+
+def scan_segments_for_table(table_name: str) -> int:
+    """
+    Pick a parallel scan segment count from the table size.
+
+    Uses one segment per PARALLEL_SCAN_BYTES_PER_SEGMENT of data, capped at
+    PARALLEL_SCAN_MAX_SEGMENTS. DescribeTable sizes are refreshed by DynamoDB
+    roughly every six hours, which is accurate enough for this purpose.
+
+    Args:
+        table_name: DynamoDB table name
+
+    Returns:
+        Number of scan segments (at least 1)
+    """
+    try:
+        table_size = get_table(table_name).table_size_bytes or 0
+    except ClientError as e:
+        logger.warning(f"Could not read table size for {table_name}: {e}")
+        return 1
+
+    segments = math.ceil(table_size / PARALLEL_SCAN_BYTES_PER_SEGMENT)
+    return max(1, min(segments, PARALLEL_SCAN_MAX_SEGMENTS))
 
 
-def increment_vault_download(table_name: str, file_id: str) -> dict[str, Any]:
+def parallel_scan(
+    table_name: str,
+    total_segments: int,
+    max_workers: int | None = None,
+    stats: dict[str, float] | None = None,
+    cursors: dict[int, dict[str, Any] | None] | None = None,
+    should_stop: Callable[[], bool] | None = None,
+    **scan_kwargs: Any,
+) -> Iterator[dict[str, Any]]:
     """
-    Increment download count for a vault (multi-access) record.
+    Yield every item of a table using a parallel segmented scan.
+
+    Each segment is scanned by a worker thread (Segment/TotalSegments) that
+    follows its own LastEvaluatedKey pages. Pages are handed over through a
+    bounded queue, so at most a few pages are held in memory regardless of the
+    table size. Closing the generator early stops the workers.
 
-    Unlike one-time downloads, this does NOT mark the file as downloaded,
-    allowing unlimited downloads until the TTL expires.
+    When a cursors dict is passed, the scan resumes from it and keeps it up to
+    date: segment -> LastEvaluatedKey of the last page whose items have all been
+    yielded, or None once the segment is finished. Segments missing from the
+    dict start from the beginning. Saving the dict after stopping early gives a
+    checkpoint that never skips an unconsumed item (a partly consumed page is
+    scanned again).
+
+    should_stop is checked after every page, including pages a FilterExpression
+    leaves empty, so a time budget is honoured even while nothing is yielded.
+    Returning True ends the scan with the cursors at that page boundary.
 
     Args:
         table_name: DynamoDB table name
-        file_id: File ID
+        total_segments: Number of scan segments
+        max_workers: Maximum concurrent segment scans (default: total_segments)
+        stats: Optional dict that accumulates page counts and consumed RCU
+            (pass ReturnConsumedCapacity="TOTAL" to populate consumed_rcu)
+        cursors: Optional per-segment resume state, updated in place
+        should_stop: Optional callback checked after every page
+        **scan_kwargs: Extra arguments passed to every Scan call
 
-    Returns:
-        Updated file record with new download_count
+    Yields:
+        Table items, in no particular order
 
     Raises:
-        FileExpiredError: If file has expired
-        FileNotFoundError: If file doesn't exist
+        ClientError: If any segment scan fails
     """
-    table = get_table(table_name)
-    current_time = int(time.time())
+    total_segments = max(1, total_segments)
+    if cursors is None:
+        cursors = {}
+    start_keys = {
+        segment: cursors.get(segment)
+        for segment in range(total_segments)
+        if segment not in cursors or cursors[segment] is not None
+    }
+    if not start_keys:
+        return
+    max_workers = max(1, min(max_workers or len(start_keys), len(start_keys)))
+
+    pages: queue.Queue = queue.Queue(maxsize=max_workers * 2)
+    stop = threading.Event()
+    stats_lock = threading.Lock()
+    segment_done = object()
+
+    def put(page: Any) -> None:
+        # Block while the consumer is behind, but give up once it has gone away
+        while not stop.is_set():
+            try:
+                pages.put(page, timeout=0.1)
+                return
+            except queue.Full:
+                continue
+
+    def scan_segment(segment: int, start_key: dict[str, Any] | None) -> None:
+        try:
+            table = _get_thread_table(table_name)
+            kwargs = {**scan_kwargs, "Segment": segment, "TotalSegments": total_segments}
+            if start_key:
+                kwargs["ExclusiveStartKey"] = start_key
+
+            while not stop.is_set():
+                response = table.scan(**kwargs)
+                with stats_lock:
+                    _record_page_stats(stats, response)
+
+                last_evaluated_key = response.get("LastEvaluatedKey")
+                put((segment, response.get("Items", []), last_evaluated_key))
+                if not last_evaluated_key:
+                    break
+                kwargs["ExclusiveStartKey"] = last_evaluated_key
+
+        except Exception as e:
+            put(e)
+        finally:
+            put(segment_done)
 
+    executor = ThreadPoolExecutor(max_workers=max_workers, thread_name_prefix="scan")
     try:
-        response = table.update_item(
-            Key={"file_id": file_id},
-            UpdateExpression="SET download_count = if_not_exists(download_count, :zero) + :inc, last_downloaded_at = :now",
-            ConditionExpression="expires_at > :current AND access_mode = :multi",
-            ExpressionAttributeValues={
-                ":inc": 1,
-                ":zero": 0,
-                ":now": datetime.utcnow().isoformat(),
-                ":current": current_time,
-                ":multi": ACCESS_MODE_MULTI,
-            },
-            ReturnValues="ALL_NEW",
-        )
-        record = response["Attributes"]
-        logger.info(f"Vault download #{record.get('download_count', 1)} for: {file_id}")
+        for segment, start_key in start_keys.items():
+            executor.submit(scan_segment, segment, start_key)
+
+        remaining = len(start_keys)
+        while remaining:
+            page = pages.get()
+            if page is segment_done:
+                remaining -= 1
+            elif isinstance(page, Exception):
+                raise page
+            else:
+                segment, items, last_evaluated_key = page
+                yield from items
+                cursors[segment] = last_evaluated_key
+                if should_stop is not None and should_stop():
+                    return
+    finally:
+        stop.set()
+        executor.shutdown(wait=True, cancel_futures=True)
+
+
+def get_scan_checkpoint(table_name: str, name: str) -> dict[str, Any] | None:
+    """
+    Load a saved parallel scan checkpoint.
 
-        # Increment global download counter
-        try:
-            increment_download_counter(table_name, file_size=record.get("file_size", 0))
-        except Exception as e:
-            # Don't fail if counter increment fails
-            logger.warning(f"Failed to increment download counter: {e}")
+    Args:
+        table_name: DynamoDB table name
+        name: Checkpoint name (e.g., "cleanup")
 
-        return record
+    Returns:
+        Dict with total_segments and cursors (segment -> start key or None),
+        or None if no checkpoint exists
+    """
+    table = get_table(table_name)
 
-    except ClientError as e:
-        error_code = e.response["Error"]["Code"]
+    response = table.get_item(Key={"file_id": f"CHECKPOINT#{name}"}, ConsistentRead=True)
+    item = response.get("Item")
+    if not item:
+        return None
 
-        if error_code == "ConditionalCheckFailedException":
-            # Check why it failed
-            record = get_file_record(table_name, file_id)
+    return {
+        "total_segments": int(item["total_segments"]),
+        "cursors": {int(segment): key for segment, key in item.get("cursors", {}).items()},
+    }
 
-            if not record:
-                raise FileNotFoundError("File not found") from e
 
-            if record.get("expires_at", 0) <= current_time:
-                raise FileExpiredError("File has expired") from e
+def save_scan_checkpoint(
+    table_name: str,
+    name: str,
+    total_segments: int,
+    cursors: dict[int, dict[str, Any] | None],
+) -> None:
+    """
+    Save parallel scan progress so the next run can resume from it.
 
-            if record.get("access_mode") != ACCESS_MODE_MULTI:
-                # Should not happen - wrong function called
-                logger.error(f"increment_vault_download called for non-vault record: {file_id}")
-                raise ValueError("This is not a vault record") from e
+    The checkpoint lives in the files table as a special record (like STATS)
+    without expires_at, so cleanup never treats it as a due item.
 
-            raise
+    Args:
+        table_name: DynamoDB table name
+        name: Checkpoint name (e.g., "cleanup")
+        total_segments: Segment count the cursors belong to
+        cursors: Per-segment cursors as maintained by parallel_scan
+    """
+    table = get_table(table_name)
 
-        logger.error(f"Error incrementing vault download for {file_id}: {e}")
-        raise
+    table.put_item(
+        Item={
+            "file_id": f"CHECKPOINT#{name}",
+            "total_segments": total_segments,
+            "cursors": {str(segment): key for segment, key in cursors.items()},
+            "updated_at": datetime.utcnow().isoformat(),
+        }
+    )
+    finished = sum(1 for key in cursors.values() if key is None)
+    logger.info(f"Saved {name} checkpoint: {finished}/{total_segments} segments finished")
 
 
-def increment_report_count(table_name: str, file_id: str) -> int:
+def delete_scan_checkpoint(table_name: str, name: str) -> None:
     """
-    Increment abuse report count for a file.
+    Delete a parallel scan checkpoint once the scan has completed.
 
     Args:
         table_name: DynamoDB table name
-        file_id: File ID
-
-    Returns:
-        New report count
+        name: Checkpoint name (e.g., "cleanup")
     """
     table = get_table(table_name)
-
-    try:
-        response = table.update_item(
-            Key={"file_id": file_id},
-            UpdateExpression="SET report_count = if_not_exists(report_count, :zero) + :inc",
-            ExpressionAttributeValues={":inc": 1, ":zero": 0},
-            ReturnValues="UPDATED_NEW",
-        )
-        new_count = response["Attributes"]["report_count"]
-        logger.info(f"Incremented report count for {file_id}: {new_count}")
-        return int(new_count)
-
-    except ClientError as e:
-        logger.error(f"Error incrementing report count for {file_id}: {e}")
-        raise
+    table.delete_item(Key={"file_id": f"CHECKPOINT#{name}"})
 
 
-def delete_file_record(table_name: str, file_id: str) -> None:
+def stats_shard_key(shard: int | None = None) -> str:
     """
-    Delete file record from DynamoDB.
+    Get the key of a statistics counter shard ("STATS#<shard>").
 
     Args:
-        table_name: DynamoDB table name
-        file_id: File ID
+        shard: Shard number (default: random in [0, STATS_SHARDS))
+
+    Returns:
+        Shard record key
     """
-    table = get_table(table_name)
+    if shard is None:
+        shard = random.randrange(STATS_SHARDS)
+    return f"{STATS_KEY}{STATS_SHARD_SEPARATOR}{shard}"
 
-    try:
-        table.delete_item(Key={"file_id": file_id})
-        logger.info(f"Deleted file record: {file_id}")
-    except ClientError as e:
-        logger.error(f"Error deleting file record {file_id}: {e}")
-        raise
+
+def is_stats_key(file_id: str) -> bool:
+    """Check whether a key is the legacy STATS record or one of its shards."""
+    return file_id == STATS_KEY or file_id.startswith(STATS_KEY + STATS_SHARD_SEPARATOR)
 
 
-def increment_download_counter(table_name: str, file_size: int = 0) -> dict[str, Any]:
+def increment_download_counter(table_name: str, file_size: int = 0, downloads: int = 1) -> None:
     """
     Atomically increment global download counter and total bytes.
 
-    Uses a special statistics record with file_id="STATS" to track
-    aggregate metrics without compromising user privacy.
+    Uses special statistics records (file_id="STATS#<shard>") to track
+    aggregate metrics without compromising user privacy. Each increment goes
+    to a random one of STATS_SHARDS shards, so downloads are not throttled on
+    a single hot key; get_statistics sums the shards.
 
     Args:
         table_name: DynamoDB table name
-        file_size: Size of downloaded file in bytes
-
-    Returns:
-        Updated statistics (downloads, total_bytes)
+        file_size: Size of downloaded file(s) in bytes
+        downloads: Number of downloads to add (default: 1)
     """
     table = get_table(table_name)
+    key = stats_shard_key()
 
     try:
-        response = table.update_item(
-            Key={"file_id": "STATS"},
+        table.update_item(
+            Key={"file_id": key},
             UpdateExpression="ADD downloads :inc, total_bytes :size SET updated_at = :now",
             ExpressionAttributeValues={
-                ":inc": 1,
+                ":inc": downloads,
                 ":size": file_size,
                 ":now": datetime.utcnow().isoformat(),
             },
-            ReturnValues="ALL_NEW",
         )
-        stats = response["Attributes"]
-        logger.info(
-            f"Incremented stats: downloads={stats.get('downloads', 0)}, "
-            f"total_bytes={stats.get('total_bytes', 0)}"
-        )
-        return {
-            "downloads": int(stats.get("downloads", 0)),
-            "total_bytes": int(stats.get("total_bytes", 0)),
-        }
+        logger.info(f"Incremented stats shard {key}: downloads +{downloads}, bytes +{file_size}")
 
     except ClientError as e:
         logger.error(f"Error incrementing download counter: {e}")
@@ -512,24 +1714,35 @@ def get_statistics(table_name: str) -> dict[str, Any]:
     """
     Get global statistics.
 
+    Sums the counter shards and the legacy unsharded STATS record with a
+    single BatchGetItem. Unprocessed keys are retried with backoff, like
+    batch_delete_file_records.
+
     Args:
         table_name: DynamoDB table name
 
     Returns:
         Statistics dictionary with download count, total bytes, and other metrics
     """
-    table = get_table(table_name)
+    keys = [{"file_id": STATS_KEY}]
+    keys += [{"file_id": stats_shard_key(shard)} for shard in range(STATS_SHARDS)]
+    request = {
+        "Keys": keys,
+        "ProjectionExpression": "downloads, total_bytes, updated_at",
+    }
+    items: list[dict[str, Any]] = []
 
     try:
-        response = table.get_item(Key={"file_id": "STATS"})
-        stats = response.get("Item", {})
-
-        # Return statistics with defaults
-        return {
-            "downloads": int(stats.get("downloads", 0)),
-            "total_bytes": int(stats.get("total_bytes", 0)),
-            "updated_at": stats.get("updated_at", datetime.utcnow().isoformat()),
-        }
+        for attempt in range(DYNAMODB_BATCH_WRITE_MAX_RETRIES + 1):
+            if attempt:
+                time.sleep(min(0.05 * 2**attempt, 1.0))
+            response = dynamodb.batch_get_item(RequestItems={table_name: request})
+            items.extend(response.get("Responses", {}).get(table_name, []))
+            request = response.get("UnprocessedKeys", {}).get(table_name)
+            if not request:
+                break
+        else:
+            logger.warning(f"Statistics missing {len(request['Keys'])} unprocessed shard(s)")
 
     except ClientError as e:
         logger.error(f"Error getting statistics: {e}")
@@ -540,10 +1753,20 @@ def get_statistics(table_name: str) -> dict[str, Any]:
             "updated_at": datetime.utcnow().isoformat(),
         }
 
+    # Return statistics with defaults
+    return {
+        "downloads": sum(int(item.get("downloads", 0)) for item in items),
+        "total_bytes": sum(int(item.get("total_bytes", 0)) for item in items),
+        "updated_at": max(
+            (item["updated_at"] for item in items if "updated_at" in item),
+            default=datetime.utcnow().isoformat(),
+        ),
+    }
+
 
 def create_pin_file_record(
     table_name: str,
-    file_id: str,
+    file_id: str | None,
     file_size: int,
     expires_at: int,
     ip_hash: str,
@@ -554,32 +1777,46 @@ def create_pin_file_record(
     encrypted_text: str | None = None,
     file_name: str | None = None,
     one_time: bool = True,
+    id_key: bytes | None = None,
+    text_bucket: str | None = None,
 ) -> dict[str, Any]:
     """
     Create a DynamoDB record for PIN-based sharing.
 
     Uses conditional put to prevent file_id collisions.
 
+    When file_id is None the ID is allocated from the PIN ID counter (see
+    allocate_pin_file_id), which never repeats within the 1M ID space. A
+    collision is only possible after the counter wraps; the put then retries
+    with the next counter value.
+
     Args:
         table_name: DynamoDB table name
-        file_id: Short file ID (6 chars)
+        file_id: Short file ID (6 chars), or None to allocate
         file_size: File size in bytes (or encrypted text size)
         expires_at: Unix timestamp when secret expires
         ip_hash: SHA256 hash of uploader IP
         pin_hash: PBKDF2-hashed PIN
         salt: Base64-encoded salt for PIN hashing
         content_type: "file" or "text" (default: "file")
-        s3_key: S3 object key (required for files)
+        s3_key: S3 object key (required for files; files/<file_id> when allocated)
         encrypted_text: Base64 encrypted text (required for text secrets)
         one_time: If True, delete after first download (default: True)
+        id_key: Permutation key for allocated IDs (required when file_id is None)
+        text_bucket: Store the text in this S3 bucket (texts/<file_id>) instead of DynamoDB
 
     Returns:
         Created record
 
     Raises:
         ValueError: If required fields are missing or file_id already exists
+        RuntimeError: If a free ID cannot be allocated within PIN_ID_MAX_RETRIES
     """
     table = get_table(table_name)
+    allocate_id = file_id is None
+    derive_s3_key = allocate_id and not s3_key
+    if allocate_id and not id_key:
+        raise ValueError("id_key required to allocate a PIN file ID")
 
     record = {
         "file_id": file_id,
@@ -595,44 +1832,134 @@ def create_pin_file_record(
         "salt": salt,
         "attempts_left": PIN_MAX_ATTEMPTS,
         "one_time": one_time,
+        "expiry_bucket": expiry_bucket_for(expires_at),
+        "record_version": new_record_version(),
     }
 
     if file_name:
         record["file_name"] = file_name
 
     if content_type == "file":
-        if not s3_key:
+        if not s3_key and not derive_s3_key:
             raise ValueError("s3_key required for file content_type")
         record["s3_key"] = s3_key
     elif content_type == "text":
         if not encrypted_text:
             raise ValueError("encrypted_text required for text content_type")
-        record["encrypted_text"] = encrypted_text
-
-    try:
-        table.put_item(Item=record, ConditionExpression="attribute_not_exists(file_id)")
-    except ClientError as e:
-        if e.response["Error"]["Code"] == "ConditionalCheckFailedException":
-            raise ValueError(f"File ID {file_id} already exists") from e
-        raise
+        if text_bucket:
+            # Offloaded to S3 (see offload_text_payload); downloads get a presigned URL
+            record["s3_key"] = text_s3_key(file_id) if file_id else None
+        elif len(encrypted_text) > INLINE_TEXT_MAX_BYTES:
+            # Large payload goes to its own write-once item (see put_text_payload)
+            record["payload_split"] = True
+        else:
+            record["encrypted_text"] = encode_ciphertext(encrypted_text)
+
+    collisions = 0
+    live_count = 0
+    for attempt in range(PIN_ID_MAX_RETRIES if allocate_id else 1):
+        if allocate_id:
+            # Count the share as live once, on the first allocation
+            file_id, live_count = allocate_pin_file_id(table_name, id_key, count_live=attempt == 0)
+            record["file_id"] = file_id
+            if content_type == "file" and derive_s3_key:
+                record["s3_key"] = f"files/{file_id}"
+            elif text_bucket:
+                record["s3_key"] = text_s3_key(file_id)
+        try:
+            table.put_item(Item=record, ConditionExpression="attribute_not_exists(file_id)")
+            break
+        except ClientError as e:
+            if e.response["Error"]["Code"] != "ConditionalCheckFailedException":
+                raise
+            if not allocate_id:
+                raise ValueError(f"File ID {file_id} already exists") from e
+            collisions += 1
+            logger.warning(f"PIN file ID collision after counter wrap: {file_id}")
+    else:
+        try:
+            adjust_live_pin_ids(table_name, -1)
+        except ClientError:
+            pass  # Already logged; the count only feeds a metric
+        emit_metrics({"PinIdAllocations": 1, "PinIdCollisions": collisions})
+        raise RuntimeError("Failed to generate unique file ID after max retries")
+
+    if record.get("payload_split"):
+        put_text_payload(table_name, record, encrypted_text)
+    elif content_type == "text" and text_bucket:
+        offload_text_payload(table_name, text_bucket, record, encrypted_text)
+    if allocate_id:
+        emit_metrics({"PinIdAllocations": 1, "PinIdCollisions": collisions})
+        emit_metrics({"PinIdSpaceUtilization": 100 * live_count / PIN_ID_SPACE}, unit="Percent")
 
     logger.info(f"Created PIN {content_type} record: {file_id}")
     return record
 
 
-def initiate_pin_session(table_name: str, file_id: str) -> dict[str, Any]:
+def allocate_pin_file_id(table_name: str, key: bytes, count_live: bool = True) -> tuple[str, int]:
     """
-    Create a 60-second PIN entry session.
+    Allocate the next 6-digit PIN file ID from the atomic counter.
+
+    The counter value is mapped through a keyed format-preserving permutation
+    (permute_pin_file_id), so IDs are unique for PIN_ID_SPACE allocations and
+    not guessable from one another.
 
-    Checks file exists, not expired, not downloaded, not locked.
-    Resets attempts if lockout has expired.
+    The counter record also tracks live_count, the number of PIN shares that
+    currently exist (decremented by the stream consumer on REMOVE), which
+    shows how full the ID space is.
 
     Args:
         table_name: DynamoDB table name
-        file_id: File ID
+        key: Permutation key
+        count_live: Add the new share to live_count
 
     Returns:
-        Session info with session_expires and attempts_left
+        Tuple of (file ID, live_count after this allocation)
+    """
+    table = get_table(table_name)
+
+    response = table.update_item(
+        Key={"file_id": PIN_ID_COUNTER_KEY},
+        UpdateExpression="ADD next_index :one, live_count :live",
+        ExpressionAttributeValues={":one": 1, ":live": 1 if count_live else 0},
+        ReturnValues="UPDATED_NEW",
+    )
+    attributes = response["Attributes"]
+    index = (int(attributes["next_index"]) - 1) % PIN_ID_SPACE
+    return permute_pin_file_id(index, key), max(int(attributes.get("live_count", 0)), 0)
+
+
+def adjust_live_pin_ids(table_name: str, delta: int) -> None:
+    """
+    Adjust the live PIN share count on the counter record.
+
+    Args:
+        table_name: DynamoDB table name
+        delta: Change to apply (negative when shares are removed)
+    """
+    table = get_table(table_name)
+
+    try:
+        table.update_item(
+            Key={"file_id": PIN_ID_COUNTER_KEY},
+            UpdateExpression="ADD live_count :delta",
+            ExpressionAttributeValues={":delta": delta},
+        )
+    except ClientError as e:
+        logger.error(f"Error adjusting live PIN ID count by {delta}: {e}")
+        raise
+
+
+def _raise_pin_unavailable(record: dict[str, Any] | None, current_time: int) -> None:
+    """
+    Raise the error explaining why a PIN record cannot be used right now.
+
+    Returns without raising only when the record is usable apart from an
+    expired lock, which the caller then resets.
+
+    Args:
+        record: Current item (from ALL_OLD), or None if it does not exist
+        current_time: Unix timestamp the request was evaluated at
 
     Raises:
         FileNotFoundError: If file doesn't exist or is not PIN mode
@@ -640,11 +1967,6 @@ def initiate_pin_session(table_name: str, file_id: str) -> dict[str, Any]:
         FileExpiredError: If file has expired
         FileLockedException: If file is locked due to failed attempts
     """
-    table = get_table(table_name)
-    current_time = int(time.time())
-    session_expires = current_time + PIN_SESSION_TIMEOUT_SECONDS
-
-    record = get_file_record(table_name, file_id)
     if not record:
         raise FileNotFoundError("File not found")
     if record.get("downloaded"):
@@ -660,36 +1982,123 @@ def initiate_pin_session(table_name: str, file_id: str) -> dict[str, Any]:
         remaining_hours = remaining_seconds // 3600 + (1 if remaining_seconds % 3600 else 0)
         raise FileLockedException(f"File is locked. Try again in {remaining_hours} hours")
 
-    attempts_left = int(record.get("attempts_left", PIN_MAX_ATTEMPTS))
 
-    update_expr = "SET session_started = :started, session_expires = :expires"
-    expr_values: dict[str, Any] = {":started": current_time, ":expires": session_expires}
+@_negative_cached("pin_initiate")
+def initiate_pin_session(table_name: str, file_id: str) -> dict[str, Any]:
+    """
+    Create a 60-second PIN entry session.
 
-    # Reset attempts if lockout has expired
-    if locked_until is not None and int(locked_until) <= current_time:
-        update_expr += ", attempts_left = :max_attempts REMOVE locked_until"
-        expr_values[":max_attempts"] = PIN_MAX_ATTEMPTS
-        attempts_left = PIN_MAX_ATTEMPTS
+    Checks file exists, not expired, not downloaded, not locked - all inside the
+    condition of a single update, so the common case is one DynamoDB call.
+    If the lockout has expired, a second conditional update resets attempts.
+    A failed update is classified from its ALL_OLD item; if another session
+    reset the lock first, the session is retried once against that state.
+    Unavailable results (including locks) are cached briefly per container.
 
-    try:
-        table.update_item(
-            Key={"file_id": file_id},
-            UpdateExpression=update_expr,
-            ExpressionAttributeValues=expr_values,
-        )
-    except ClientError as e:
-        logger.error(f"Error creating PIN session for {file_id}: {e}")
-        raise
+    Args:
+        table_name: DynamoDB table name
+        file_id: File ID
+
+    Returns:
+        Session info with session_expires and attempts_left
+
+    Raises:
+        FileNotFoundError: If file doesn't exist or is not PIN mode
+        FileAlreadyDownloadedError: If file was already downloaded
+        FileExpiredError: If file has expired
+        FileLockedException: If file is locked due to failed attempts
+    """
+    table = get_table(table_name)
+    current_time = int(time.time())
+    session_expires = current_time + PIN_SESSION_TIMEOUT_SECONDS
+
+    condition = "access_mode = :pin AND downloaded = :false AND expires_at > :now"
+    update_expr = "SET session_started = :now, session_expires = :expires, "
+    expr_values: dict[str, Any] = {
+        ":pin": ACCESS_MODE_PIN,
+        ":false": False,
+        ":now": current_time,
+        ":expires": session_expires,
+        ":max_attempts": PIN_MAX_ATTEMPTS,
+    }
+
+    # Not locked: keep the remaining attempts
+    unlocked_condition = f"{condition} AND attribute_not_exists(locked_until)"
+    unlocked_update = f"{update_expr}attempts_left = if_not_exists(attempts_left, :max_attempts)"
+    # Lockout expired: reset attempts if the lock is still the one we saw
+    reset_condition = f"{condition} AND locked_until = :locked"
+    reset_update = f"{update_expr}attempts_left = :max_attempts REMOVE locked_until"
+
+    attempt_condition, attempt_update = unlocked_condition, unlocked_update
+    # Each retry is built from the ALL_OLD item, so losing the reset race to
+    # another session retries once against the state that session left
+    for attempt in range(3):
+        try:
+            response = table.update_item(
+                Key={"file_id": file_id},
+                UpdateExpression=attempt_update,
+                ConditionExpression=attempt_condition,
+                ExpressionAttributeValues=expr_values,
+                ReturnValues="UPDATED_NEW",
+                ReturnValuesOnConditionCheckFailure="ALL_OLD",
+            )
+            break
+        except ClientError as e:
+            if e.response["Error"]["Code"] != "ConditionalCheckFailedException":
+                logger.error(f"Error creating PIN session for {file_id}: {e}")
+                raise
+
+            record = _condition_failure_item(e)
+            _raise_pin_unavailable(record, current_time)
+            if attempt == 2:
+                # Still changing under us; not a lock, so do not report (or cache) one
+                logger.warning(f"PIN session for {file_id} kept losing conditional races")
+                raise
+
+            if record.get("locked_until") is None:
+                # Lock reset (or never set) by a concurrent session
+                attempt_condition, attempt_update = unlocked_condition, unlocked_update
+                expr_values.pop(":locked", None)
+            else:
+                attempt_condition, attempt_update = reset_condition, reset_update
+                expr_values[":locked"] = record["locked_until"]
+
+    attempts_left = int(response["Attributes"]["attempts_left"])
 
     logger.info(f"PIN session created for: {file_id}, expires: {session_expires}")
     return {"session_expires": session_expires, "attempts_left": attempts_left}
 
 
+def _raise_pin_session_unusable(record: dict[str, Any] | None, current_time: int) -> None:
+    """
+    Raise the error explaining why a PIN verify cannot proceed.
+
+    Extends _raise_pin_unavailable with the session and attempt checks.
+    Returns without raising only when the record is still usable (e.g. the
+    attempts changed concurrently), so the caller can retry with fresh values.
+    """
+    _raise_pin_unavailable(record, current_time)
+
+    session_expires = record.get("session_expires")
+    if not session_expires or int(session_expires) <= current_time:
+        raise SessionExpiredError("Session expired. Please enter file ID again")
+
+    if int(record.get("attempts_left", 0)) <= 0:
+        raise FileLockedException("File is locked for 12 hours")
+
+
 def verify_pin_and_download(table_name: str, file_id: str, pin: str) -> dict[str, Any]:
     """
     Verify PIN and reserve file for download.
 
-    Decrements attempts on failure, locks after 3 failures, reserves file on success.
+    The record is read once for the PIN hash (immutable fields may come from
+    the record cache). After that:
+    - Wrong PIN: one conditional decrement guarded on the attempts_left value
+      that was read and on the session; the last attempt also sets the lock.
+      Concurrent wrong guesses cannot spend the same attempt twice.
+    - Correct PIN: one conditional reserve that re-checks session and lock.
+
+    Condition failures are classified from the ALL_OLD item.
 
     Args:
         table_name: DynamoDB table name
@@ -712,47 +2121,56 @@ def verify_pin_and_download(table_name: str, file_id: str, pin: str) -> dict[str
     table = get_table(table_name)
     current_time = int(time.time())
 
-    record = get_file_record(table_name, file_id)
-    if not record:
-        raise FileNotFoundError("File not found")
-    if record.get("access_mode") != ACCESS_MODE_PIN:
-        raise FileNotFoundError("File not found")
-    if record.get("downloaded"):
-        raise FileAlreadyDownloadedError("File has already been downloaded")
-    if record.get("expires_at", 0) <= current_time:
-        raise FileExpiredError("File has expired")
-
-    session_expires = record.get("session_expires")
-    if not session_expires or int(session_expires) <= current_time:
-        raise SessionExpiredError("Session expired. Please enter file ID again")
-
-    locked_until = record.get("locked_until")
-    if locked_until is not None and int(locked_until) > current_time:
-        remaining_seconds = int(locked_until) - current_time
-        remaining_hours = remaining_seconds // 3600 + (1 if remaining_seconds % 3600 else 0)
-        raise FileLockedException(f"File is locked. Try again in {remaining_hours} hours")
-
-    attempts_left = int(record.get("attempts_left", 0))
-    if attempts_left <= 0:
-        raise FileLockedException("File is locked for 12 hours")
+    # PIN hash and salt come from the cache; session state is always read fresh
+    record = get_cached_record(
+        table_name,
+        file_id,
+        PIN_SESSION_ATTRIBUTES,
+        immutable_attributes=IMMUTABLE_RECORD_ATTRIBUTES,
+        scope="pin",
+    )
+    _raise_pin_session_unusable(record, current_time)
+
+    # Session active and not locked - re-checked by every update below
+    usable_condition = (
+        "session_expires > :now AND (attribute_not_exists(locked_until) OR locked_until <= :now)"
+    )
 
     if not verify_pin_hash(pin, record["salt"], record["pin_hash"]):
-        new_attempts = attempts_left - 1
-        update_expr = "SET attempts_left = :attempts"
-        expr_values: dict[str, Any] = {":attempts": new_attempts}
-
-        if new_attempts <= 0:
-            expr_values[":locked"] = current_time + PIN_LOCKOUT_SECONDS
-            update_expr += ", locked_until = :locked"
-
-        try:
-            table.update_item(
-                Key={"file_id": file_id},
-                UpdateExpression=update_expr,
-                ExpressionAttributeValues=expr_values,
-            )
-        except ClientError as e:
-            logger.error(f"Error updating PIN attempts for {file_id}: {e}")
+        attempts_left = int(record["attempts_left"])
+
+        # Loops only when a concurrent guess spent an attempt first
+        for _ in range(PIN_MAX_ATTEMPTS):
+            new_attempts = attempts_left - 1
+            update_expr = "SET attempts_left = :attempts"
+            expr_values: dict[str, Any] = {
+                ":attempts": new_attempts,
+                ":seen": attempts_left,
+                ":now": current_time,
+            }
+
+            if new_attempts <= 0:
+                expr_values[":locked"] = current_time + PIN_LOCKOUT_SECONDS
+                update_expr += ", locked_until = :locked"
+
+            try:
+                table.update_item(
+                    Key={"file_id": file_id},
+                    UpdateExpression=update_expr,
+                    ConditionExpression=f"attempts_left = :seen AND {usable_condition}",
+                    ExpressionAttributeValues=expr_values,
+                    ReturnValuesOnConditionCheckFailure="ALL_OLD",
+                )
+                break
+            except ClientError as e:
+                if e.response["Error"]["Code"] != "ConditionalCheckFailedException":
+                    logger.error(f"Error updating PIN attempts for {file_id}: {e}")
+                    raise
+                current = _condition_failure_item(e)
+                _raise_pin_session_unusable(current, current_time)
+                attempts_left = int(current["attempts_left"])
+        else:
+            raise FileLockedException("File is locked for 12 hours")
 
         if new_attempts <= 0:
             raise FileLockedException("Incorrect PIN. File locked for 12 hours")
@@ -760,40 +2178,45 @@ def verify_pin_and_download(table_name: str, file_id: str, pin: str) -> dict[str
 
     # PIN correct - reserve file for download
     is_one_time = record.get("one_time", True)
+    expr_values = {":now": current_time, ":zero": 0}
+
+    if is_one_time:
+        # One-time mode: atomically mark as downloaded
+        update_expr = (
+            "SET reserved_at = :now, downloaded = :true, downloaded_at = :now_iso, "
+            "expiry_bucket = :bucket"
+        )
+        condition = "downloaded = :false AND expires_at > :now"
+        expr_values.update(
+            {
+                ":false": False,
+                ":true": True,
+                ":now_iso": datetime.utcnow().isoformat(),
+                ":bucket": expiry_bucket_for(current_time),
+            }
+        )
+    else:
+        # Multi mode: allow repeated downloads until expiry
+        update_expr = "SET reserved_at = :now ADD download_count :inc"
+        condition = "expires_at > :now"
+        expr_values[":inc"] = 1
+
     try:
-        if is_one_time:
-            # One-time mode: atomically mark as downloaded
-            response = table.update_item(
-                Key={"file_id": file_id},
-                UpdateExpression="SET reserved_at = :now, downloaded = :true, downloaded_at = :now_iso",
-                ConditionExpression="downloaded = :false AND expires_at > :current",
-                ExpressionAttributeValues={
-                    ":false": False,
-                    ":true": True,
-                    ":now": current_time,
-                    ":now_iso": datetime.utcnow().isoformat(),
-                    ":current": current_time,
-                },
-                ReturnValues="ALL_NEW",
-            )
-        else:
-            # Multi mode: allow repeated downloads until expiry
-            response = table.update_item(
-                Key={"file_id": file_id},
-                UpdateExpression="SET reserved_at = :now ADD download_count :inc",
-                ConditionExpression="expires_at > :current",
-                ExpressionAttributeValues={
-                    ":now": current_time,
-                    ":current": current_time,
-                    ":inc": 1,
-                },
-                ReturnValues="ALL_NEW",
-            )
-        logger.info(f"PIN verified, file reserved: {file_id} (one_time={is_one_time})")
-        return response["Attributes"]
+        response = table.update_item(
+            Key={"file_id": file_id},
+            UpdateExpression=update_expr,
+            ConditionExpression=f"{condition} AND attempts_left > :zero AND {usable_condition}",
+            ExpressionAttributeValues=expr_values,
+            ReturnValues="ALL_NEW",
+            ReturnValuesOnConditionCheckFailure="ALL_OLD",
+        )
     except ClientError as e:
         if e.response["Error"]["Code"] == "ConditionalCheckFailedException":
+            _raise_pin_session_unusable(_condition_failure_item(e), current_time)
             if is_one_time:
                 raise FileAlreadyDownloadedError("File has already been downloaded") from e
             raise FileExpiredError("File has expired") from e
         raise
+
+    logger.info(f"PIN verified, file reserved: {file_id} (one_time={is_one_time})")
+    return response["Attributes"]
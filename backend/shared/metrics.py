@@ -0,0 +1,46 @@
+"""CloudWatch metrics via the Embedded Metric Format (EMF).
+
+EMF documents are plain JSON lines written to stdout; CloudWatch Logs turns
+them into metrics without a PutMetricData call on the request path.
+"""
+
+import json
+import logging
+import os
+import time
+
+logger = logging.getLogger(__name__)
+
+METRICS_NAMESPACE = os.environ.get("METRICS_NAMESPACE", "SecureDBX")
+ENVIRONMENT = os.environ.get("ENVIRONMENT", "dev")
+
+
+def emit_metrics(metrics: dict[str, float], unit: str = "Count") -> None:
+    """
+    Emit one or more metrics in a single EMF document.
+
+    Metrics are dimensioned by Environment. Emitting never raises, so callers
+    can use it on the request path.
+
+    Args:
+        metrics: Metric name to value
+        unit: CloudWatch unit shared by all metrics (default: "Count")
+    """
+    document = {
+        "_aws": {
+            "Timestamp": int(time.time() * 1000),
+            "CloudWatchMetrics": [
+                {
+                    "Namespace": METRICS_NAMESPACE,
+                    "Dimensions": [["Environment"]],
+                    "Metrics": [{"Name": name, "Unit": unit} for name in metrics],
+                }
+            ],
+        },
+        "Environment": ENVIRONMENT,
+        **metrics,
+    }
+    try:
+        print(json.dumps(document), flush=True)
+    except Exception as e:
+        logger.warning(f"Failed to emit metrics {list(metrics)}: {e}")
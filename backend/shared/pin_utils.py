@@ -6,9 +6,22 @@ import os
 import secrets
 from typing import Final
 
-from .constants import PIN_PBKDF2_ITERATIONS, PIN_SALT_BYTES
+from .constants import (
+    PIN_HASH_DEFAULT_SCHEME,
+    PIN_ID_SPACE,
+    PIN_PBKDF2_ITERATIONS,
+    PIN_SALT_BYTES,
+)
 
-_PIN_FILE_ID_MAX: Final[int] = 999999
+# Scheme for new PIN hashes, e.g. "pbkdf2-sha256$100000" or "scrypt$16384$8$1"
+PIN_HASH_SCHEME = os.environ.get("PIN_HASH_SCHEME", PIN_HASH_DEFAULT_SCHEME)
+
+_PBKDF2_SHA256: Final[str] = "pbkdf2-sha256"
+_SCRYPT: Final[str] = "scrypt"
+
+# Feistel network over two base-1000 halves of the 6-digit ID
+_PIN_ID_HALF: Final[int] = 1000
+_PIN_ID_ROUNDS: Final[int] = 8
 
 
 def generate_salt() -> str:
@@ -16,28 +29,92 @@ def generate_salt() -> str:
     return os.urandom(PIN_SALT_BYTES).hex()
 
 
-def hash_pin(pin: str, salt: str) -> str:
-    """Hash PIN with salt using PBKDF2-HMAC-SHA256. Returns 64-char hex hash."""
-    return hashlib.pbkdf2_hmac(
-        "sha256",
-        pin.encode("utf-8"),
-        bytes.fromhex(salt),
-        PIN_PBKDF2_ITERATIONS,
-    ).hex()
+def _derive_pin_key(pin: str, salt: str, algorithm: str, params: tuple[int, ...]) -> str:
+    """Run the KDF for a scheme. Returns 64-char hex digest."""
+    if algorithm == _PBKDF2_SHA256:
+        (iterations,) = params
+        return hashlib.pbkdf2_hmac(
+            "sha256", pin.encode("utf-8"), bytes.fromhex(salt), iterations
+        ).hex()
+    if algorithm == _SCRYPT:
+        n, r, p = params
+        return hashlib.scrypt(
+            pin.encode("utf-8"),
+            salt=bytes.fromhex(salt),
+            n=n,
+            r=r,
+            p=p,
+            maxmem=256 * n * r + 1024 * 1024,
+            dklen=32,
+        ).hex()
+    raise ValueError(f"Unknown PIN hash algorithm: {algorithm}")
 
 
-def verify_pin_hash(pin: str, salt: str, expected_hash: str) -> bool:
-    """Verify PIN against stored hash using constant-time comparison."""
-    actual_hash = hash_pin(pin, salt)
-    return hmac.compare_digest(actual_hash, expected_hash)
+def parse_pin_hash(stored_hash: str) -> tuple[str, tuple[int, ...], str]:
+    """
+    Split a stored PIN hash into algorithm, parameters and digest.
+
+    Formats:
+        pbkdf2-sha256$<iterations>$<hex>
+        scrypt$<n>$<r>$<p>$<hex>
+        <hex>  (legacy: PBKDF2-SHA256 with PIN_PBKDF2_ITERATIONS)
+    """
+    if "$" not in stored_hash:
+        return _PBKDF2_SHA256, (PIN_PBKDF2_ITERATIONS,), stored_hash
+    algorithm, *params, digest = stored_hash.split("$")
+    return algorithm, tuple(int(param) for param in params), digest
 
 
-def generate_pin_file_id() -> str:
-    """Generate random 6-digit numeric file ID. Returns zero-padded string."""
-    random_int = int.from_bytes(os.urandom(4), "big") % (_PIN_FILE_ID_MAX + 1)
-    return f"{random_int:06d}"
+def hash_pin(pin: str, salt: str, scheme: str | None = None) -> str:
+    """
+    Hash PIN with salt. Returns "<algorithm>$<params...>$<hex digest>".
+
+    The scheme (default: PIN_HASH_SCHEME) is stored with the hash, so the work
+    factor or algorithm can change for new records while old ones still verify.
+    """
+    algorithm, *params = (scheme or PIN_HASH_SCHEME).split("$")
+    int_params = tuple(int(param) for param in params)
+    digest = _derive_pin_key(pin, salt, algorithm, int_params)
+    return "$".join([algorithm, *(str(param) for param in int_params), digest])
+
+
+def verify_pin_hash(pin: str, salt: str, expected_hash: str) -> bool:
+    """Verify PIN against stored hash (any scheme) using constant-time comparison."""
+    algorithm, params, expected_digest = parse_pin_hash(expected_hash)
+    actual_digest = _derive_pin_key(pin, salt, algorithm, params)
+    return hmac.compare_digest(actual_digest, expected_digest)
 
 
 def generate_short_file_id() -> str:
     """Generate random 8-char URL-safe file ID using base64url encoding."""
     return secrets.token_urlsafe(6)
+
+
+def _pin_id_round(key: bytes, round_index: int, half: int) -> int:
+    """Feistel round function: keyed HMAC of one half, reduced to base 1000."""
+    digest = hmac.new(key, f"{round_index}:{half}".encode(), hashlib.sha256).digest()
+    return int.from_bytes(digest[:8], "big") % _PIN_ID_HALF
+
+
+def permute_pin_file_id(index: int, key: bytes) -> str:
+    """
+    Map a counter value to a 6-digit file ID with a keyed permutation.
+
+    A balanced Feistel network over the two 3-digit halves is a bijection on
+    000000-999999, so distinct counter values never share an ID, while the
+    sequence looks random without the key.
+
+    Args:
+        index: Counter value in [0, PIN_ID_SPACE)
+        key: Secret permutation key
+
+    Returns:
+        Zero-padded 6-digit string
+    """
+    if not 0 <= index < PIN_ID_SPACE:
+        raise ValueError(f"PIN ID index out of range: {index}")
+
+    left, right = divmod(index, _PIN_ID_HALF)
+    for round_index in range(_PIN_ID_ROUNDS):
+        left, right = right, (left + _pin_id_round(key, round_index, right)) % _PIN_ID_HALF
+    return f"{left * _PIN_ID_HALF + right:06d}"
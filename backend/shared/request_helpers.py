@@ -1,5 +1,7 @@
 """Request parsing utilities for Lambda handlers."""
 
+import base64
+import binascii
 import json
 import logging
 from typing import Any
@@ -20,6 +22,28 @@ def get_source_ip(event: dict[str, Any]) -> str:
     return event.get("requestContext", {}).get("identity", {}).get("sourceIp", "unknown")
 
 
+def get_body_text(event: dict[str, Any]) -> str:
+    """
+    Get the request body as text, decoding it if API Gateway base64-encoded it.
+
+    Args:
+        event: Lambda event from API Gateway
+
+    Returns:
+        Body text ("" when absent or undecodable)
+    """
+    body = event.get("body") or ""
+
+    if event.get("isBase64Encoded"):
+        try:
+            return base64.b64decode(body, validate=True).decode("utf-8")
+        except (binascii.Error, UnicodeDecodeError) as e:
+            logger.warning(f"Failed to decode base64 body: {e}")
+            return ""
+
+    return body
+
+
 def parse_json_body(event: dict[str, Any]) -> dict[str, Any]:
     """
     Safely parse JSON body from API Gateway event.
@@ -35,7 +59,7 @@ def parse_json_body(event: dict[str, Any]) -> dict[str, Any]:
         >>> parse_json_body(event)
         {'file_size': 1024}
     """
-    body_str = event.get("body", "{}")
+    body_str = get_body_text(event)
 
     if not body_str:
         return {}
@@ -81,6 +81,22 @@ def error_response(
     }
 
 
+def cache_control(max_age: int) -> dict[str, str]:
+    """
+    Build a Cache-Control header that lets CloudFront cache a response.
+
+    Used on 404/410 responses so repeated requests for missing or consumed
+    IDs are answered at the edge.
+
+    Args:
+        max_age: Seconds the response may be cached
+
+    Returns:
+        Header dict to pass as additional_headers
+    """
+    return {"Cache-Control": f"public, max-age={max_age}"}
+
+
 # Convenience functions for common HTTP status codes
 
 
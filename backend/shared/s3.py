@@ -2,11 +2,14 @@
 
 import logging
 import os
+from typing import Any
 
 import boto3
 from botocore.config import Config
 from botocore.exceptions import ClientError
 
+from .constants import S3_DELETE_BATCH_SIZE
+
 logger = logging.getLogger(__name__)
 
 # Get AWS region from environment
@@ -53,6 +56,164 @@ def generate_upload_url(
         raise
 
 
+def put_file(bucket_name: str, s3_key: str, data: bytes) -> None:
+    """
+    Upload a small object directly (no presigned URL round trip).
+
+    Args:
+        bucket_name: S3 bucket name
+        s3_key: S3 object key
+        data: Object content
+    """
+    try:
+        s3_client.put_object(Bucket=bucket_name, Key=s3_key, Body=data)
+        logger.info(f"Uploaded {s3_key} directly ({len(data)} bytes)")
+
+    except ClientError as e:
+        logger.error(f"Error uploading {s3_key}: {e}")
+        raise
+
+
+def create_multipart_upload(bucket_name: str, s3_key: str) -> str:
+    """
+    Start a multipart upload.
+
+    Args:
+        bucket_name: S3 bucket name
+        s3_key: S3 object key
+
+    Returns:
+        S3 upload ID
+    """
+    try:
+        response = s3_client.create_multipart_upload(Bucket=bucket_name, Key=s3_key)
+        logger.info(f"Started multipart upload for {s3_key}")
+        return response["UploadId"]
+
+    except ClientError as e:
+        logger.error(f"Error starting multipart upload for {s3_key}: {e}")
+        raise
+
+
+def generate_part_upload_urls(
+    bucket_name: str,
+    s3_key: str,
+    upload_id: str,
+    part_numbers: list[int],
+    expires_in: int = 3600,
+) -> dict[int, str]:
+    """
+    Generate presigned URLs for uploading parts of a multipart upload.
+
+    Presigning is local (no S3 call), so any number of parts can be signed
+    on the request path.
+
+    Args:
+        bucket_name: S3 bucket name
+        s3_key: S3 object key
+        upload_id: S3 upload ID
+        part_numbers: 1-based part numbers to sign
+        expires_in: URL expiration time in seconds (default 1 hour)
+
+    Returns:
+        Mapping of part number to presigned upload URL
+    """
+    return {
+        part_number: s3_client.generate_presigned_url(
+            "upload_part",
+            Params={
+                "Bucket": bucket_name,
+                "Key": s3_key,
+                "UploadId": upload_id,
+                "PartNumber": part_number,
+            },
+            ExpiresIn=expires_in,
+        )
+        for part_number in part_numbers
+    }
+
+
+def list_uploaded_parts(bucket_name: str, s3_key: str, upload_id: str) -> list[dict[str, Any]]:
+    """
+    List the parts S3 has received for a multipart upload.
+
+    Args:
+        bucket_name: S3 bucket name
+        s3_key: S3 object key
+        upload_id: S3 upload ID
+
+    Returns:
+        Parts ordered by number ({"PartNumber", "ETag", "Size"})
+
+    Raises:
+        ClientError: NoSuchUpload if the upload was completed or aborted
+    """
+    parts: list[dict[str, Any]] = []
+    kwargs: dict[str, Any] = {"Bucket": bucket_name, "Key": s3_key, "UploadId": upload_id}
+
+    while True:
+        response = s3_client.list_parts(**kwargs)
+        parts.extend(
+            {"PartNumber": part["PartNumber"], "ETag": part["ETag"], "Size": part["Size"]}
+            for part in response.get("Parts", [])
+        )
+        if not response.get("IsTruncated"):
+            return parts
+        kwargs["PartNumberMarker"] = response["NextPartNumberMarker"]
+
+
+def complete_multipart_upload(
+    bucket_name: str, s3_key: str, upload_id: str, parts: list[dict[str, Any]]
+) -> None:
+    """
+    Assemble the uploaded parts into the final object.
+
+    Args:
+        bucket_name: S3 bucket name
+        s3_key: S3 object key
+        upload_id: S3 upload ID
+        parts: Parts as returned by list_uploaded_parts
+    """
+    try:
+        s3_client.complete_multipart_upload(
+            Bucket=bucket_name,
+            Key=s3_key,
+            UploadId=upload_id,
+            MultipartUpload={
+                "Parts": [
+                    {"PartNumber": part["PartNumber"], "ETag": part["ETag"]} for part in parts
+                ]
+            },
+        )
+        logger.info(f"Completed multipart upload for {s3_key} ({len(parts)} parts)")
+
+    except ClientError as e:
+        logger.error(f"Error completing multipart upload for {s3_key}: {e}")
+        raise
+
+
+def abort_multipart_upload(bucket_name: str, s3_key: str, upload_id: str) -> None:
+    """
+    Abort a multipart upload and free its stored parts.
+
+    An upload that no longer exists (already completed or aborted) is ignored.
+
+    Args:
+        bucket_name: S3 bucket name
+        s3_key: S3 object key
+        upload_id: S3 upload ID
+    """
+    try:
+        s3_client.abort_multipart_upload(Bucket=bucket_name, Key=s3_key, UploadId=upload_id)
+        logger.info(f"Aborted multipart upload for {s3_key}")
+
+    except ClientError as e:
+        if e.response["Error"]["Code"] == "NoSuchUpload":
+            return
+        logger.error(f"Error aborting multipart upload for {s3_key}: {e}")
+        raise
+
+
 def generate_download_url(
     bucket_name: str,
     s3_key: str,
@@ -103,6 +264,40 @@ def delete_file(bucket_name: str, s3_key: str) -> None:
         raise
 
 
+def delete_files(bucket_name: str, s3_keys: list[str]) -> dict[str, str]:
+    """
+    Delete many files from S3 using DeleteObjects.
+
+    Keys are sent in chunks of S3_DELETE_BATCH_SIZE (1000) per request.
+
+    Args:
+        bucket_name: S3 bucket name
+        s3_keys: S3 object keys to delete
+
+    Returns:
+        Mapping of S3 key to error message for keys that could not be deleted
+    """
+    failed: dict[str, str] = {}
+
+    for start in range(0, len(s3_keys), S3_DELETE_BATCH_SIZE):
+        chunk = s3_keys[start : start + S3_DELETE_BATCH_SIZE]
+        try:
+            response = s3_client.delete_objects(
+                Bucket=bucket_name,
+                Delete={"Objects": [{"Key": key} for key in chunk], "Quiet": True},
+            )
+        except ClientError as e:
+            logger.error(f"Error deleting {len(chunk)} files: {e}")
+            failed.update({key: str(e) for key in chunk})
+            continue
+
+        for error in response.get("Errors", []):
+            failed[error["Key"]] = error.get("Message") or error.get("Code", "Unknown error")
+
+    logger.info(f"Deleted {len(s3_keys) - len(failed)} files from S3 ({len(failed)} failed)")
+    return failed
+
+
 def check_file_exists(bucket_name: str, s3_key: str) -> bool:
     """
     Check if file exists in S3.
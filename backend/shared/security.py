@@ -12,6 +12,8 @@ from typing import Any
 import boto3
 import requests
 
+from .request_helpers import get_body_text
+
 logger = logging.getLogger(__name__)
 
 # Constants
@@ -157,7 +159,7 @@ def require_cloudfront_and_recaptcha(handler: Callable) -> Callable:
 
         # Parse reCAPTCHA token from body
         try:
-            body = json.loads(event.get("body", "{}"))
+            body = json.loads(get_body_text(event) or "{}")
         except json.JSONDecodeError:
             return error_response("Invalid JSON in request body", 400)
 
@@ -261,6 +263,20 @@ def get_ip_hash_salt() -> str:
     return _ip_hash_salt_cache
 
 
+def get_pin_id_key() -> bytes:
+    """
+    Get the key for the 6-digit PIN file ID permutation.
+
+    Derived from the IP hash salt (HMAC with a fixed label), so no extra secret
+    has to be provisioned.
+
+    Returns:
+        32-byte permutation key
+    """
+    salt = get_ip_hash_salt()
+    return hmac.new(salt.encode(), b"pin-file-id", hashlib.sha256).digest()
+
+
 def hash_ip_secure(ip: str) -> str:
     """
     Hash an IP address using HMAC-SHA256 with a secret salt.
@@ -275,6 +291,22 @@ def hash_ip_secure(ip: str) -> str:
     return hmac.new(salt.encode(), ip.encode(), hashlib.sha256).hexdigest()
 
 
+def hash_upload_token(token: str) -> str:
+    """
+    Hash a multipart upload token for storage in the file record.
+
+    The token is random and only returned to the uploader, so a plain SHA256
+    is enough; the record never holds the token itself.
+
+    Args:
+        token: Upload token issued by upload_init
+
+    Returns:
+        64-character hex string (SHA256 digest)
+    """
+    return hashlib.sha256(token.encode()).hexdigest()
+
+
 def verify_cli_api_key(event: dict[str, Any]) -> bool:
     """Verify CLI API key from X-CLI-API-Key header against DynamoDB."""
     import time as _time
@@ -333,7 +365,7 @@ def require_cloudfront_and_auth(handler: Callable) -> Callable:
         else:
             # Browser path — reCAPTCHA
             try:
-                body = json.loads(event.get("body", "{}"))
+                body = json.loads(get_body_text(event) or "{}")
             except json.JSONDecodeError:
                 return error_response("Invalid JSON in request body", 400)
 
@@ -6,6 +6,9 @@ from typing import Any
 from .constants import (
     ALLOWED_ACCESS_MODES,
     ALLOWED_TTL_VALUES,
+    CHUNK_MAX_COUNT,
+    CHUNK_MAX_OVERHEAD_BYTES,
+    CHUNK_MIN_SIZE_BYTES,
     MAX_CUSTOM_TTL_MINUTES,
     MAX_FILE_SIZE_BYTES,
     MAX_FILE_SIZE_MB,
@@ -63,6 +66,51 @@ def validate_file_size(file_size: int) -> None:
         raise ValidationError(f"File size exceeds maximum limit ({MAX_FILE_SIZE_MB} MB)")
 
 
+def validate_chunk_manifest(manifest: Any, file_size: int) -> dict[str, int]:
+    """
+    Validate the chunk layout of a file's ciphertext.
+
+    Chunks are fixed-size ranges of the uploaded object (the last one may be
+    shorter), each decryptable on its own, so clients can fetch them with
+    parallel Range GETs.
+
+    Args:
+        manifest: {"chunk_size", "chunk_count", "total_size"} (ciphertext bytes)
+        file_size: Plaintext file size in bytes
+
+    Returns:
+        Manifest with only the known keys
+
+    Raises:
+        ValidationError: If the manifest is malformed or inconsistent
+    """
+    if not isinstance(manifest, dict):
+        raise ValidationError("chunk_manifest must be an object")
+
+    values = {}
+    for key in ("chunk_size", "chunk_count", "total_size"):
+        value = manifest.get(key)
+        if type(value) is not int or value <= 0:
+            raise ValidationError(f"chunk_manifest.{key} must be a positive integer")
+        values[key] = value
+
+    chunk_size, chunk_count, total_size = (
+        values["chunk_size"],
+        values["chunk_count"],
+        values["total_size"],
+    )
+    if chunk_size < CHUNK_MIN_SIZE_BYTES:
+        raise ValidationError(f"chunk_manifest.chunk_size must be at least {CHUNK_MIN_SIZE_BYTES}")
+    if chunk_count > CHUNK_MAX_COUNT:
+        raise ValidationError(f"chunk_manifest.chunk_count cannot exceed {CHUNK_MAX_COUNT}")
+    if chunk_count != -(-total_size // chunk_size):
+        raise ValidationError("chunk_manifest.chunk_count does not match total_size")
+    if not file_size <= total_size <= file_size + chunk_count * CHUNK_MAX_OVERHEAD_BYTES:
+        raise ValidationError("chunk_manifest.total_size does not match file_size")
+
+    return values
+
+
 def validate_ttl(ttl: Any) -> None:
     """
     Validate TTL value.
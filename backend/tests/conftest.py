@@ -18,6 +18,16 @@ def clean_environment(monkeypatch):
     monkeypatch.delenv("RECAPTCHA_MIN_SCORE", raising=False)
 
 
+@pytest.fixture(autouse=True)
+def clean_container_caches():
+    """Start each test without cached records, negative results or known vaults."""
+    from shared import dynamo
+
+    dynamo._record_cache.clear()
+    dynamo._negative_results.clear()
+    dynamo._known_vaults.clear()
+
+
 # Mark all tests in tests/ as unit tests by default
 def pytest_collection_modifyitems(items):
     """Automatically mark tests based on location."""
@@ -0,0 +1,113 @@
+"""Unit tests for chunk manifests (parallel ranged downloads)."""
+
+import json
+from unittest.mock import MagicMock, patch
+
+import pytest
+from lambdas.download import handler as download
+from shared.dynamo import create_file_record
+from shared.exceptions import ValidationError
+from shared.validation import validate_chunk_manifest
+
+MB = 1024 * 1024
+
+
+def _manifest(**overrides):
+    # 10 MB of plaintext in 4 MB chunks, each with a 28-byte IV + tag
+    return {"chunk_size": 4 * MB, "chunk_count": 3, "total_size": 10 * MB + 3 * 28, **overrides}
+
+
+class TestValidateChunkManifest:
+    def test_valid_manifest_keeps_only_known_keys(self):
+        manifest = validate_chunk_manifest({**_manifest(), "extra": "x"}, 10 * MB)
+
+        assert manifest == _manifest()
+
+    @pytest.mark.parametrize(
+        "manifest",
+        [
+            "4MB",
+            _manifest(chunk_size=None),
+            _manifest(chunk_size=True),
+            _manifest(chunk_size=4.0 * MB),
+            _manifest(chunk_count=0),
+            _manifest(chunk_size=1024, chunk_count=10241),
+        ],
+    )
+    def test_rejects_malformed(self, manifest):
+        with pytest.raises(ValidationError):
+            validate_chunk_manifest(manifest, 10 * MB)
+
+    def test_chunk_count_must_cover_total_size(self):
+        with pytest.raises(ValidationError, match="chunk_count"):
+            validate_chunk_manifest(_manifest(chunk_count=4), 10 * MB)
+
+    def test_total_size_must_match_file_size(self):
+        with pytest.raises(ValidationError, match="total_size"):
+            validate_chunk_manifest(_manifest(), 11 * MB)
+        with pytest.raises(ValidationError, match="total_size"):
+            validate_chunk_manifest(_manifest(total_size=12 * MB - 1), 9 * MB)
+
+    def test_chunk_count_is_bounded(self):
+        with pytest.raises(ValidationError, match="cannot exceed"):
+            validate_chunk_manifest(
+                {"chunk_size": 65536, "chunk_count": 10001, "total_size": 65536 * 10001},
+                65536 * 10001,
+            )
+
+
+def test_manifest_is_stored_on_file_record():
+    table = MagicMock()
+    with (
+        patch("shared.dynamo.get_table", return_value=table),
+        patch("shared.dynamo.emit_metrics"),
+    ):
+        create_file_record("t", None, 10 * MB, 2000000000, "h", chunk_manifest=_manifest())
+
+    assert table.put_item.call_args.kwargs["Item"]["chunk_manifest"] == _manifest()
+
+
+class TestDownloadHandler:
+    def _download(self, record):
+        event = {"headers": {}, "pathParameters": {"file_id": "Abc12345"}, "body": "{}"}
+        with (
+            patch.object(download, "begin_download", return_value=record),
+            patch.object(download, "generate_download_url", return_value="https://s3/url"),
+        ):
+            response = download.handler(event, None)
+        return json.loads(response["body"])
+
+    def test_passes_requested_access_mode(self):
+        event = {
+            "headers": {},
+            "pathParameters": {"file_id": "Abc12345"},
+            "body": json.dumps({"access_mode": "multi"}),
+        }
+        record = {"file_id": "Abc12345", "s3_key": "files/Abc12345", "access_mode": "multi"}
+        with (
+            patch.object(download, "begin_download", return_value=record) as begin,
+            patch.object(download, "generate_download_url", return_value="https://s3/url"),
+        ):
+            download.handler(event, None)
+
+        begin.assert_called_once_with(download.TABLE_NAME, "Abc12345", "multi")
+
+    def test_returns_manifest_with_url(self):
+        body = self._download(
+            {
+                "file_id": "Abc12345",
+                "s3_key": "files/Abc12345",
+                "file_size": 10 * MB,
+                "chunk_manifest": _manifest(),
+            }
+        )
+
+        assert body["download_url"] == "https://s3/url"
+        assert body["chunk_manifest"] == _manifest()
+
+    def test_legacy_record_has_no_manifest(self):
+        body = self._download(
+            {"file_id": "Abc12345", "s3_key": "files/Abc12345", "file_size": 10 * MB}
+        )
+
+        assert "chunk_manifest" not in body
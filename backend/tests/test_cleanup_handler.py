@@ -0,0 +1,244 @@
+"""Unit tests for the cleanup handler and batched delete helpers."""
+
+import json
+import time
+from unittest.mock import MagicMock, patch
+
+from botocore.exceptions import ClientError
+from lambdas.cleanup import handler as cleanup
+from shared.dynamo import batch_delete_file_records
+from shared.s3 import delete_files
+
+
+def _run(items, failed_keys=None, failed_ids=None, event=None, context=None, checkpoint=None):
+    """Run the cleanup handler over a fixed list of scanned items."""
+    with (
+        patch.object(cleanup, "EXPIRY_INDEX_NAME", None),
+        patch.object(cleanup, "SCAN_SEGMENTS", "1"),
+        patch.object(cleanup, "parallel_scan", return_value=(i for i in items)) as scan,
+        patch.object(cleanup, "delete_files", return_value=failed_keys or {}) as s3_delete,
+        patch.object(
+            cleanup, "batch_delete_file_records", return_value=failed_ids or []
+        ) as db_delete,
+        patch.object(cleanup, "get_scan_checkpoint", return_value=checkpoint),
+        patch.object(cleanup, "save_scan_checkpoint") as save,
+        patch.object(cleanup, "delete_scan_checkpoint") as delete,
+    ):
+        response = cleanup.handler(event or {}, context)
+    _run.save, _run.delete = save, delete
+    return json.loads(response["body"]), s3_delete, db_delete, scan
+
+
+class TestCleanupHandler:
+    def test_deletes_expired_and_downloaded_items_in_one_batch(self):
+        now = int(time.time())
+        items = [
+            {
+                "file_id": "expired1",
+                "content_type": "file",
+                "s3_key": "files/expired1",
+                "expires_at": now - 1,
+            },
+            {"file_id": "text0001", "content_type": "text", "expires_at": now - 1},
+            {
+                "file_id": "consumed",
+                "content_type": "file",
+                "s3_key": "files/consumed",
+                "expires_at": now + 600,
+                "downloaded": True,
+            },
+            {
+                "file_id": "livefile",
+                "content_type": "file",
+                "s3_key": "files/livefile",
+                "expires_at": now + 600,
+            },
+            {"file_id": "STATS"},
+            {"file_id": "STATS#3"},
+        ]
+
+        body, s3_delete, db_delete, _ = _run(items)
+
+        assert (body["deleted"], body["errors"]) == (3, 0)
+        s3_delete.assert_called_once_with(cleanup.BUCKET_NAME, ["files/expired1", "files/consumed"])
+        db_delete.assert_called_once_with(cleanup.TABLE_NAME, ["expired1", "text0001", "consumed"])
+
+    def test_split_text_payload_is_deleted_with_its_share(self):
+        now = int(time.time())
+        items = [
+            {
+                "file_id": "vaulttxt",
+                "content_type": "text",
+                "payload_split": True,
+                "expires_at": now - 1,
+            },
+        ]
+
+        _, s3_delete, db_delete, _ = _run(items)
+
+        s3_delete.assert_not_called()
+        db_delete.assert_called_once_with(cleanup.TABLE_NAME, ["vaulttxt", "vaulttxt#payload"])
+
+    def test_failed_s3_delete_keeps_record_and_counts_error(self):
+        now = int(time.time())
+        items = [
+            {
+                "file_id": "aaaaaaaa",
+                "content_type": "file",
+                "s3_key": "files/aaaaaaaa",
+                "expires_at": now - 1,
+            },
+            {
+                "file_id": "bbbbbbbb",
+                "content_type": "file",
+                "s3_key": "files/bbbbbbbb",
+                "expires_at": now - 1,
+            },
+        ]
+
+        body, _, db_delete, _ = _run(items, failed_keys={"files/aaaaaaaa": "AccessDenied"})
+
+        assert (body["deleted"], body["errors"]) == (1, 1)
+        db_delete.assert_called_once_with(cleanup.TABLE_NAME, ["bbbbbbbb"])
+
+    def test_failed_record_delete_is_reported(self):
+        now = int(time.time())
+        items = [{"file_id": "text0001", "content_type": "text", "expires_at": now - 1}]
+
+        body, _, _, _ = _run(items, failed_ids=["text0001"])
+
+        assert (body["deleted"], body["errors"]) == (0, 1)
+
+    def test_scan_requests_projection_and_server_side_filter(self):
+        _, _, _, scan = _run([])
+
+        kwargs = scan.call_args.kwargs
+        assert "encrypted_text" not in kwargs["ProjectionExpression"]
+        assert "s3_key" in kwargs["ProjectionExpression"]
+        assert "file_id <> :stats" in kwargs["FilterExpression"]
+        assert "NOT begins_with(file_id, :stats_shard)" in kwargs["FilterExpression"]
+        assert kwargs["ReturnConsumedCapacity"] == "TOTAL"
+
+
+class TestCleanupTimeBudget:
+    def _context(self, remaining_ms):
+        context = MagicMock()
+        context.get_remaining_time_in_millis.side_effect = remaining_ms
+        return context
+
+    def _expired(self, count):
+        now = int(time.time())
+        return [
+            {"file_id": f"text{i:04d}", "content_type": "text", "expires_at": now - 1}
+            for i in range(count)
+        ]
+
+    def test_stops_before_deadline_flushes_and_saves_checkpoint(self):
+        context = self._context([60000, 1000, 1000])
+
+        body, _, db_delete, _ = _run(self._expired(3), context=context)
+
+        assert body["completed"] is False
+        assert body["deleted"] == 2
+        db_delete.assert_called_once_with(cleanup.TABLE_NAME, ["text0000", "text0001"])
+        _run.save.assert_called_once()
+        _run.delete.assert_not_called()
+
+    def test_resumes_from_checkpoint_and_clears_it_when_done(self):
+        checkpoint = {"total_segments": 4, "cursors": {0: None, 1: {"file_id": "x"}}}
+
+        body, _, _, scan = _run(self._expired(1), checkpoint=checkpoint)
+
+        assert body["completed"] is True
+        assert scan.call_args.args[1] == 4
+        assert scan.call_args.kwargs["cursors"] == checkpoint["cursors"]
+        _run.delete.assert_called_once()
+        _run.save.assert_not_called()
+
+    def test_checkpoint_forces_scan_even_with_index(self):
+        checkpoint = {"total_segments": 2, "cursors": {}}
+
+        with (
+            patch.object(cleanup, "query_due_items") as query,
+            patch.object(cleanup, "EXPIRY_INDEX_NAME", "expiry-index"),
+        ):
+            _, _, _, scan = _run([], checkpoint=checkpoint)
+
+        query.assert_not_called()
+        scan.assert_called_once()
+
+    def test_deadline_is_honoured_while_pages_filter_to_nothing(self):
+        # 50 pages the server-side filter leaves empty; time is already up
+        def scan(**kwargs):
+            page = kwargs.get("ExclusiveStartKey", {}).get("page", 0)
+            response = {"Items": [], "ScannedCount": 100}
+            if page + 1 < 50:
+                response["LastEvaluatedKey"] = {"page": page + 1}
+            return response
+
+        table = MagicMock()
+        table.scan.side_effect = scan
+        context = self._context(lambda: 1000)
+
+        with (
+            patch("shared.dynamo._get_thread_table", return_value=table),
+            patch.object(cleanup, "EXPIRY_INDEX_NAME", None),
+            patch.object(cleanup, "SCAN_SEGMENTS", "1"),
+            patch.object(cleanup, "get_scan_checkpoint", return_value=None),
+            patch.object(cleanup, "save_scan_checkpoint") as save,
+        ):
+            body = json.loads(cleanup.handler({}, context)["body"])
+
+        assert body["completed"] is False
+        assert context.get_remaining_time_in_millis.called
+        save.assert_called_once_with(cleanup.TABLE_NAME, "cleanup", 1, {0: {"page": 1}})
+        assert table.scan.call_count < 50
+
+
+class TestBatchDeleteFileRecords:
+    def test_chunks_into_25_and_retries_unprocessed(self):
+        calls = []
+
+        def batch_write_item(RequestItems):
+            requests = RequestItems["t"]
+            calls.append(len(requests))
+            # First call leaves one item unprocessed
+            if len(calls) == 1:
+                return {"UnprocessedItems": {"t": requests[:1]}}
+            return {"UnprocessedItems": {}}
+
+        resource = MagicMock()
+        resource.batch_write_item.side_effect = batch_write_item
+
+        with patch("shared.dynamo.dynamodb", resource), patch("shared.dynamo.time.sleep"):
+            failed = batch_delete_file_records("t", [f"id{i}" for i in range(30)])
+
+        assert failed == []
+        assert calls == [25, 1, 5]
+
+    def test_returns_ids_that_could_not_be_deleted(self):
+        resource = MagicMock()
+        resource.batch_write_item.side_effect = ClientError(
+            {"Error": {"Code": "InternalServerError"}}, "BatchWriteItem"
+        )
+
+        with patch("shared.dynamo.dynamodb", resource):
+            failed = batch_delete_file_records("t", ["a", "b"])
+
+        assert failed == ["a", "b"]
+
+
+class TestDeleteFiles:
+    def test_chunks_into_1000_and_collects_errors(self):
+        client = MagicMock()
+        client.delete_objects.side_effect = [
+            {"Errors": [{"Key": "files/3", "Code": "AccessDenied", "Message": "Access Denied"}]},
+            {},
+        ]
+
+        with patch("shared.s3.s3_client", client):
+            failed = delete_files("bucket", [f"files/{i}" for i in range(1500)])
+
+        assert failed == {"files/3": "Access Denied"}
+        sizes = [len(c.kwargs["Delete"]["Objects"]) for c in client.delete_objects.call_args_list]
+        assert sizes == [1000, 500]
@@ -0,0 +1,443 @@
+"""Unit tests for single-call conditional updates and ALL_OLD failure classification."""
+
+import time
+from unittest.mock import MagicMock, patch
+
+import pytest
+from botocore.exceptions import ClientError
+from shared.constants import PIN_MAX_ATTEMPTS
+from shared.dynamo import (
+    begin_download,
+    confirm_download,
+    create_file_record,
+    create_pin_file_record,
+    increment_report_count,
+    initiate_pin_session,
+    mark_downloaded,
+    verify_pin_and_download,
+)
+from shared.exceptions import (
+    FileAlreadyDownloadedError,
+    FileExpiredError,
+    FileLockedException,
+    FileNotFoundError,
+    FileReservedError,
+    ValidationError,
+)
+from shared.pin_utils import permute_pin_file_id
+
+
+def _condition_failed(item=None):
+    response = {"Error": {"Code": "ConditionalCheckFailedException", "Message": "failed"}}
+    if item is not None:
+        response["Item"] = item
+    return ClientError(response, "UpdateItem")
+
+
+def _run(func, error):
+    table = MagicMock()
+    table.update_item.side_effect = error
+    with (
+        patch("shared.dynamo.get_table", return_value=table),
+        patch("shared.dynamo.get_file_record") as get_record,
+    ):
+        try:
+            func("t", "abc")
+        finally:
+            get_record.assert_not_called()
+            assert (
+                table.update_item.call_args.kwargs["ReturnValuesOnConditionCheckFailure"]
+                == "ALL_OLD"
+            )
+
+
+def _future():
+    return {"N": str(int(time.time()) + 3600)}
+
+
+class TestBeginDownload:
+    def test_missing_item_is_not_found(self):
+        with pytest.raises(FileNotFoundError):
+            _run(begin_download, _condition_failed())
+
+    def test_downloaded_item(self):
+        item = {"downloaded": {"BOOL": True}, "expires_at": _future()}
+        with pytest.raises(FileAlreadyDownloadedError):
+            _run(begin_download, _condition_failed(item))
+
+    def test_expired_item(self):
+        item = {"downloaded": {"BOOL": False}, "expires_at": {"N": "1"}}
+        with pytest.raises(FileExpiredError):
+            _run(begin_download, _condition_failed(item))
+
+    def test_reserved_item(self):
+        item = {
+            "downloaded": {"BOOL": False},
+            "expires_at": _future(),
+            "reserved_at": {"N": str(int(time.time()))},
+        }
+        with pytest.raises(FileReservedError):
+            _run(begin_download, _condition_failed(item))
+
+
+class TestMarkAndConfirm:
+    def test_mark_downloaded_twice(self):
+        item = {"downloaded": {"BOOL": True}, "expires_at": _future()}
+        with pytest.raises(FileAlreadyDownloadedError):
+            _run(mark_downloaded, _condition_failed(item))
+
+    def test_confirm_without_reservation(self):
+        item = {"downloaded": {"BOOL": False}, "expires_at": _future()}
+        with pytest.raises(FileNotFoundError):
+            _run(confirm_download, _condition_failed(item))
+
+
+class TestBeginVaultDownload:
+    def test_expired_vault(self):
+        item = {"access_mode": {"S": "multi"}, "expires_at": {"N": "1"}}
+        with pytest.raises(FileExpiredError):
+            _run(begin_download, _condition_failed(item))
+
+    def test_downloaded_flag_does_not_block_vault(self):
+        item = {
+            "access_mode": {"S": "multi"},
+            "downloaded": {"BOOL": True},
+            "expires_at": {"N": "1"},
+        }
+        with pytest.raises(FileExpiredError):
+            _run(begin_download, _condition_failed(item))
+
+    def test_confirm_is_rejected_for_vault(self):
+        item = {
+            "access_mode": {"S": "multi"},
+            "downloaded": {"BOOL": False},
+            "reserved_at": {"N": "1"},
+            "expires_at": _future(),
+        }
+        with pytest.raises(FileNotFoundError):
+            _run(confirm_download, _condition_failed(item))
+
+
+class TestBeginDownloadSuccess:
+    def _begin(self, record):
+        table = MagicMock()
+        table.update_item.return_value = {"Attributes": record}
+        with (
+            patch("shared.dynamo.get_table", return_value=table),
+            patch("shared.dynamo.defer") as defer,
+        ):
+            result = begin_download("t", "abc")
+        return result, table, defer
+
+    def test_single_update_for_one_time(self):
+        record = {"file_id": "abc", "access_mode": "one_time", "file_size": 10}
+        result, table, counter = self._begin(record)
+
+        assert result == record
+        assert table.update_item.call_count == 1
+        table.get_item.assert_not_called()
+        counter.assert_not_called()
+
+    def test_vault_counts_download(self):
+        record = {"file_id": "abc", "access_mode": "multi", "file_size": 10}
+        _, _, counter = self._begin(record)
+
+        counter.assert_called_once_with("count_downloads", table_name="t", file_size=10)
+
+    def test_one_time_update_only_reserves(self):
+        _, table, _ = self._begin({"file_id": "abc", "access_mode": "one_time"})
+
+        kwargs = table.update_item.call_args.kwargs
+        assert kwargs["UpdateExpression"] == "SET reserved_at = :now"
+        assert set(kwargs["ExpressionAttributeValues"]) == {":false", ":now", ":cutoff", ":multi"}
+
+    def test_vault_update_only_counts(self):
+        table = MagicMock()
+        table.update_item.return_value = {
+            "Attributes": {"file_id": "abc", "access_mode": "multi", "file_size": 10}
+        }
+        with (
+            patch("shared.dynamo.get_table", return_value=table),
+            patch("shared.dynamo.defer"),
+        ):
+            begin_download("t", "abc", "multi")
+
+        # The requested mode picks the update: one write
+        assert table.update_item.call_count == 1
+        kwargs = table.update_item.call_args.kwargs
+        assert kwargs["UpdateExpression"] == (
+            "SET last_downloaded_at = :now_iso ADD download_count :inc"
+        )
+        assert ":cutoff" not in kwargs["ExpressionAttributeValues"]
+
+    def test_wrong_mode_retries_with_the_other_update(self):
+        vault = {"access_mode": {"S": "multi"}, "expires_at": _future()}
+        table = MagicMock()
+        table.update_item.side_effect = [
+            _condition_failed(vault),
+            {"Attributes": {"file_id": "abc", "access_mode": "multi", "file_size": 10}},
+        ]
+        with (
+            patch("shared.dynamo.get_table", return_value=table),
+            patch("shared.dynamo.defer"),
+        ):
+            result = begin_download("t", "abc")
+
+        # No mode sent (older clients): the one-time update fails, then the vault one
+        expressions = [c.kwargs["UpdateExpression"] for c in table.update_item.call_args_list]
+        assert expressions == [
+            "SET reserved_at = :now",
+            "SET last_downloaded_at = :now_iso ADD download_count :inc",
+        ]
+        assert result["access_mode"] == "multi"
+
+
+class TestInitiatePinSession:
+    def _pin_item(self, **extra):
+        item = {
+            "access_mode": {"S": "pin"},
+            "downloaded": {"BOOL": False},
+            "expires_at": _future(),
+        }
+        item.update(extra)
+        return item
+
+    def test_single_update_when_not_locked(self):
+        table = MagicMock()
+        table.update_item.return_value = {"Attributes": {"attempts_left": 2}}
+        with patch("shared.dynamo.get_table", return_value=table):
+            result = initiate_pin_session("t", "123456")
+
+        assert result["attempts_left"] == 2
+        assert table.update_item.call_count == 1
+        table.get_item.assert_not_called()
+
+    def test_active_lock(self):
+        locked = {"N": str(int(time.time()) + 7200)}
+        with pytest.raises(FileLockedException):
+            _run(initiate_pin_session, _condition_failed(self._pin_item(locked_until=locked)))
+
+    def test_not_a_pin_record(self):
+        item = self._pin_item(access_mode={"S": "one_time"})
+        with pytest.raises(FileNotFoundError):
+            _run(initiate_pin_session, _condition_failed(item))
+
+    def test_expired_lock_is_reset_with_second_update(self):
+        table = MagicMock()
+        table.update_item.side_effect = [
+            _condition_failed(self._pin_item(locked_until={"N": "5"})),
+            {"Attributes": {"attempts_left": PIN_MAX_ATTEMPTS}},
+        ]
+        with patch("shared.dynamo.get_table", return_value=table):
+            result = initiate_pin_session("t", "123456")
+
+        assert result["attempts_left"] == PIN_MAX_ATTEMPTS
+        reset = table.update_item.call_args.kwargs
+        assert "REMOVE locked_until" in reset["UpdateExpression"]
+        assert reset["ExpressionAttributeValues"][":locked"] == 5
+
+    def test_lost_reset_race_retries_against_current_state(self):
+        table = MagicMock()
+        table.update_item.side_effect = [
+            _condition_failed(self._pin_item(locked_until={"N": "5"})),
+            # Another session reset the lock first
+            _condition_failed(self._pin_item(attempts_left={"N": "3"})),
+            {"Attributes": {"attempts_left": 3}},
+        ]
+        with patch("shared.dynamo.get_table", return_value=table):
+            result = initiate_pin_session("t", "123456")
+
+        assert result["attempts_left"] == 3
+        retry = table.update_item.call_args.kwargs
+        assert "attribute_not_exists(locked_until)" in retry["ConditionExpression"]
+        assert ":locked" not in retry["ExpressionAttributeValues"]
+
+    def test_lost_reset_race_to_new_lock_reports_it(self):
+        locked = {"N": str(int(time.time()) + 7200)}
+        table = MagicMock()
+        table.update_item.side_effect = [
+            _condition_failed(self._pin_item(locked_until={"N": "5"})),
+            _condition_failed(self._pin_item(locked_until=locked)),
+        ]
+        with (
+            patch("shared.dynamo.get_table", return_value=table),
+            pytest.raises(FileLockedException, match="Try again in 2 hours"),
+        ):
+            initiate_pin_session("t", "123456")
+
+
+class TestCreateFileRecordAllocation:
+    def _create(self, put_side_effect):
+        table = MagicMock()
+        table.put_item.side_effect = put_side_effect
+        with (
+            patch("shared.dynamo.get_table", return_value=table),
+            patch("shared.dynamo.get_file_record") as get_record,
+            patch("shared.dynamo.generate_short_file_id", side_effect=["id1", "id2", "id3"]),
+            patch("shared.dynamo.emit_metrics") as emit,
+        ):
+            record = create_file_record("t", None, 10, 2000000000, "h")
+        get_record.assert_not_called()
+        return record, table, emit
+
+    def test_allocates_id_and_s3_key_without_read(self):
+        record, table, emit = self._create(None)
+
+        assert record["file_id"] == "id1"
+        assert record["s3_key"] == "files/id1"
+        assert table.put_item.call_count == 1
+        emit.assert_called_once_with({"FileIdAllocations": 1, "FileIdCollisions": 0})
+
+    def test_collision_retries_with_new_id(self):
+        record, table, emit = self._create([_condition_failed(), _condition_failed(), None])
+
+        assert record["file_id"] == "id3"
+        assert record["s3_key"] == "files/id3"
+        assert table.put_item.call_count == 3
+        emit.assert_called_once_with({"FileIdAllocations": 1, "FileIdCollisions": 2})
+
+    def test_explicit_id_collision_is_not_retried(self):
+        table = MagicMock()
+        table.put_item.side_effect = _condition_failed()
+        with patch("shared.dynamo.get_table", return_value=table), pytest.raises(ValueError):
+            create_file_record("t", "taken", 10, 2000000000, "h", s3_key="files/taken")
+        assert table.put_item.call_count == 1
+
+
+class TestCreatePinFileRecordAllocation:
+    def _create(self, put_side_effect, counter_values):
+        table = MagicMock()
+        table.put_item.side_effect = put_side_effect
+        table.update_item.side_effect = [
+            {"Attributes": {"next_index": index, "live_count": 7}} for index in counter_values
+        ]
+        with (
+            patch("shared.dynamo.get_table", return_value=table),
+            patch("shared.dynamo.emit_metrics") as emit,
+        ):
+            record = create_pin_file_record(
+                "t", None, 10, 2000000000, "h", "hash", "salt", id_key=b"k" * 32
+            )
+        return record, table, emit
+
+    def test_allocates_from_counter(self):
+        record, table, emit = self._create(None, [1])
+
+        assert record["file_id"] == permute_pin_file_id(0, b"k" * 32)
+        assert record["s3_key"] == f"files/{record['file_id']}"
+        update = table.update_item.call_args.kwargs
+        assert update["ExpressionAttributeValues"][":live"] == 1
+        emit.assert_any_call({"PinIdSpaceUtilization": 0.0007}, unit="Percent")
+
+    def test_wrapped_counter_collision_takes_next_value(self):
+        record, table, emit = self._create([_condition_failed(), None], [1000001, 1000002])
+
+        assert record["file_id"] == permute_pin_file_id(1, b"k" * 32)
+        retry = table.update_item.call_args.kwargs
+        assert retry["ExpressionAttributeValues"][":live"] == 0
+        emit.assert_any_call({"PinIdAllocations": 1, "PinIdCollisions": 1})
+
+
+class TestVerifyPinAndDownload:
+    def _record(self, attempts_left=3):
+        return {
+            "file_id": "123456",
+            "access_mode": "pin",
+            "downloaded": False,
+            "expires_at": int(time.time()) + 3600,
+            "session_expires": int(time.time()) + 60,
+            "attempts_left": attempts_left,
+            "salt": "00",
+            "pin_hash": "hash",
+        }
+
+    def _verify(self, record, pin_ok, update_side_effect=None):
+        table = MagicMock()
+        table.update_item.side_effect = update_side_effect
+        with (
+            patch("shared.dynamo.get_table", return_value=table),
+            patch("shared.dynamo.get_cached_record", return_value=record),
+            patch("shared.pin_utils.verify_pin_hash", return_value=pin_ok),
+        ):
+            try:
+                verify_pin_and_download("t", "123456", "1234")
+            finally:
+                self.calls = [c.kwargs for c in table.update_item.call_args_list]
+
+    def test_wrong_pin_is_one_guarded_decrement(self):
+        with pytest.raises(ValidationError, match="2 attempts left"):
+            self._verify(self._record(), pin_ok=False)
+
+        assert len(self.calls) == 1
+        update = self.calls[0]
+        assert update["ConditionExpression"].startswith("attempts_left = :seen AND ")
+        assert update["ExpressionAttributeValues"][":seen"] == 3
+        assert update["ExpressionAttributeValues"][":attempts"] == 2
+
+    def test_last_wrong_pin_sets_lock(self):
+        with pytest.raises(FileLockedException):
+            self._verify(self._record(attempts_left=1), pin_ok=False)
+
+        assert "locked_until = :locked" in self.calls[0]["UpdateExpression"]
+
+    def test_concurrent_guess_retries_with_fresh_attempts(self):
+        current = {
+            "access_mode": {"S": "pin"},
+            "downloaded": {"BOOL": False},
+            "expires_at": _future(),
+            "session_expires": _future(),
+            "attempts_left": {"N": "1"},
+        }
+        with pytest.raises(FileLockedException):
+            self._verify(
+                self._record(), pin_ok=False, update_side_effect=[_condition_failed(current), None]
+            )
+
+        assert [c["ExpressionAttributeValues"][":seen"] for c in self.calls] == [3, 1]
+
+    def test_concurrent_lock_stops_guessing(self):
+        current = {
+            "access_mode": {"S": "pin"},
+            "downloaded": {"BOOL": False},
+            "expires_at": _future(),
+            "session_expires": _future(),
+            "attempts_left": {"N": "0"},
+            "locked_until": _future(),
+        }
+        with pytest.raises(FileLockedException):
+            self._verify(
+                self._record(), pin_ok=False, update_side_effect=[_condition_failed(current)]
+            )
+
+        assert len(self.calls) == 1
+
+    def test_correct_pin_is_one_conditional_reserve(self):
+        self._verify(self._record(), pin_ok=True, update_side_effect=[{"Attributes": {}}])
+
+        assert len(self.calls) == 1
+        condition = self.calls[0]["ConditionExpression"]
+        assert "session_expires > :now" in condition
+        assert "attempts_left > :zero" in condition
+
+
+class TestIncrementReportCount:
+    def _report(self, update_side_effect):
+        table = MagicMock()
+        table.update_item.side_effect = update_side_effect
+        with patch("shared.dynamo.get_table", return_value=table):
+            count = increment_report_count("t", "abc", "reporter-1")
+        return count, table.update_item.call_args.kwargs
+
+    def test_new_reporter_is_counted(self):
+        count, kwargs = self._report([{"Attributes": {"report_count": 1}}])
+
+        assert count == 1
+        assert kwargs["ExpressionAttributeValues"][":reporters"] == {"reporter-1"}
+        assert "NOT contains(reporters, :reporter)" in kwargs["ConditionExpression"]
+
+    def test_repeat_reporter_keeps_count(self):
+        current = {"report_count": {"N": "2"}, "reporters": {"SS": ["reporter-1"]}}
+
+        count, _ = self._report([_condition_failed(current)])
+
+        assert count == 2
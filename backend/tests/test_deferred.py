@@ -0,0 +1,180 @@
+"""Unit tests for the deferred side-effect queue and its worker."""
+
+import json
+from unittest.mock import MagicMock, patch
+
+import pytest
+from botocore.exceptions import ClientError, EndpointConnectionError
+from lambdas.deferred_worker import handler as deferred_worker
+from shared.deferred import (
+    TASK_ABUSE_THRESHOLD,
+    TASK_COUNT_DOWNLOADS,
+    TASK_DELETE_CONSUMED,
+    InMemoryQueue,
+    defer,
+    run_tasks,
+    set_queue,
+)
+from shared.dynamo import strip_consumed_records
+
+
+@pytest.fixture
+def queue():
+    """Route deferred tasks to an in-memory queue."""
+    queue = InMemoryQueue()
+    set_queue(queue)
+    yield queue
+    set_queue(None)
+
+
+class TestDefer:
+    def test_enqueues_without_running(self, queue):
+        with patch("shared.dynamo.increment_download_counter") as counter:
+            defer(TASK_COUNT_DOWNLOADS, table_name="t", file_size=10)
+
+        assert queue.tasks == [{"type": "count_downloads", "table_name": "t", "file_size": 10}]
+        counter.assert_not_called()
+
+    def test_runs_inline_without_queue(self):
+        with patch("shared.dynamo.increment_download_counter") as counter:
+            defer(TASK_COUNT_DOWNLOADS, table_name="t", file_size=10)
+
+        counter.assert_called_once_with("t", file_size=10, downloads=1)
+
+    def test_runs_inline_when_enqueue_fails(self, queue):
+        error = ClientError({"Error": {"Code": "ServiceUnavailable"}}, "SendMessage")
+        with (
+            patch.object(queue, "send", side_effect=error),
+            patch("shared.dynamo.increment_download_counter") as counter,
+        ):
+            defer(TASK_COUNT_DOWNLOADS, table_name="t", file_size=10)
+
+        counter.assert_called_once()
+
+    def test_runs_inline_on_connection_error(self, queue):
+        error = EndpointConnectionError(endpoint_url="https://sqs.example")
+        with (
+            patch.object(queue, "send", side_effect=error),
+            patch("shared.dynamo.increment_download_counter") as counter,
+        ):
+            defer(TASK_COUNT_DOWNLOADS, table_name="t", file_size=10)
+
+        counter.assert_called_once()
+
+    def test_inline_task_errors_do_not_escape(self):
+        with patch("shared.dynamo.strip_consumed_records", side_effect=RuntimeError("boom")):
+            defer(TASK_DELETE_CONSUMED, table_name="t", file_id="aaaa")
+
+    def test_never_raises(self):
+        with patch("shared.dynamo.increment_download_counter", side_effect=RuntimeError("boom")):
+            defer(TASK_COUNT_DOWNLOADS, table_name="t", file_size=10)
+
+
+class TestRunTasks:
+    def test_coalesces_download_counts(self, queue):
+        for size in (10, 20, 30):
+            defer(TASK_COUNT_DOWNLOADS, table_name="t", file_size=size)
+
+        with patch("shared.dynamo.increment_download_counter") as counter:
+            assert queue.drain() == []
+
+        counter.assert_called_once_with("t", file_size=60, downloads=3)
+
+    def test_consumed_records_keep_a_tombstone(self):
+        tasks = {
+            "m1": {"type": TASK_DELETE_CONSUMED, "table_name": "t", "file_id": "aaaa"},
+            "m2": {
+                "type": TASK_DELETE_CONSUMED,
+                "table_name": "t",
+                "file_id": "bbbb",
+                "payload_split": True,
+            },
+        }
+        with (
+            patch("shared.dynamo.strip_consumed_records", return_value=[]) as strip,
+            patch(
+                "shared.dynamo.batch_delete_file_records", return_value=["bbbb#payload"]
+            ) as delete,
+        ):
+            failed = run_tasks(tasks)
+
+        strip.assert_called_once_with("t", ["aaaa", "bbbb"])
+        delete.assert_called_once_with("t", ["bbbb#payload"])
+        assert failed == ["m2"]
+
+    def test_tombstone_keeps_downloaded_record(self):
+        table = MagicMock()
+        with patch("shared.dynamo.get_table", return_value=table):
+            assert strip_consumed_records("t", ["aaaa"]) == []
+
+        table.delete_item.assert_not_called()
+        kwargs = table.update_item.call_args.kwargs
+        assert kwargs["UpdateExpression"] == "REMOVE encrypted_text"
+        assert kwargs["ConditionExpression"] == "downloaded = :true"
+
+    def test_repeat_download_of_tombstone_is_410(self):
+        from lambdas.download import handler as download
+
+        table = MagicMock()
+        table.update_item.side_effect = ClientError(
+            {
+                "Error": {"Code": "ConditionalCheckFailedException"},
+                "Item": {
+                    "file_id": {"S": "aB3dE5gH"},
+                    "downloaded": {"BOOL": True},
+                    "expires_at": {"N": "9999999999"},
+                },
+            },
+            "UpdateItem",
+        )
+        event = {"headers": {}, "pathParameters": {"file_id": "aB3dE5gH"}, "body": "{}"}
+        with patch("shared.dynamo.get_table", return_value=table):
+            response = download.handler(event, None)
+
+        assert response["statusCode"] == 410
+
+    def test_abuse_threshold_deletes_object_and_record(self):
+        task = {
+            "type": TASK_ABUSE_THRESHOLD,
+            "table_name": "t",
+            "bucket_name": "b",
+            "file_id": "aaaa",
+            "report_count": 3,
+        }
+        record = {"content_type": "file", "s3_key": "files/aaaa"}
+        with (
+            patch("shared.dynamo.get_file_record", return_value=record),
+            patch("shared.s3.delete_files", return_value={}) as s3_delete,
+            patch("shared.dynamo.batch_delete_file_records", return_value=[]) as delete,
+        ):
+            assert run_tasks({"m1": task}) == []
+
+        s3_delete.assert_called_once_with("b", ["files/aaaa"])
+        delete.assert_called_once_with("t", ["aaaa"])
+
+    def test_abuse_threshold_keeps_record_when_object_delete_fails(self):
+        task = {"type": TASK_ABUSE_THRESHOLD, "table_name": "t", "bucket_name": "b", "file_id": "a"}
+        record = {"content_type": "file", "s3_key": "files/a"}
+        with (
+            patch("shared.dynamo.get_file_record", return_value=record),
+            patch("shared.s3.delete_files", return_value={"files/a": "AccessDenied"}),
+            patch("shared.dynamo.batch_delete_file_records") as delete,
+        ):
+            assert run_tasks({"m1": task}) == ["m1"]
+
+        delete.assert_not_called()
+
+
+class TestDeferredWorker:
+    def test_reports_failed_messages_only(self):
+        event = {
+            "Records": [
+                {"messageId": "m1", "body": json.dumps({"type": TASK_COUNT_DOWNLOADS})},
+                {"messageId": "m2", "body": "not json"},
+            ]
+        }
+        with patch.object(deferred_worker, "run_tasks", return_value=["m1"]) as run:
+            result = deferred_worker.handler(event, None)
+
+        assert run.call_args.args[0] == {"m1": {"type": "count_downloads"}}
+        assert result == {"batchItemFailures": [{"itemIdentifier": "m1"}]}
@@ -0,0 +1,58 @@
+"""Unit tests for the write-sharded expiry index helpers."""
+
+from unittest.mock import MagicMock, patch
+
+from shared.constants import EXPIRY_BUCKET_SECONDS, EXPIRY_INDEX_SHARDS
+from shared.dynamo import expiry_bucket_for, query_due_items
+
+
+class TestExpiryBucketFor:
+    def test_bucket_is_epoch_hour_with_shard(self):
+        assert expiry_bucket_for(7200, shard=3) == "2#3"
+
+    def test_same_hour_maps_to_same_bucket(self):
+        start = 10 * EXPIRY_BUCKET_SECONDS
+        assert expiry_bucket_for(start, shard=0) == expiry_bucket_for(start + 3599, shard=0)
+
+    def test_random_shard_is_in_range(self):
+        for _ in range(100):
+            _, shard = expiry_bucket_for(3600).split("#")
+            assert 0 <= int(shard) < EXPIRY_INDEX_SHARDS
+
+
+class TestQueryDueItems:
+    def _run(self, table, current_time, lookback_hours):
+        with patch("shared.dynamo.get_table", return_value=table):
+            return list(query_due_items("t", "expiry-index", current_time, lookback_hours))
+
+    def test_queries_every_shard_of_every_due_bucket(self):
+        table = MagicMock()
+        table.query.return_value = {"Items": []}
+
+        self._run(table, current_time=5 * EXPIRY_BUCKET_SECONDS + 10, lookback_hours=2)
+
+        buckets = [
+            c.kwargs["ExpressionAttributeValues"][":bucket"] for c in table.query.call_args_list
+        ]
+        assert len(buckets) == 3 * EXPIRY_INDEX_SHARDS
+        assert buckets[0] == "3#0"
+        assert buckets[-1] == f"5#{EXPIRY_INDEX_SHARDS - 1}"
+
+    def test_follows_pagination(self):
+        table = MagicMock()
+        pages = {
+            None: {"Items": [{"file_id": "a"}], "LastEvaluatedKey": {"file_id": "a"}},
+            "a": {"Items": [{"file_id": "b"}]},
+        }
+
+        def query(**kwargs):
+            if kwargs["ExpressionAttributeValues"][":bucket"] != "0#0":
+                return {"Items": []}
+            start = kwargs.get("ExclusiveStartKey", {}).get("file_id")
+            return pages[start]
+
+        table.query.side_effect = query
+
+        items = self._run(table, current_time=100, lookback_hours=0)
+
+        assert [i["file_id"] for i in items] == ["a", "b"]
@@ -0,0 +1,89 @@
+"""Unit tests for get_metadata handler — projected and cached record reads."""
+
+import json
+import time
+from unittest.mock import MagicMock, patch
+
+from botocore.exceptions import ClientError
+from lambdas.get_metadata import handler as get_metadata
+from shared.dynamo import get_file_record
+
+
+def _event(file_id: str = "aB3dE5gH") -> dict:
+    return {"headers": {}, "pathParameters": {"file_id": file_id}}
+
+
+class TestGetFileRecordProjection:
+    def test_projection_uses_name_placeholders(self):
+        table = MagicMock()
+        table.get_item.return_value = {"Item": {"file_id": "x"}}
+
+        with patch("shared.dynamo.get_table", return_value=table):
+            get_file_record("t", "x", attributes=("file_id", "downloaded"))
+
+        kwargs = table.get_item.call_args.kwargs
+        assert kwargs["ProjectionExpression"] == "#a0, #a1"
+        assert kwargs["ExpressionAttributeNames"] == {"#a0": "file_id", "#a1": "downloaded"}
+
+    def test_no_projection_by_default(self):
+        table = MagicMock()
+        table.get_item.return_value = {}
+
+        with patch("shared.dynamo.get_table", return_value=table):
+            assert get_file_record("t", "x") is None
+
+        assert "ProjectionExpression" not in table.get_item.call_args.kwargs
+
+
+class TestGetMetadataHandler:
+    def test_reads_only_mutable_state_fresh(self):
+        record = {
+            "file_id": "aB3dE5gH",
+            "content_type": "text",
+            "file_size": 42,
+            "expires_at": int(time.time()) + 3600,
+            "access_mode": "multi",
+            "download_count": 3,
+        }
+        with patch.object(get_metadata, "get_cached_record", return_value=record) as get_record:
+            response = get_metadata.handler(_event(), None)
+
+        assert get_record.call_args.args == (
+            get_metadata.TABLE_NAME,
+            "aB3dE5gH",
+            get_metadata.METADATA_MUTABLE_ATTRIBUTES,
+        )
+        assert get_record.call_args.kwargs == {
+            "immutable_attributes": get_metadata.METADATA_ATTRIBUTES,
+            "scope": "metadata",
+        }
+        assert "encrypted_text" not in get_metadata.METADATA_ATTRIBUTES
+        assert "pin_hash" not in get_metadata.METADATA_ATTRIBUTES
+        body = json.loads(response["body"])
+        assert body["available"] is True
+        assert body["download_count"] == 3
+
+    def test_pending_multipart_upload_is_not_available(self):
+        record = {
+            "file_id": "aB3dE5gH",
+            "content_type": "file",
+            "file_size": 42,
+            "expires_at": int(time.time()) + 3600,
+            "access_mode": "multi",
+            "upload_id": "up-1",
+        }
+        with patch.object(get_metadata, "get_cached_record", return_value=record):
+            response = get_metadata.handler(_event(), None)
+
+        assert "upload_id" in get_metadata.METADATA_MUTABLE_ATTRIBUTES
+        assert json.loads(response["body"])["available"] is False
+
+    def test_read_error_is_404(self):
+        error = ClientError(
+            {"Error": {"Code": "ProvisionedThroughputExceededException"}}, "GetItem"
+        )
+        with patch.object(get_metadata, "get_cached_record", side_effect=error):
+            response = get_metadata.handler(_event(), None)
+
+        assert response["statusCode"] == 404
+        assert "Cache-Control" not in (response.get("headers") or {})
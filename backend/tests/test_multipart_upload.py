@@ -0,0 +1,236 @@
+"""Unit tests for resumable multipart uploads."""
+
+import json
+import time
+from unittest.mock import MagicMock, patch
+
+import pytest
+from botocore.exceptions import ClientError
+from lambdas.cleanup import handler as cleanup
+from lambdas.upload_multipart import handler as upload_multipart
+from shared.dynamo import begin_download, get_multipart_upload
+from shared.exceptions import FileExpiredError, FileNotFoundError, FileReservedError
+from shared.security import hash_upload_token
+
+TOKEN = "upload-token"
+
+
+def _record(**overrides):
+    return {
+        "file_id": "Abc12345",
+        "s3_key": "files/Abc12345",
+        "file_size": 40,
+        "expires_at": int(time.time()) + 3600,
+        "upload_id": "up-1",
+        "part_size": 16,
+        "part_count": 3,
+        "upload_token_hash": hash_upload_token(TOKEN),
+        **overrides,
+    }
+
+
+def _parts(*numbers):
+    return [{"PartNumber": n, "ETag": f'"etag{n}"', "Size": 16} for n in numbers]
+
+
+def _call(action, uploaded=(), record=None, parts=None, parts_error=None, **body):
+    event = {
+        "headers": {},
+        "pathParameters": {"file_id": "Abc12345", "action": action},
+        "body": json.dumps({"upload_token": TOKEN, **body}),
+    }
+    mocks = {
+        "get_multipart_upload": MagicMock(return_value=record or _record()),
+        "list_uploaded_parts": MagicMock(
+            return_value=parts if parts is not None else _parts(*uploaded),
+            side_effect=parts_error,
+        ),
+        "generate_part_upload_urls": MagicMock(
+            side_effect=lambda b, k, u, numbers, expires_in: {n: f"url{n}" for n in numbers}
+        ),
+        "complete_multipart_upload": MagicMock(),
+        "finish_multipart_upload": MagicMock(),
+        "abort_multipart_upload": MagicMock(),
+        "delete_pending_upload": MagicMock(),
+    }
+    with patch.multiple(upload_multipart, **mocks):
+        response = upload_multipart.handler(event, None)
+    return response["statusCode"], json.loads(response["body"]), mocks
+
+
+class TestUploadMultipartHandler:
+    def test_parts_signs_only_missing_parts(self):
+        status, body, mocks = _call("parts", uploaded=(1, 3))
+
+        assert status == 200
+        assert [p["part_number"] for p in body["uploaded_parts"]] == [1, 3]
+        assert body["part_urls"] == [{"part_number": 2, "url": "url2"}]
+        mocks["get_multipart_upload"].assert_called_once_with(
+            upload_multipart.TABLE_NAME, "Abc12345", hash_upload_token(TOKEN)
+        )
+
+    def test_parts_re_signs_requested_parts(self):
+        status, body, _ = _call("parts", uploaded=(1,), part_numbers=[1, 2, 2])
+
+        assert status == 200
+        assert [p["part_number"] for p in body["part_urls"]] == [1, 2]
+
+    def test_parts_rejects_out_of_range_numbers(self):
+        status, _, _ = _call("parts", part_numbers=[4])
+
+        assert status == 400
+
+    def test_complete_uses_etags_from_s3(self):
+        status, _, mocks = _call("complete", uploaded=(1, 2, 3))
+
+        assert status == 200
+        mocks["complete_multipart_upload"].assert_called_once_with(
+            upload_multipart.BUCKET_NAME, "files/Abc12345", "up-1", _parts(1, 2, 3)
+        )
+        mocks["finish_multipart_upload"].assert_called_once_with(
+            upload_multipart.TABLE_NAME, "Abc12345", "up-1"
+        )
+
+    def test_complete_with_missing_parts_is_rejected(self):
+        status, body, mocks = _call("complete", uploaded=(1, 3))
+
+        assert status == 400
+        assert "1 of 3 parts missing" in body["error"]
+        mocks["complete_multipart_upload"].assert_not_called()
+        mocks["finish_multipart_upload"].assert_not_called()
+
+    def test_complete_rejects_oversized_upload_and_aborts(self):
+        parts = _parts(1, 2) + [{"PartNumber": 3, "ETag": '"etag3"', "Size": 5 * 1024**3}]
+
+        status, _, mocks = _call("complete", parts=parts)
+
+        assert status == 413
+        mocks["complete_multipart_upload"].assert_not_called()
+        mocks["abort_multipart_upload"].assert_called_once()
+        mocks["delete_pending_upload"].assert_called_once()
+
+    def test_complete_rejects_wrong_part_size(self):
+        parts = _parts(1, 2, 3)
+        parts[0]["Size"] = 8
+        parts[2]["Size"] = 24
+
+        status, _, mocks = _call("complete", parts=parts)
+
+        assert status == 400
+        mocks["complete_multipart_upload"].assert_not_called()
+        mocks["abort_multipart_upload"].assert_called_once()
+
+    def test_complete_checks_manifest_total_size(self):
+        record = _record(chunk_manifest={"chunk_size": 16, "chunk_count": 3, "total_size": 47})
+
+        status, _, mocks = _call("complete", uploaded=(1, 2, 3), record=record)
+
+        assert status == 413
+        mocks["complete_multipart_upload"].assert_not_called()
+
+    def test_upload_aborted_by_lifecycle_is_gone(self):
+        error = ClientError({"Error": {"Code": "NoSuchUpload"}}, "ListParts")
+
+        status, _, mocks = _call("parts", parts_error=error)
+
+        assert status == 410
+        mocks["delete_pending_upload"].assert_called_once()
+
+    def test_abort_frees_parts_and_deletes_record(self):
+        status, _, mocks = _call("abort")
+
+        assert status == 200
+        mocks["abort_multipart_upload"].assert_called_once_with(
+            upload_multipart.BUCKET_NAME, "files/Abc12345", "up-1"
+        )
+        mocks["delete_pending_upload"].assert_called_once_with(
+            upload_multipart.TABLE_NAME, "Abc12345", "up-1"
+        )
+
+    def test_unknown_action_is_rejected(self):
+        status, _, _ = _call("merge")
+
+        assert status == 400
+
+    def test_unknown_upload_is_404(self):
+        with patch.object(
+            upload_multipart,
+            "get_multipart_upload",
+            side_effect=FileNotFoundError("Upload not found"),
+        ):
+            response = upload_multipart.handler(
+                {
+                    "headers": {},
+                    "pathParameters": {"file_id": "Abc12345", "action": "parts"},
+                    "body": json.dumps({"upload_token": "wrong"}),
+                },
+                None,
+            )
+
+        assert response["statusCode"] == 404
+
+
+class TestGetMultipartUpload:
+    def _get(self, item):
+        table = MagicMock()
+        table.get_item.return_value = {"Item": item} if item else {}
+        with patch("shared.dynamo.get_table", return_value=table):
+            return get_multipart_upload("t", "Abc12345", hash_upload_token(TOKEN))
+
+    def test_returns_pending_upload_for_its_token(self):
+        assert self._get(_record())["upload_id"] == "up-1"
+
+    def test_wrong_token_looks_like_missing_upload(self):
+        with pytest.raises(FileNotFoundError):
+            self._get(_record(upload_token_hash=hash_upload_token("other")))
+
+    def test_completed_upload_is_not_found(self):
+        record = _record()
+        del record["upload_id"], record["upload_token_hash"]
+
+        with pytest.raises(FileNotFoundError):
+            self._get(record)
+
+    def test_expired_share(self):
+        with pytest.raises(FileExpiredError):
+            self._get(_record(expires_at=int(time.time()) - 1))
+
+
+def test_begin_download_refuses_unfinished_upload():
+    table = MagicMock()
+    table.update_item.side_effect = ClientError(
+        {
+            "Error": {"Code": "ConditionalCheckFailedException"},
+            "Item": {
+                "file_id": {"S": "Abc12345"},
+                "upload_id": {"S": "up-1"},
+                "expires_at": {"N": str(int(time.time()) + 3600)},
+            },
+        },
+        "UpdateItem",
+    )
+
+    with patch("shared.dynamo.get_table", return_value=table):
+        with pytest.raises(FileReservedError, match="upload not complete"):
+            begin_download("t", "Abc12345")
+
+
+def test_cleanup_aborts_unfinished_upload():
+    item = {
+        "file_id": "Abc12345",
+        "content_type": "file",
+        "s3_key": "files/Abc12345",
+        "expires_at": int(time.time()) - 1,
+        "upload_id": "up-1",
+    }
+
+    with (
+        patch.object(cleanup, "abort_multipart_upload") as abort,
+        patch.object(cleanup, "delete_files", return_value={}),
+        patch.object(cleanup, "batch_delete_file_records", return_value=[]) as db_delete,
+    ):
+        deleted, errors = cleanup._flush([item])
+
+    abort.assert_called_once_with(cleanup.BUCKET_NAME, "files/Abc12345", "up-1")
+    db_delete.assert_called_once_with(cleanup.TABLE_NAME, ["Abc12345"])
+    assert (deleted, errors) == (1, 0)
@@ -0,0 +1,98 @@
+"""Unit tests for negative-result caching and Cache-Control on 404/410."""
+
+import time
+from unittest.mock import MagicMock, patch
+
+import pytest
+from botocore.exceptions import ClientError
+from lambdas.get_metadata import handler as get_metadata
+from shared import dynamo
+from shared.dynamo import begin_download, check_negative_result, remember_negative_result
+from shared.exceptions import FileExpiredError, FileNotFoundError, FileReservedError
+
+
+def _condition_failed(item=None):
+    response = {"Error": {"Code": "ConditionalCheckFailedException"}}
+    if item is not None:
+        response["Item"] = item
+    return ClientError(response, "UpdateItem")
+
+
+class TestNegativeResults:
+    def test_cached_error_is_re_raised_per_scope(self):
+        remember_negative_result("download", "abc", FileExpiredError("File has expired"))
+
+        with pytest.raises(FileExpiredError, match="File has expired"):
+            check_negative_result("download", "abc")
+        check_negative_result("metadata", "abc")
+
+    def test_entries_expire(self):
+        with patch("shared.dynamo.time.monotonic", side_effect=[0.0, 1000.0]):
+            remember_negative_result("download", "abc", FileNotFoundError("File not found"))
+            check_negative_result("download", "abc")
+
+        assert "download:abc" not in dynamo._negative_results
+
+    def test_is_bounded(self, monkeypatch):
+        monkeypatch.setattr(dynamo, "NEGATIVE_CACHE_MAX_ENTRIES", 2)
+        for file_id in ("a", "b", "c"):
+            remember_negative_result("download", file_id, FileNotFoundError("File not found"))
+
+        assert list(dynamo._negative_results) == ["download:b", "download:c"]
+
+
+class TestBeginDownloadNegativeCache:
+    def _begin(self, table):
+        with patch("shared.dynamo.get_table", return_value=table):
+            return begin_download("t", "abc")
+
+    def test_missing_id_is_read_once(self):
+        table = MagicMock()
+        table.update_item.side_effect = _condition_failed()
+
+        for _ in range(3):
+            with pytest.raises(FileNotFoundError):
+                self._begin(table)
+
+        assert table.update_item.call_count == 1
+
+    def test_reserved_is_not_cached(self):
+        item = {
+            "downloaded": {"BOOL": False},
+            "expires_at": {"N": str(int(time.time()) + 600)},
+            "reserved_at": {"N": str(int(time.time()))},
+        }
+        table = MagicMock()
+        table.update_item.side_effect = _condition_failed(item)
+
+        for _ in range(2):
+            with pytest.raises(FileReservedError):
+                self._begin(table)
+
+        assert table.update_item.call_count == 2
+
+
+class TestMetadataCacheControl:
+    def _event(self):
+        return {"headers": {}, "pathParameters": {"file_id": "aB3dE5gH"}}
+
+    def test_not_found_is_cacheable_and_cached(self):
+        with patch.object(get_metadata, "get_cached_record", return_value=None) as get_record:
+            first = get_metadata.handler(self._event(), None)
+            second = get_metadata.handler(self._event(), None)
+
+        assert first["statusCode"] == second["statusCode"] == 404
+        assert first["headers"]["Cache-Control"] == "public, max-age=30"
+        assert get_record.call_count == 1
+
+    def test_success_is_not_cacheable(self):
+        record = {
+            "file_id": "aB3dE5gH",
+            "file_size": 1,
+            "expires_at": int(time.time()) + 600,
+        }
+        with patch.object(get_metadata, "get_cached_record", return_value=record):
+            response = get_metadata.handler(self._event(), None)
+
+        assert response["statusCode"] == 200
+        assert "Cache-Control" not in response["headers"]
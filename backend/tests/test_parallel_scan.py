@@ -0,0 +1,166 @@
+"""Unit tests for the parallel segmented scan engine."""
+
+from unittest.mock import MagicMock, patch
+
+import pytest
+from botocore.exceptions import ClientError
+from shared.constants import PARALLEL_SCAN_BYTES_PER_SEGMENT, PARALLEL_SCAN_MAX_SEGMENTS
+from shared.dynamo import parallel_scan, scan_segments_for_table
+
+
+def _segmented_table(pages_per_segment: int, items_per_page: int) -> MagicMock:
+    """Fake table whose scan pages are derived from Segment/ExclusiveStartKey."""
+
+    def scan(**kwargs):
+        segment = kwargs["Segment"]
+        page = kwargs.get("ExclusiveStartKey", {}).get("page", 0)
+        items = [{"file_id": f"{segment}-{page}-{i}"} for i in range(items_per_page)]
+        response = {"Items": items}
+        if page + 1 < pages_per_segment:
+            response["LastEvaluatedKey"] = {"page": page + 1}
+        return response
+
+    table = MagicMock()
+    table.scan.side_effect = scan
+    return table
+
+
+class TestParallelScan:
+    def test_yields_every_item_from_every_segment(self):
+        table = _segmented_table(pages_per_segment=3, items_per_page=5)
+
+        with patch("shared.dynamo._get_thread_table", return_value=table):
+            items = list(parallel_scan("t", total_segments=4, max_workers=2))
+
+        assert len(items) == 4 * 3 * 5
+        assert len({item["file_id"] for item in items}) == len(items)
+
+    def test_passes_segment_arguments_and_scan_kwargs(self):
+        table = _segmented_table(pages_per_segment=1, items_per_page=1)
+
+        with patch("shared.dynamo._get_thread_table", return_value=table):
+            list(parallel_scan("t", total_segments=3, ProjectionExpression="file_id"))
+
+        calls = table.scan.call_args_list
+        assert sorted(c.kwargs["Segment"] for c in calls) == [0, 1, 2]
+        assert all(c.kwargs["TotalSegments"] == 3 for c in calls)
+        assert all(c.kwargs["ProjectionExpression"] == "file_id" for c in calls)
+
+    def test_accumulates_consumed_capacity(self):
+        table = MagicMock()
+        table.scan.return_value = {
+            "Items": [{"file_id": "a"}],
+            "Count": 1,
+            "ScannedCount": 4,
+            "ConsumedCapacity": {"CapacityUnits": 2.5},
+        }
+        stats = {}
+
+        with patch("shared.dynamo._get_thread_table", return_value=table):
+            list(parallel_scan("t", total_segments=2, stats=stats))
+
+        assert stats["consumed_rcu"] == 5.0
+        assert stats["scanned"] == 8
+        assert stats["returned"] == 2
+
+    def test_segment_error_is_raised_to_consumer(self):
+        table = MagicMock()
+        table.scan.side_effect = ClientError(
+            {"Error": {"Code": "ProvisionedThroughputExceededException"}}, "Scan"
+        )
+
+        with patch("shared.dynamo._get_thread_table", return_value=table):
+            with pytest.raises(ClientError):
+                list(parallel_scan("t", total_segments=2))
+
+    def test_closing_generator_early_stops_workers(self):
+        table = _segmented_table(pages_per_segment=1000, items_per_page=10)
+
+        with patch("shared.dynamo._get_thread_table", return_value=table):
+            scan = parallel_scan("t", total_segments=2)
+            next(scan)
+            scan.close()
+
+        assert table.scan.call_count < 2000
+
+
+class TestParallelScanCursors:
+    def test_cursors_mark_finished_segments(self):
+        table = _segmented_table(pages_per_segment=2, items_per_page=1)
+        cursors = {}
+
+        with patch("shared.dynamo._get_thread_table", return_value=table):
+            list(parallel_scan("t", total_segments=3, cursors=cursors))
+
+        assert cursors == {0: None, 1: None, 2: None}
+
+    def test_cursor_points_at_last_fully_consumed_page(self):
+        table = _segmented_table(pages_per_segment=5, items_per_page=2)
+        cursors = {}
+
+        with patch("shared.dynamo._get_thread_table", return_value=table):
+            scan = parallel_scan("t", total_segments=1, cursors=cursors)
+            # Consume page 0 fully and page 1 partly
+            for _ in range(3):
+                next(scan)
+            scan.close()
+
+        assert cursors == {0: {"page": 1}}
+
+    def test_resume_skips_finished_segments_and_starts_from_cursor(self):
+        table = _segmented_table(pages_per_segment=3, items_per_page=1)
+        cursors = {0: None, 1: {"page": 2}}
+
+        with patch("shared.dynamo._get_thread_table", return_value=table):
+            items = list(parallel_scan("t", total_segments=2, cursors=cursors))
+
+        assert [item["file_id"] for item in items] == ["1-2-0"]
+        assert cursors == {0: None, 1: None}
+
+    def test_fully_finished_cursors_scan_nothing(self):
+        table = _segmented_table(pages_per_segment=1, items_per_page=1)
+
+        with patch("shared.dynamo._get_thread_table", return_value=table):
+            items = list(parallel_scan("t", total_segments=2, cursors={0: None, 1: None}))
+
+        assert items == []
+        table.scan.assert_not_called()
+
+
+class TestScanSegmentsForTable:
+    def _segments_for_size(self, size):
+        table = MagicMock()
+        table.table_size_bytes = size
+        with patch("shared.dynamo.get_table", return_value=table):
+            return scan_segments_for_table("t")
+
+    def test_empty_table_uses_one_segment(self):
+        assert self._segments_for_size(0) == 1
+
+    def test_one_segment_per_size_step(self):
+        assert self._segments_for_size(3 * PARALLEL_SCAN_BYTES_PER_SEGMENT) == 3
+
+    def test_segments_are_capped(self):
+        huge = 1000 * PARALLEL_SCAN_BYTES_PER_SEGMENT
+        assert self._segments_for_size(huge) == PARALLEL_SCAN_MAX_SEGMENTS
+
+
+class TestParallelScanShouldStop:
+    def test_checked_on_filtered_empty_pages(self):
+        table = _segmented_table(pages_per_segment=50, items_per_page=0)
+        cursors = {}
+        checks = []
+
+        def should_stop():
+            checks.append(None)
+            return len(checks) >= 3
+
+        with patch("shared.dynamo._get_thread_table", return_value=table):
+            items = list(
+                parallel_scan("t", total_segments=1, cursors=cursors, should_stop=should_stop)
+            )
+
+        assert items == []
+        assert len(checks) == 3
+        # Stopped at a page boundary, resumable from the fourth page
+        assert cursors == {0: {"page": 3}}
@@ -677,13 +677,11 @@ class TestPinVerifyHandlerIntegration:
         assert status == 400
         assert "error" in body
 
-    def test_null_body_raises_type_error(self):
-        """Null body causes TypeError in decorator's json.loads.
+    def test_null_body_is_treated_as_empty(self):
+        """Null body (key present, value None) is parsed as an empty body.
 
-        When body is explicitly None (not missing), the decorator's
-        event.get("body", "{}") returns None (key exists), and
-        json.loads(None) raises TypeError. This is a known edge case
-        since API Gateway always sends a string body.
+        API Gateway always sends a string body, but the decorator and the
+        handler both read it through get_body_text, which maps None to "".
         """
         event = {
             "body": None,
@@ -691,8 +689,9 @@ class TestPinVerifyHandlerIntegration:
             "requestContext": {"identity": {"sourceIp": "127.0.0.1"}},
         }
 
-        with pytest.raises(TypeError):
-            pin_verify_handler(event, None)
+        result = pin_verify_handler(event, None)
+
+        assert result["statusCode"] == 400
 
 
 # ──────────────────────────────────────────────────────────────────────
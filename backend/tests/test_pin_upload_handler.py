@@ -2,7 +2,7 @@
 
 import pytest
 from shared.exceptions import ValidationError
-from shared.pin_utils import generate_pin_file_id, generate_salt, hash_pin, verify_pin_hash
+from shared.pin_utils import generate_salt, hash_pin, verify_pin_hash
 from shared.validation import validate_pin
 
 
@@ -47,30 +47,6 @@ class TestPinUploadInitValidation:
         validate_pin("aBcD")
 
 
-class TestPinFileIdGeneration:
-    """Tests for 6-digit file ID generation."""
-
-    def test_file_id_is_six_digits(self):
-        """Should generate exactly 6-digit string."""
-        file_id = generate_pin_file_id()
-        assert len(file_id) == 6
-        assert file_id.isdigit()
-
-    def test_file_id_is_zero_padded(self):
-        """Should be zero-padded (always 6 chars even for small numbers)."""
-        # Generate many IDs to increase chance of hitting small numbers
-        ids = [generate_pin_file_id() for _ in range(100)]
-        for fid in ids:
-            assert len(fid) == 6
-            assert fid.isdigit()
-
-    def test_file_id_uniqueness(self):
-        """Should generate different IDs across multiple calls (probabilistic)."""
-        ids = {generate_pin_file_id() for _ in range(50)}
-        # With 1M possible IDs, 50 samples should almost always be unique
-        assert len(ids) > 1
-
-
 class TestPinSaltAndHash:
     """Tests for PIN salt generation and hash verification."""
 
@@ -86,9 +62,9 @@ class TestPinSaltAndHash:
         assert len(salts) == 10
 
     def test_hash_pin_returns_hex_string(self):
-        """Should return 64-char hex hash."""
+        """Should return a versioned hash with a 64-char hex digest."""
         salt = generate_salt()
-        pin_hash = hash_pin("7a2B", salt)
+        pin_hash = hash_pin("7a2B", salt).split("$")[-1]
         assert len(pin_hash) == 64
         assert all(c in "0123456789abcdef" for c in pin_hash)
 
@@ -1,10 +1,12 @@
 """Unit tests for PIN utility functions - NO MOCKS."""
 
+import pytest
 from shared.pin_utils import (
-    generate_pin_file_id,
     generate_salt,
     generate_short_file_id,
     hash_pin,
+    parse_pin_hash,
+    permute_pin_file_id,
     verify_pin_hash,
 )
 
@@ -27,7 +29,8 @@ class TestHashPin:
     def test_hash_is_sha256(self):
         salt = generate_salt()
         pin_hash = hash_pin("7a2B", salt)
-        assert len(pin_hash) == 64
+        assert pin_hash.startswith("pbkdf2-sha256$100000$")
+        assert len(pin_hash.split("$")[-1]) == 64
 
     def test_hash_is_deterministic(self):
         salt = generate_salt()
@@ -68,24 +71,29 @@ class TestVerifyPinHash:
         assert verify_pin_hash("7a2B", salt2, pin_hash) is False
 
 
-class TestGeneratePinFileId:
-    def test_format_six_digits(self):
-        file_id = generate_pin_file_id()
-        assert len(file_id) == 6
-        assert file_id.isdigit()
+class TestVersionedPinHash:
+    def test_scrypt_round_trip(self):
+        salt = generate_salt()
+        pin_hash = hash_pin("7a2B", salt, "scrypt$1024$8$1")
+        assert pin_hash.startswith("scrypt$1024$8$1$")
+        assert verify_pin_hash("7a2B", salt, pin_hash) is True
+        assert verify_pin_hash("7a2C", salt, pin_hash) is False
 
-    def test_zero_padded(self):
-        for _ in range(100):
-            assert len(generate_pin_file_id()) == 6
+    def test_pbkdf2_cost_is_stored(self):
+        salt = generate_salt()
+        pin_hash = hash_pin("7a2B", salt, "pbkdf2-sha256$1000")
+        assert parse_pin_hash(pin_hash)[:2] == ("pbkdf2-sha256", (1000,))
+        assert verify_pin_hash("7a2B", salt, pin_hash) is True
 
-    def test_uniqueness(self):
-        ids = {generate_pin_file_id() for _ in range(1000)}
-        assert len(ids) >= 990
+    def test_legacy_bare_hex_still_verifies(self):
+        salt = generate_salt()
+        legacy = hash_pin("7a2B", salt).split("$")[-1]
+        assert verify_pin_hash("7a2B", salt, legacy) is True
+        assert verify_pin_hash("0000", salt, legacy) is False
 
-    def test_range(self):
-        for _ in range(100):
-            file_id = generate_pin_file_id()
-            assert 0 <= int(file_id) <= 999999
+    def test_unknown_algorithm_rejected(self):
+        with pytest.raises(ValueError):
+            verify_pin_hash("7a2B", generate_salt(), "md5$1$abcd")
 
 
 class TestGenerateShortFileId:
@@ -103,3 +111,29 @@ class TestGenerateShortFileId:
     def test_uniqueness(self):
         ids = {generate_short_file_id() for _ in range(200)}
         assert len(ids) == 200
+
+
+class TestPermutePinFileId:
+    KEY = b"k" * 32
+
+    def test_format_six_digits(self):
+        for index in (0, 1, 999, 1000, 999999):
+            file_id = permute_pin_file_id(index, self.KEY)
+            assert len(file_id) == 6
+            assert file_id.isdigit()
+
+    def test_distinct_indices_never_collide(self):
+        ids = {permute_pin_file_id(index, self.KEY) for index in range(20000)}
+        assert len(ids) == 20000
+
+    def test_deterministic_per_key(self):
+        assert permute_pin_file_id(42, self.KEY) == permute_pin_file_id(42, self.KEY)
+        assert permute_pin_file_id(42, self.KEY) != permute_pin_file_id(42, b"x" * 32)
+
+    def test_consecutive_indices_are_not_sequential(self):
+        ids = [int(permute_pin_file_id(index, self.KEY)) for index in range(10)]
+        assert ids != sorted(ids)
+
+    def test_out_of_range_rejected(self):
+        with pytest.raises(ValueError):
+            permute_pin_file_id(1000000, self.KEY)
@@ -0,0 +1,155 @@
+"""Unit tests for the read-through record cache."""
+
+from unittest.mock import MagicMock, patch
+
+import pytest
+from shared import dynamo
+from shared.dynamo import (
+    IMMUTABLE_RECORD_ATTRIBUTES,
+    RecordCache,
+    get_cached_record,
+    load_text_payload,
+)
+
+
+@pytest.fixture(autouse=True)
+def cache(monkeypatch):
+    """Give every test an empty cache."""
+    cache = RecordCache(max_entries=4, ttl_seconds=60)
+    monkeypatch.setattr(dynamo, "_record_cache", cache)
+    return cache
+
+
+def _record(version="v1", **extra):
+    return {
+        "file_id": "vault001",
+        "record_version": version,
+        "content_type": "file",
+        "file_size": 10,
+        "s3_key": "files/vault001",
+        "expires_at": 2000000000,
+        "access_mode": "multi",
+        "download_count": 4,
+        **extra,
+    }
+
+
+class TestRecordCache:
+    def test_evicts_least_recently_used(self, cache):
+        for key in "abcd":
+            cache.put(key, "v", {})
+        cache.get("a")
+        cache.put("e", "v", {})
+
+        assert cache.get("b") is None
+        assert cache.get("a") is not None
+
+    def test_expires_after_ttl(self):
+        cache = RecordCache(max_entries=4, ttl_seconds=60)
+        with patch("shared.dynamo.time.monotonic", side_effect=[0.0, 61.0]):
+            cache.put("a", "v", {})
+            assert cache.get("a") is None
+
+    def test_version_mismatch_is_a_miss(self, cache):
+        cache.put("a", "v1", {"x": 1})
+
+        assert cache.get("a", "v2") is None
+        assert cache.get("a") is None
+
+    def test_disabled_with_zero_ttl(self):
+        cache = RecordCache(max_entries=4, ttl_seconds=0)
+        cache.put("a", "v", {})
+        assert cache.get("a") is None
+
+
+class TestGetCachedRecord:
+    def _get(self, table, immutable_attributes=IMMUTABLE_RECORD_ATTRIBUTES, scope="download"):
+        with patch("shared.dynamo.get_table", return_value=table):
+            return get_cached_record(
+                "t",
+                "vault001",
+                ["download_count"],
+                immutable_attributes=immutable_attributes,
+                scope=scope,
+            )
+
+    def test_hit_reads_only_mutable_state(self):
+        table = MagicMock()
+        table.get_item.side_effect = [
+            {"Item": _record()},
+            {"Item": {"record_version": "v1", "download_count": 9}},
+        ]
+
+        self._get(table)
+        record = self._get(table)
+
+        assert record["download_count"] == 9
+        assert record["s3_key"] == "files/vault001"
+        names = table.get_item.call_args.kwargs["ExpressionAttributeNames"].values()
+        assert set(names) == {"download_count", "record_version"}
+
+    def test_recreated_record_is_read_in_full(self):
+        table = MagicMock()
+        table.get_item.side_effect = [
+            {"Item": _record()},
+            {"Item": {"record_version": "v2", "download_count": 0}},
+            {"Item": _record(version="v2", s3_key="files/other", download_count=0)},
+        ]
+
+        self._get(table)
+        record = self._get(table)
+
+        assert record["s3_key"] == "files/other"
+        assert table.get_item.call_count == 3
+
+    def test_deleted_record_is_evicted(self, cache):
+        table = MagicMock()
+        table.get_item.side_effect = [{"Item": _record()}, {}]
+
+        self._get(table)
+
+        assert self._get(table) is None
+        assert cache.get("download:vault001") is None
+
+    def test_miss_reads_and_caches_only_the_callers_fields(self, cache):
+        table = MagicMock()
+        table.get_item.return_value = {"Item": _record()}
+
+        self._get(table, immutable_attributes=("file_id", "file_size"), scope="metadata")
+
+        names = table.get_item.call_args.kwargs["ExpressionAttributeNames"].values()
+        assert set(names) == {"file_id", "file_size", "download_count", "record_version"}
+        assert cache.get("metadata:vault001")[1] == {"file_id": "vault001", "file_size": 10}
+
+    def test_scopes_do_not_share_entries(self, cache):
+        table = MagicMock()
+        table.get_item.return_value = {"Item": _record()}
+
+        self._get(table, immutable_attributes=("file_id",), scope="metadata")
+        self._get(table)
+
+        assert table.get_item.call_count == 2
+        assert cache.get("download:vault001")[1]["s3_key"] == "files/vault001"
+
+    def test_records_without_version_are_not_cached(self, cache):
+        record = _record()
+        del record["record_version"]
+        table = MagicMock()
+        table.get_item.return_value = {"Item": record}
+
+        self._get(table)
+
+        assert cache.get("download:vault001") is None
+
+
+class TestCachedTextPayload:
+    def test_payload_item_is_read_once_per_version(self):
+        share = {"file_id": "txt00001", "payload_split": True, "record_version": "v1"}
+        payload = {"encrypted_text": b"abc", "record_version": "v1"}
+        with patch("shared.dynamo.get_file_record", return_value=payload) as get_record:
+            first = load_text_payload("t", share)
+            second = load_text_payload("t", share)
+            load_text_payload("t", {**share, "record_version": "v2"})
+
+        assert first["encrypted_text"] == second["encrypted_text"] == "YWJj"
+        assert get_record.call_count == 2
@@ -0,0 +1,44 @@
+"""Unit tests for report_abuse handler — threshold handling."""
+
+import json
+from unittest.mock import patch
+
+from lambdas.report_abuse import handler as report_abuse
+
+
+def _report(count, auto_delete=False):
+    event = {
+        "headers": {},
+        "pathParameters": {"file_id": "aB3dE5gH"},
+        "body": json.dumps({"reason": "spam", "recaptcha_token": "tok"}),
+    }
+    with (
+        patch.object(report_abuse, "get_file_record", return_value={"file_id": "aB3dE5gH"}),
+        patch.object(report_abuse, "increment_report_count", return_value=count),
+        patch.object(report_abuse, "hash_ip_secure", return_value="h"),
+        patch.object(report_abuse, "ABUSE_AUTO_DELETE", auto_delete),
+        patch.object(report_abuse, "emit_metrics") as metrics,
+        patch.object(report_abuse, "defer") as defer,
+    ):
+        response = report_abuse.handler(event, None)
+    return response, metrics, defer
+
+
+class TestAbuseThreshold:
+    def test_threshold_only_flags_by_default(self):
+        response, metrics, defer = _report(report_abuse.AUTO_DELETE_THRESHOLD)
+
+        assert response["statusCode"] == 200
+        metrics.assert_called_once_with({"AbuseThresholdReached": 1})
+        defer.assert_not_called()
+
+    def test_auto_delete_is_opt_in(self):
+        _, _, defer = _report(report_abuse.AUTO_DELETE_THRESHOLD, auto_delete=True)
+
+        defer.assert_called_once()
+
+    def test_below_threshold_does_nothing(self):
+        _, metrics, defer = _report(1, auto_delete=True)
+
+        metrics.assert_not_called()
+        defer.assert_not_called()
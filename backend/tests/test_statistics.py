@@ -0,0 +1,76 @@
+"""Unit tests for the write-sharded statistics counter."""
+
+from unittest.mock import MagicMock, patch
+
+from shared import dynamo
+from shared.dynamo import get_statistics, increment_download_counter, is_stats_key
+
+
+class TestIncrementDownloadCounter:
+    def test_adds_to_a_random_shard(self):
+        table = MagicMock()
+        with patch("shared.dynamo.get_table", return_value=table):
+            for _ in range(50):
+                increment_download_counter("t", file_size=100)
+
+        keys = {c.kwargs["Key"]["file_id"] for c in table.update_item.call_args_list}
+        assert len(keys) > 1
+        assert keys <= {f"STATS#{shard}" for shard in range(dynamo.STATS_SHARDS)}
+        kwargs = table.update_item.call_args.kwargs
+        assert kwargs["ExpressionAttributeValues"][":size"] == 100
+
+
+class TestStatsShardCount:
+    def test_clamps_to_one_batch_get(self):
+        assert dynamo._stats_shard_count("250") == dynamo.STATS_MAX_SHARDS
+        assert dynamo._stats_shard_count("0") == 1
+        assert dynamo._stats_shard_count("-3") == 1
+        assert dynamo._stats_shard_count("10") == 10
+
+    def test_max_shards_and_legacy_record_fit_one_batch_get(self):
+        assert dynamo.STATS_MAX_SHARDS + 1 <= 100
+
+
+class TestGetStatistics:
+    def _run(self, *responses):
+        resource = MagicMock()
+        resource.batch_get_item.side_effect = list(responses)
+        with patch("shared.dynamo.dynamodb", resource), patch("shared.dynamo.time.sleep"):
+            return get_statistics("t"), resource
+
+    def test_sums_shards_and_legacy_record_in_one_batch(self):
+        stats, resource = self._run(
+            {
+                "Responses": {
+                    "t": [
+                        {"downloads": 5, "total_bytes": 500, "updated_at": "2026-01-01T00:00:00"},
+                        {"downloads": 2, "total_bytes": 20, "updated_at": "2026-03-01T00:00:00"},
+                        {"downloads": 1, "total_bytes": 1},
+                    ]
+                }
+            }
+        )
+
+        assert stats == {"downloads": 8, "total_bytes": 521, "updated_at": "2026-03-01T00:00:00"}
+        assert resource.batch_get_item.call_count == 1
+        keys = resource.batch_get_item.call_args.kwargs["RequestItems"]["t"]["Keys"]
+        assert {"file_id": "STATS"} in keys
+        assert len(keys) == dynamo.STATS_SHARDS + 1
+
+    def test_retries_unprocessed_keys(self):
+        unprocessed = {"Keys": [{"file_id": "STATS#1"}]}
+        stats, resource = self._run(
+            {"Responses": {"t": [{"downloads": 3}]}, "UnprocessedKeys": {"t": unprocessed}},
+            {"Responses": {"t": [{"downloads": 4}]}},
+        )
+
+        assert stats["downloads"] == 7
+        retry = resource.batch_get_item.call_args.kwargs["RequestItems"]["t"]
+        assert retry == unprocessed
+
+
+class TestIsStatsKey:
+    def test_matches_legacy_record_and_shards_only(self):
+        assert is_stats_key("STATS")
+        assert is_stats_key("STATS#3")
+        assert not is_stats_key("STATSabc")
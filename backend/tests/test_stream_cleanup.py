@@ -0,0 +1,82 @@
+"""Stream consumer tests: replays recorded DynamoDB Streams batches.
+
+Every JSON file in tests/fixtures/stream_batches/ is a recorded batch:
+
+    {
+        "description": "...",
+        "expected_deleted": ["files/..."],
+        "expected_pin_removed": 0,  # optional
+        "event": {"Records": [...]}
+    }
+
+To reproduce a production issue, save the batch from the consumer's logs or
+the stream itself into that folder with the S3 keys it should delete.
+"""
+
+import json
+from pathlib import Path
+from unittest.mock import patch
+
+import pytest
+from lambdas.stream_cleanup import handler as stream_cleanup
+
+FIXTURES = Path(__file__).parent / "fixtures" / "stream_batches"
+BATCHES = sorted(FIXTURES.glob("*.json"))
+
+
+def _load(path: Path) -> dict:
+    return json.loads(path.read_text())
+
+
+@pytest.mark.parametrize("path", BATCHES, ids=[path.stem for path in BATCHES])
+def test_recorded_batch_deletes_expected_objects(path):
+    batch = _load(path)
+
+    with (
+        patch.object(stream_cleanup, "delete_files", return_value={}) as delete_files,
+        patch.object(stream_cleanup, "adjust_live_pin_ids") as adjust_live,
+    ):
+        result = stream_cleanup.handler(batch["event"], None)
+
+    assert result == {"batchItemFailures": []}
+    pin_removed = batch.get("expected_pin_removed", 0)
+    if pin_removed:
+        adjust_live.assert_called_once_with(stream_cleanup.TABLE_NAME, -pin_removed)
+    else:
+        adjust_live.assert_not_called()
+    if batch["expected_deleted"]:
+        deleted = delete_files.call_args.args[1]
+        assert sorted(deleted) == sorted(batch["expected_deleted"])
+    else:
+        delete_files.assert_not_called()
+
+
+def test_failed_delete_reports_first_failed_sequence_number():
+    batch = _load(FIXTURES / "mixed_batch.json")
+
+    with patch.object(
+        stream_cleanup,
+        "delete_files",
+        return_value={"files/Zx9_Yw8-": "SlowDown", "files/aB3dE5gH": "SlowDown"},
+    ):
+        result = stream_cleanup.handler(batch["event"], None)
+
+    assert result == {"batchItemFailures": [{"itemIdentifier": "111"}]}
+
+
+def test_manual_remove_is_ignored():
+    record = _load(FIXTURES / "mixed_batch.json")["event"]["Records"][-1]
+    assert stream_cleanup.s3_key_to_delete(record) is None
+
+
+def test_pin_removals_after_failed_record_are_not_counted():
+    batch = _load(FIXTURES / "pin_removals.json")
+
+    with (
+        patch.object(stream_cleanup, "delete_files", return_value={"files/104857": "SlowDown"}),
+        patch.object(stream_cleanup, "adjust_live_pin_ids") as adjust_live,
+    ):
+        result = stream_cleanup.handler(batch["event"], None)
+
+    assert result == {"batchItemFailures": [{"itemIdentifier": "300"}]}
+    adjust_live.assert_not_called()
@@ -0,0 +1,215 @@
+"""Unit tests for text payload storage: binary ciphertext, payload items and S3 offload."""
+
+import base64
+from unittest.mock import MagicMock, patch
+
+import pytest
+from boto3.dynamodb.types import Binary
+from botocore.exceptions import ClientError
+from shared.constants import INLINE_TEXT_MAX_BYTES
+from shared.dynamo import (
+    create_file_record,
+    decode_ciphertext,
+    encode_ciphertext,
+    load_text_payload,
+)
+from shared.exceptions import FileNotFoundError
+
+
+def _create(encrypted_text, put_side_effect=None, table=None):
+    table = table or MagicMock()
+    table.put_item.side_effect = put_side_effect
+    with (
+        patch("shared.dynamo.get_table", return_value=table),
+        patch("shared.dynamo.emit_metrics"),
+    ):
+        record = create_file_record(
+            "t",
+            "aB3dE5gH",
+            len(encrypted_text),
+            2000000000,
+            "h",
+            content_type="text",
+            encrypted_text=encrypted_text,
+            access_mode="multi",
+        )
+    return record, table
+
+
+class TestCreateTextRecord:
+    def test_small_text_stays_inline(self):
+        record, table = _create("A" * INLINE_TEXT_MAX_BYTES)
+
+        assert record["encrypted_text"] == base64.b64decode("A" * INLINE_TEXT_MAX_BYTES)
+        assert "payload_split" not in record
+        assert table.put_item.call_count == 1
+
+    def test_large_text_goes_to_payload_item(self):
+        record, table = _create("A" * 50000)
+
+        share, payload = (c.kwargs["Item"] for c in table.put_item.call_args_list)
+        assert "encrypted_text" not in share
+        assert share["payload_split"] is True
+        assert payload == {
+            "file_id": "aB3dE5gH#payload",
+            "content_type": "payload",
+            "encrypted_text": base64.b64decode("A" * 50000),
+            "expires_at": 2000000000,
+            "record_version": share["record_version"],
+        }
+
+    def test_failed_payload_write_removes_share(self):
+        error = ClientError({"Error": {"Code": "InternalServerError"}}, "PutItem")
+        table = MagicMock()
+        with pytest.raises(ClientError):
+            _create("A" * 50000, put_side_effect=[None, error], table=table)
+
+        table.delete_item.assert_called_once_with(Key={"file_id": "aB3dE5gH"})
+
+
+class TestCiphertextEncoding:
+    def test_canonical_base64_becomes_bytes(self):
+        assert encode_ciphertext("YWJj") == b"abc"
+        assert decode_ciphertext(encode_ciphertext("YWJjZA==")) == "YWJjZA=="
+
+    @pytest.mark.parametrize("text", ["not base64!", "YWJ", "YWJjZB==", "YW Jj"])
+    def test_non_canonical_text_stays_string(self, text):
+        assert encode_ciphertext(text) == text
+        assert decode_ciphertext(text) == text
+
+
+class TestLoadTextPayload:
+    def test_inline_string_record_unchanged(self):
+        record = {"file_id": "x", "encrypted_text": "abc"}
+        with patch("shared.dynamo.get_file_record") as get_record:
+            assert load_text_payload("t", record) == record
+        get_record.assert_not_called()
+
+    def test_inline_binary_is_returned_as_base64(self):
+        record = {"file_id": "x", "encrypted_text": Binary(b"\x00\x01\xff")}
+        assert load_text_payload("t", record)["encrypted_text"] == "AAH/"
+
+    def test_split_record_reads_payload_item(self):
+        record = {"file_id": "x", "payload_split": True}
+        with patch(
+            "shared.dynamo.get_file_record", return_value={"encrypted_text": Binary(b"abc")}
+        ) as get_record:
+            loaded = load_text_payload("t", record)
+
+        get_record.assert_called_once_with("t", "x#payload")
+        assert loaded["encrypted_text"] == "YWJj"
+
+    def test_missing_payload_is_not_found(self):
+        with (
+            patch("shared.dynamo.get_file_record", return_value=None),
+            pytest.raises(FileNotFoundError),
+        ):
+            load_text_payload("t", {"file_id": "x", "payload_split": True})
+
+
+class TestTextOffload:
+    def _create(self, put_error=None, file_id="aB3dE5gH", table=None):
+        table = table or MagicMock()
+        with (
+            patch("shared.dynamo.get_table", return_value=table),
+            patch("shared.dynamo.emit_metrics"),
+            patch("shared.dynamo.generate_short_file_id", return_value="xY7zW9vU"),
+            patch("shared.s3.put_file", side_effect=put_error) as put,
+        ):
+            record = create_file_record(
+                "t",
+                file_id,
+                50000,
+                2000000000,
+                "h",
+                content_type="text",
+                encrypted_text="A" * 50000,
+                access_mode="multi",
+                text_bucket="bucket",
+            )
+        return record, table, put
+
+    def test_text_goes_to_s3_and_record_stays_small(self):
+        record, table, put = self._create()
+
+        (share,) = (c.kwargs["Item"] for c in table.put_item.call_args_list)
+        assert share["s3_key"] == "texts/aB3dE5gH"
+        assert "encrypted_text" not in share and "payload_split" not in share
+        put.assert_called_once_with("bucket", "texts/aB3dE5gH", b"A" * 50000)
+
+    def test_allocated_id_names_the_object(self):
+        record, _, put = self._create(file_id=None)
+
+        assert record["s3_key"] == "texts/xY7zW9vU"
+        assert put.call_args.args[1] == "texts/xY7zW9vU"
+
+    def test_failed_object_write_removes_share(self):
+        error = ClientError({"Error": {"Code": "InternalError"}}, "PutObject")
+        table = MagicMock()
+
+        with pytest.raises(ClientError):
+            self._create(put_error=error, table=table)
+
+        table.delete_item.assert_called_once_with(Key={"file_id": "aB3dE5gH"})
+
+    def test_offloaded_text_is_deleted_by_stream(self):
+        from lambdas.stream_cleanup.handler import s3_key_to_delete
+
+        record = {
+            "eventName": "REMOVE",
+            "userIdentity": {"type": "Service", "principalId": "dynamodb.amazonaws.com"},
+            "dynamodb": {
+                "OldImage": {"content_type": {"S": "text"}, "s3_key": {"S": "texts/aB3dE5gH"}}
+            },
+        }
+
+        assert s3_key_to_delete(record) == "texts/aB3dE5gH"
+
+
+def test_download_returns_url_for_offloaded_text():
+    import json
+
+    from lambdas.download import handler as download
+
+    record = {
+        "file_id": "aB3dE5gH",
+        "content_type": "text",
+        "s3_key": "texts/aB3dE5gH",
+        "file_size": 50000,
+        "access_mode": "multi",
+    }
+    event = {"headers": {}, "pathParameters": {"file_id": "aB3dE5gH"}, "body": "{}"}
+    with (
+        patch.object(download, "begin_download", return_value=record),
+        patch.object(download, "generate_download_url", return_value="https://s3/url") as url,
+        patch.object(download, "load_text_payload") as load,
+    ):
+        body = json.loads(download.handler(event, None)["body"])
+
+    assert body["content_type"] == "text"
+    assert body["download_url"] == "https://s3/url"
+    assert "encrypted_text" not in body
+    assert url.call_args.kwargs["s3_key"] == "texts/aB3dE5gH"
+    load.assert_not_called()
+
+
+def test_upload_init_keeps_text_in_dynamodb_by_default(monkeypatch):
+    # Offload stays off until clients follow download_url for text
+    monkeypatch.delenv("TEXT_OFFLOAD_BYTES", raising=False)
+    from importlib import reload
+
+    import lambdas.upload_init.handler as h
+
+    reload(h)
+    event = {
+        "headers": {},
+        "body": '{"content_type": "text", "encrypted_text": "%s", "ttl": "1h", '
+        '"access_mode": "multi"}' % ("A" * 50000),
+    }
+    with (
+        patch.object(h, "create_file_record", return_value={"file_id": "aB3dE5gH"}) as create,
+        patch.object(h, "hash_ip_secure", return_value="h"),
+    ):
+        assert h.handler(event, None)["statusCode"] == 200
+
+    assert create.call_args.kwargs["text_bucket"] is None
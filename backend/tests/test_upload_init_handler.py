@@ -1,63 +1,47 @@
-"""Unit tests for upload_init handler — retry logic and text_size validation."""
+"""Unit tests for upload_init handler — retry logic, text_size and direct uploads."""
 
+import base64
 import json
-from unittest.mock import patch
+from unittest.mock import ANY, patch
 
 import pytest
+from botocore.exceptions import ClientError
 
 
-class TestShortFileIdRetryLogic:
-    """Test the retry logic pattern used by upload_init handler."""
-
-    def test_retry_exhaustion_returns_error(self):
-        """After max retries, handler should signal failure."""
-        MAX_ID_RETRIES = 10
-        attempts = 0
-        succeeded = False
-
-        for _ in range(MAX_ID_RETRIES):
-            attempts += 1
-            # Simulate all attempts colliding
-            collision = True
-            if not collision:
-                succeeded = True
-                break
-
-        assert attempts == MAX_ID_RETRIES
-        assert succeeded is False
-
-    def test_success_on_first_attempt(self):
-        """Should succeed immediately when no collision."""
-        MAX_ID_RETRIES = 10
-        attempts = 0
-        succeeded = False
-
-        for _ in range(MAX_ID_RETRIES):
-            attempts += 1
-            collision = False  # No collision
-            if not collision:
-                succeeded = True
-                break
-
-        assert attempts == 1
-        assert succeeded is True
-
-    def test_success_on_third_attempt(self):
-        """Should succeed after two collisions."""
-        MAX_ID_RETRIES = 10
-        attempts = 0
-        succeeded = False
-        collisions_before_success = 2
-
-        for i in range(MAX_ID_RETRIES):
-            attempts += 1
-            collision = i < collisions_before_success
-            if not collision:
-                succeeded = True
-                break
-
-        assert attempts == 3
-        assert succeeded is True
+class TestShortFileIdExhaustion:
+    """upload_init when create_file_record runs out of ID retries."""
+
+    def test_exhausted_retries_return_500(self, monkeypatch):
+        monkeypatch.setenv("CLOUDFRONT_SECRET", "test-secret")
+        from importlib import reload
+
+        import lambdas.upload_init.handler as h
+
+        reload(h)
+        with (
+            patch(
+                "lambdas.upload_init.handler.create_file_record",
+                side_effect=RuntimeError("Failed to generate unique file ID after max retries"),
+            ),
+            patch("lambdas.upload_init.handler.hash_ip_secure", return_value="h"),
+            patch("lambdas.upload_init.handler.get_source_ip", return_value="1.2.3.4"),
+            patch("lambdas.upload_init.handler.TABLE_NAME", "t"),
+        ):
+            event = {
+                "headers": {"X-Origin-Verify": "test-secret"},
+                "body": json.dumps(
+                    {
+                        "content_type": "text",
+                        "encrypted_text": "A" * 100,
+                        "ttl": "1h",
+                        "recaptcha_token": "tok",
+                    }
+                ),
+            }
+            response = h.handler(event, None)
+
+        assert response["statusCode"] == 500
+        assert "unique file ID" in json.loads(response["body"])["error"]
 
 
 class TestTextSizeValidation:
@@ -91,8 +75,10 @@ class TestTextSizeValidation:
 
         reload(h)
         with (
-            patch("lambdas.upload_init.handler.create_file_record") as mock_create,
-            patch("lambdas.upload_init.handler.generate_unique_file_id", return_value="ABCD1234"),
+            patch(
+                "lambdas.upload_init.handler.create_file_record",
+                return_value={"file_id": "ABCD1234"},
+            ) as mock_create,
             patch("lambdas.upload_init.handler.hash_ip_secure", return_value="h"),
             patch("lambdas.upload_init.handler.get_source_ip", return_value="1.2.3.4"),
             patch("lambdas.upload_init.handler.TABLE_NAME", "t"),
@@ -113,8 +99,10 @@ class TestTextSizeValidation:
 
         reload(h)
         with (
-            patch("lambdas.upload_init.handler.create_file_record") as mock_create,
-            patch("lambdas.upload_init.handler.generate_unique_file_id", return_value="ABCD1234"),
+            patch(
+                "lambdas.upload_init.handler.create_file_record",
+                return_value={"file_id": "ABCD1234"},
+            ) as mock_create,
             patch("lambdas.upload_init.handler.hash_ip_secure", return_value="h"),
             patch("lambdas.upload_init.handler.get_source_ip", return_value="1.2.3.4"),
             patch("lambdas.upload_init.handler.TABLE_NAME", "t"),
@@ -135,8 +123,10 @@ class TestTextSizeValidation:
 
         reload(h)
         with (
-            patch("lambdas.upload_init.handler.create_file_record") as mock_create,
-            patch("lambdas.upload_init.handler.generate_unique_file_id", return_value="ABCD1234"),
+            patch(
+                "lambdas.upload_init.handler.create_file_record",
+                return_value={"file_id": "ABCD1234"},
+            ) as mock_create,
             patch("lambdas.upload_init.handler.hash_ip_secure", return_value="h"),
             patch("lambdas.upload_init.handler.get_source_ip", return_value="1.2.3.4"),
             patch("lambdas.upload_init.handler.TABLE_NAME", "t"),
@@ -170,7 +160,6 @@ class TestTextSizeValidation:
         reload(h)
         with (
             patch("lambdas.upload_init.handler.create_file_record"),
-            patch("lambdas.upload_init.handler.generate_unique_file_id", return_value="ABCD1234"),
             patch("lambdas.upload_init.handler.hash_ip_secure", return_value="h"),
             patch("lambdas.upload_init.handler.get_source_ip", return_value="1.2.3.4"),
             patch("lambdas.upload_init.handler.TABLE_NAME", "t"),
@@ -191,7 +180,6 @@ class TestTextSizeValidation:
         reload(h)
         with (
             patch("lambdas.upload_init.handler.create_file_record"),
-            patch("lambdas.upload_init.handler.generate_unique_file_id", return_value="ABCD1234"),
             patch("lambdas.upload_init.handler.hash_ip_secure", return_value="h"),
             patch("lambdas.upload_init.handler.get_source_ip", return_value="1.2.3.4"),
             patch("lambdas.upload_init.handler.TABLE_NAME", "t"),
@@ -200,3 +188,152 @@ class TestTextSizeValidation:
             event = self._make_event(self._base_body(encrypted_text=encrypted, text_size=9999))
             result = h.handler(event, None)
             assert result["statusCode"] == 400
+
+
+class TestDirectUpload:
+    """Test small files sent inline as encrypted_data."""
+
+    def _call(self, monkeypatch, put_error=None, base64_body=False, **overrides):
+        monkeypatch.setenv("CLOUDFRONT_SECRET", "test-secret")
+        from importlib import reload
+
+        import lambdas.upload_init.handler as h
+
+        reload(h)
+        body = json.dumps(
+            {
+                "content_type": "file",
+                "file_size": 4,
+                "ttl": "1h",
+                "encrypted_data": base64.b64encode(b"data").decode(),
+                "recaptcha_token": "tok",
+                **overrides,
+            }
+        )
+        event = {
+            "headers": {"X-Origin-Verify": "test-secret", "CF-Connecting-IP": "1.2.3.4"},
+            "body": base64.b64encode(body.encode()).decode() if base64_body else body,
+            "isBase64Encoded": base64_body,
+        }
+        with (
+            patch(
+                "lambdas.upload_init.handler.create_file_record",
+                return_value={"file_id": "ABCD1234", "s3_key": "files/ABCD1234"},
+            ),
+            patch("lambdas.upload_init.handler.put_file", side_effect=put_error) as put,
+            patch("lambdas.upload_init.handler.delete_file_record") as delete,
+            patch("lambdas.upload_init.handler.generate_upload_url") as presign,
+            patch("lambdas.upload_init.handler.hash_ip_secure", return_value="h"),
+            patch("lambdas.upload_init.handler.TABLE_NAME", "t"),
+        ):
+            result = h.handler(event, None)
+        return result, put, delete, presign
+
+    def test_small_file_is_written_without_upload_url(self, monkeypatch):
+        result, put, delete, presign = self._call(monkeypatch)
+
+        assert result["statusCode"] == 200
+        body = json.loads(result["body"])
+        assert body["file_id"] == "ABCD1234"
+        assert "upload_url" not in body
+        put.assert_called_once_with(ANY, "files/ABCD1234", b"data")
+        presign.assert_not_called()
+        delete.assert_not_called()
+
+    def test_base64_encoded_event_body(self, monkeypatch):
+        result, put, _, _ = self._call(monkeypatch, base64_body=True)
+
+        assert result["statusCode"] == 200
+        put.assert_called_once()
+
+    def test_payload_over_limit_returns_400(self, monkeypatch):
+        monkeypatch.setenv("DIRECT_UPLOAD_MAX_BYTES", "3")
+
+        result, put, _, _ = self._call(monkeypatch)
+
+        assert result["statusCode"] == 400
+        put.assert_not_called()
+
+    @pytest.mark.parametrize("encrypted_data", ["not base64!", "", 123])
+    def test_invalid_payload_returns_400(self, monkeypatch, encrypted_data):
+        result, put, _, _ = self._call(monkeypatch, encrypted_data=encrypted_data)
+
+        assert result["statusCode"] == 400
+        put.assert_not_called()
+
+    def test_failed_write_removes_record(self, monkeypatch):
+        error = ClientError({"Error": {"Code": "InternalError"}}, "PutObject")
+
+        result, _, delete, _ = self._call(monkeypatch, put_error=error)
+
+        assert result["statusCode"] == 500
+        delete.assert_called_once_with("t", "ABCD1234")
+
+
+class TestMultipartInit:
+    """Test that a failed multipart start never leaves a record behind."""
+
+    def _call(self, monkeypatch, create_error=None, start_error=None):
+        monkeypatch.setenv("CLOUDFRONT_SECRET", "test-secret")
+        from importlib import reload
+
+        import lambdas.upload_init.handler as h
+
+        reload(h)
+        body = json.dumps(
+            {
+                "content_type": "file",
+                "file_size": 4,
+                "ttl": "1h",
+                "multipart": True,
+                "recaptcha_token": "tok",
+            }
+        )
+        event = {
+            "headers": {"X-Origin-Verify": "test-secret", "CF-Connecting-IP": "1.2.3.4"},
+            "body": body,
+        }
+        with (
+            patch(
+                "lambdas.upload_init.handler.create_file_record",
+                return_value={"file_id": "ABCD1234", "s3_key": "files/ABCD1234"},
+            ),
+            patch(
+                "lambdas.upload_init.handler.create_multipart_upload",
+                return_value="up-1",
+                side_effect=create_error,
+            ),
+            patch("lambdas.upload_init.handler.start_multipart_upload", side_effect=start_error),
+            patch("lambdas.upload_init.handler.generate_part_upload_urls", return_value={1: "u"}),
+            patch("lambdas.upload_init.handler.abort_multipart_upload") as abort,
+            patch("lambdas.upload_init.handler.delete_file_record") as delete,
+            patch("lambdas.upload_init.handler.hash_ip_secure", return_value="h"),
+            patch("lambdas.upload_init.handler.TABLE_NAME", "t"),
+        ):
+            result = h.handler(event, None)
+        return result, abort, delete
+
+    def test_started_upload_keeps_record(self, monkeypatch):
+        result, abort, delete = self._call(monkeypatch)
+
+        assert result["statusCode"] == 200
+        abort.assert_not_called()
+        delete.assert_not_called()
+
+    def test_failed_s3_start_removes_record(self, monkeypatch):
+        error = ClientError({"Error": {"Code": "InternalError"}}, "CreateMultipartUpload")
+
+        result, abort, delete = self._call(monkeypatch, create_error=error)
+
+        assert result["statusCode"] == 500
+        abort.assert_not_called()
+        delete.assert_called_once_with("t", "ABCD1234")
+
+    def test_failed_record_update_aborts_upload(self, monkeypatch):
+        error = ClientError({"Error": {"Code": "InternalError"}}, "UpdateItem")
+
+        result, abort, delete = self._call(monkeypatch, start_error=error)
+
+        assert result["statusCode"] == 500
+        abort.assert_called_once_with(ANY, "files/ABCD1234", "up-1")
+        delete.assert_called_once_with("t", "ABCD1234")
@@ -0,0 +1,146 @@
+"""Unit tests for deferred vault download counting."""
+
+import time
+from unittest.mock import MagicMock, patch
+
+import pytest
+from botocore.exceptions import ClientError
+from shared import dynamo
+from shared.deferred import TASK_COUNT_VAULT_DOWNLOADS, run_tasks
+from shared.dynamo import add_vault_downloads, begin_download
+from shared.exceptions import FileExpiredError, FileNotFoundError
+
+
+@pytest.fixture(autouse=True)
+def deferred(monkeypatch):
+    """Enable deferred counting with a fresh per-container state."""
+    monkeypatch.setattr(dynamo, "VAULT_COUNT_DEFERRED", True)
+    monkeypatch.setattr(dynamo, "_known_vaults", {})
+
+
+def _vault(**overrides):
+    return {
+        "file_id": "vault001",
+        "access_mode": "multi",
+        "file_size": 10,
+        "download_count": 4,
+        "expires_at": int(time.time()) + 600,
+        **overrides,
+    }
+
+
+def _condition_failed():
+    return ClientError({"Error": {"Code": "ConditionalCheckFailedException"}}, "UpdateItem")
+
+
+class TestDeferredBeginDownload:
+    def _begin(self, table):
+        with (
+            patch("shared.dynamo.get_table", return_value=table),
+            patch("shared.dynamo.defer") as defer,
+        ):
+            return begin_download("t", "vault001"), defer
+
+    def test_first_download_updates_then_later_ones_only_read(self):
+        table = MagicMock()
+        table.update_item.return_value = {"Attributes": _vault(download_count=5)}
+        table.get_item.return_value = {"Item": _vault(download_count=5)}
+
+        self._begin(table)
+        record, defer = self._begin(table)
+
+        assert table.update_item.call_count == 1
+        assert table.get_item.call_count == 1
+        assert record["download_count"] == 6
+        defer.assert_called_once_with(
+            TASK_COUNT_VAULT_DOWNLOADS, table_name="t", file_id="vault001", file_size=10
+        )
+
+    def test_expired_vault_is_rejected_on_read(self):
+        dynamo._known_vaults["vault001"] = None
+        table = MagicMock()
+        table.get_item.return_value = {"Item": _vault(expires_at=int(time.time()) - 1)}
+
+        with pytest.raises(FileExpiredError):
+            self._begin(table)
+
+    def test_deleted_vault_is_forgotten(self):
+        dynamo._known_vaults["vault001"] = None
+        table = MagicMock()
+        table.get_item.return_value = {}
+
+        with pytest.raises(FileNotFoundError):
+            self._begin(table)
+        assert "vault001" not in dynamo._known_vaults
+
+
+class TestAddVaultDownloads:
+    def _add(self, table, downloads):
+        with patch("shared.dynamo.get_table", return_value=table):
+            return add_vault_downloads("t", downloads)
+
+    def test_one_guarded_add_per_vault(self):
+        table = MagicMock()
+
+        assert self._add(table, {"vault001": 3, "vault002": 1}) == []
+
+        assert table.update_item.call_count == 2
+        kwargs = table.update_item.call_args_list[0].kwargs
+        assert kwargs["ExpressionAttributeValues"][":inc"] == 3
+        assert kwargs["ConditionExpression"] == "attribute_exists(file_id)"
+
+    def test_deleted_vault_is_not_retried(self):
+        table = MagicMock()
+        table.update_item.side_effect = _condition_failed()
+
+        assert self._add(table, {"vault001": 2}) == []
+
+    def test_failed_write_is_retried(self):
+        table = MagicMock()
+        table.update_item.side_effect = ClientError(
+            {"Error": {"Code": "ProvisionedThroughputExceededException"}}, "UpdateItem"
+        )
+
+        assert self._add(table, {"vault001": 2}) == ["vault001"]
+
+
+class TestRunVaultCountTasks:
+    def _task(self, file_id, file_size=10):
+        return {
+            "type": TASK_COUNT_VAULT_DOWNLOADS,
+            "table_name": "t",
+            "file_id": file_id,
+            "file_size": file_size,
+        }
+
+    def test_coalesces_per_vault_and_counts_globally_once(self):
+        tasks = {"m1": self._task("vault001"), "m2": self._task("vault001"), "m3": self._task("b")}
+        with (
+            patch("shared.dynamo.add_vault_downloads", return_value=[]) as add,
+            patch("shared.dynamo.increment_download_counter") as counter,
+        ):
+            assert run_tasks(tasks) == []
+
+        add.assert_called_once_with("t", {"vault001": 2, "b": 1})
+        counter.assert_called_once_with("t", file_size=30, downloads=3)
+
+    def test_failed_vault_is_retried_without_global_count(self):
+        tasks = {"m1": self._task("vault001"), "m2": self._task("b")}
+        with (
+            patch("shared.dynamo.add_vault_downloads", return_value=["vault001"]),
+            patch("shared.dynamo.increment_download_counter") as counter,
+        ):
+            assert run_tasks(tasks) == ["m1"]
+
+        counter.assert_called_once_with("t", file_size=10, downloads=1)
+
+    def test_failed_global_count_is_re_enqueued_without_repeating_the_add(self):
+        tasks = {"m1": self._task("vault001")}
+        with (
+            patch("shared.dynamo.add_vault_downloads", return_value=[]),
+            patch("shared.dynamo.increment_download_counter", side_effect=RuntimeError("boom")),
+            patch("shared.deferred.defer") as defer,
+        ):
+            assert run_tasks(tasks) == []
+
+        defer.assert_called_once_with("count_downloads", table_name="t", file_size=10, downloads=1)
@@ -16,11 +16,14 @@ BUILDS_DIR="$PROJECT_ROOT/terraform/modules/api/modules/lambda/builds"
 # Format: "folder_name:function_name"
 LAMBDAS=(
   "upload_init:upload-init"
+  "upload_multipart:upload-multipart"
   "get_metadata:get-metadata"
   "get_stats:get-stats"
   "download:download"
   "confirm_download:confirm-download"
   "cleanup:cleanup"
+  "stream_cleanup:stream-cleanup"
+  "deferred_worker:deferred-worker"
   "report_abuse:report-abuse"
   "pin_upload_init:pin-upload-init"
   "pin_initiate:pin-initiate"
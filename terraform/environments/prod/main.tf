@@ -37,6 +37,8 @@ module "api" {
   bucket_arn           = module.storage.files_bucket_arn
   table_name           = module.storage.table_name
   table_arn            = module.storage.table_arn
+  table_stream_arn     = module.storage.table_stream_arn
+  expiry_index_name    = module.storage.expiry_index_name
   max_file_size_bytes  = var.max_file_size_bytes
   cloudfront_secret    = random_password.cloudfront_secret.result
   recaptcha_secret_key = var.recaptcha_secret_key
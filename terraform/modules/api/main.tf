@@ -77,6 +77,10 @@ resource "aws_api_gateway_model" "download_request" {
         minLength = 10
         maxLength = 4000
       }
+      access_mode = {
+        type = "string"
+        enum = ["one_time", "multi", "pin"]
+      }
     }
     required = ["recaptcha_token"]
   })
@@ -149,6 +153,19 @@ resource "aws_api_gateway_resource" "upload_init" {
   path_part   = "init"
 }
 
+# /upload/{file_id}/{action} - multipart parts, complete, abort
+resource "aws_api_gateway_resource" "upload_file" {
+  rest_api_id = aws_api_gateway_rest_api.main.id
+  parent_id   = aws_api_gateway_resource.upload.id
+  path_part   = "{file_id}"
+}
+
+resource "aws_api_gateway_resource" "upload_multipart" {
+  rest_api_id = aws_api_gateway_rest_api.main.id
+  parent_id   = aws_api_gateway_resource.upload_file.id
+  path_part   = "{action}"
+}
+
 resource "aws_api_gateway_resource" "files" {
   rest_api_id = aws_api_gateway_rest_api.main.id
   parent_id   = aws_api_gateway_rest_api.main.root_resource_id
@@ -248,6 +265,13 @@ module "cors_upload_init" {
   resource_id = aws_api_gateway_resource.upload_init.id
 }
 
+module "cors_upload_multipart" {
+  source = "./modules/cors"
+
+  api_id      = aws_api_gateway_rest_api.main.id
+  resource_id = aws_api_gateway_resource.upload_multipart.id
+}
+
 module "cors_metadata" {
   source = "./modules/cors"
 
@@ -326,14 +350,16 @@ module "lambda_upload_init" {
   layers        = [aws_lambda_layer_version.dependencies.arn]
 
   environment_variables = {
-    BUCKET_NAME          = var.bucket_name
-    TABLE_NAME           = var.table_name
-    ENVIRONMENT          = var.environment
-    MAX_FILE_SIZE        = var.max_file_size_bytes
-    CLOUDFRONT_SECRET    = var.cloudfront_secret
-    RECAPTCHA_SECRET_KEY = var.recaptcha_secret_key
-    IP_HASH_SALT_PARAM   = "/${var.project_name}/${var.environment}/ip-hash-salt"
-    AUTH_TABLE_NAME      = aws_dynamodb_table.auth.name
+    BUCKET_NAME             = var.bucket_name
+    TABLE_NAME              = var.table_name
+    ENVIRONMENT             = var.environment
+    MAX_FILE_SIZE           = var.max_file_size_bytes
+    DIRECT_UPLOAD_MAX_BYTES = var.direct_upload_max_bytes
+    TEXT_OFFLOAD_BYTES      = var.text_offload_bytes
+    CLOUDFRONT_SECRET       = var.cloudfront_secret
+    RECAPTCHA_SECRET_KEY    = var.recaptcha_secret_key
+    IP_HASH_SALT_PARAM      = "/${var.project_name}/${var.environment}/ip-hash-salt"
+    AUTH_TABLE_NAME         = aws_dynamodb_table.auth.name
   }
 
   iam_policy_statements = [
@@ -348,7 +374,9 @@ module "lambda_upload_init" {
     {
       effect = "Allow"
       actions = [
-        "dynamodb:PutItem"
+        "dynamodb:PutItem",
+        "dynamodb:UpdateItem",
+        "dynamodb:DeleteItem"
       ]
       resources = [var.table_arn]
     },
@@ -378,6 +406,48 @@ module "lambda_upload_init" {
   tags = var.tags
 }
 
+module "lambda_upload_multipart" {
+  source = "./modules/lambda"
+
+  function_name = "${var.project_name}-${var.environment}-upload-multipart"
+  handler       = "handler.handler"
+  runtime       = var.lambda_runtime
+  timeout       = var.lambda_timeout
+  memory_size   = var.lambda_memory_size
+  source_dir    = "${path.root}/../../../backend/lambdas/upload_multipart"
+  layers        = [aws_lambda_layer_version.dependencies.arn]
+
+  environment_variables = {
+    BUCKET_NAME       = var.bucket_name
+    TABLE_NAME        = var.table_name
+    ENVIRONMENT       = var.environment
+    CLOUDFRONT_SECRET = var.cloudfront_secret
+  }
+
+  iam_policy_statements = [
+    {
+      effect = "Allow"
+      actions = [
+        "s3:PutObject",
+        "s3:ListMultipartUploadParts",
+        "s3:AbortMultipartUpload"
+      ]
+      resources = ["${var.bucket_arn}/*"]
+    },
+    {
+      effect = "Allow"
+      actions = [
+        "dynamodb:GetItem",
+        "dynamodb:UpdateItem",
+        "dynamodb:DeleteItem"
+      ]
+      resources = [var.table_arn]
+    }
+  ]
+
+  tags = var.tags
+}
+
 module "lambda_get_metadata" {
   source = "./modules/lambda"
 
@@ -426,6 +496,9 @@ module "lambda_download" {
     CLOUDFRONT_SECRET    = var.cloudfront_secret
     RECAPTCHA_SECRET_KEY = var.recaptcha_secret_key
     AUTH_TABLE_NAME      = aws_dynamodb_table.auth.name
+    STATS_SHARDS         = var.stats_shards
+    DEFERRED_QUEUE_URL   = aws_sqs_queue.deferred.url
+    VAULT_COUNT_DEFERRED = tostring(var.vault_count_deferred)
   }
 
   iam_policy_statements = [
@@ -450,6 +523,13 @@ module "lambda_download" {
         "dynamodb:GetItem"
       ]
       resources = [aws_dynamodb_table.auth.arn]
+    },
+    {
+      effect = "Allow"
+      actions = [
+        "sqs:SendMessage"
+      ]
+      resources = [aws_sqs_queue.deferred.arn]
     }
   ]
 
@@ -468,9 +548,11 @@ module "lambda_confirm_download" {
   layers        = [aws_lambda_layer_version.dependencies.arn]
 
   environment_variables = {
-    TABLE_NAME        = var.table_name
-    ENVIRONMENT       = var.environment
-    CLOUDFRONT_SECRET = var.cloudfront_secret
+    TABLE_NAME         = var.table_name
+    ENVIRONMENT        = var.environment
+    CLOUDFRONT_SECRET  = var.cloudfront_secret
+    STATS_SHARDS       = var.stats_shards
+    DEFERRED_QUEUE_URL = aws_sqs_queue.deferred.url
   }
 
   iam_policy_statements = [
@@ -478,9 +560,17 @@ module "lambda_confirm_download" {
       effect = "Allow"
       actions = [
         "dynamodb:UpdateItem",
-        "dynamodb:GetItem"
+        "dynamodb:GetItem",
+        "dynamodb:BatchWriteItem"
       ]
       resources = [var.table_arn]
+    },
+    {
+      effect = "Allow"
+      actions = [
+        "sqs:SendMessage"
+      ]
+      resources = [aws_sqs_queue.deferred.arn]
     }
   ]
 
@@ -498,6 +588,57 @@ module "lambda_cleanup" {
   source_dir    = "${path.root}/../../../backend/lambdas/cleanup"
   layers        = [aws_lambda_layer_version.dependencies.arn]
 
+  environment_variables = {
+    BUCKET_NAME       = var.bucket_name
+    TABLE_NAME        = var.table_name
+    ENVIRONMENT       = var.environment
+    EXPIRY_INDEX_NAME = var.expiry_index_name
+  }
+
+  iam_policy_statements = [
+    {
+      effect = "Allow"
+      actions = [
+        "s3:DeleteObject",
+        "s3:AbortMultipartUpload"
+      ]
+      resources = ["${var.bucket_arn}/*"]
+    },
+    {
+      effect = "Allow"
+      actions = [
+        "dynamodb:Scan",
+        "dynamodb:DeleteItem",
+        "dynamodb:BatchWriteItem",
+        "dynamodb:DescribeTable",
+        "dynamodb:GetItem",
+        "dynamodb:PutItem"
+      ]
+      resources = [var.table_arn]
+    },
+    {
+      effect = "Allow"
+      actions = [
+        "dynamodb:Query"
+      ]
+      resources = ["${var.table_arn}/index/*"]
+    }
+  ]
+
+  tags = var.tags
+}
+
+module "lambda_stream_cleanup" {
+  source = "./modules/lambda"
+
+  function_name = "${var.project_name}-${var.environment}-stream-cleanup"
+  handler       = "handler.handler"
+  runtime       = var.lambda_runtime
+  timeout       = 60
+  memory_size   = var.lambda_memory_size
+  source_dir    = "${path.root}/../../../backend/lambdas/stream_cleanup"
+  layers        = [aws_lambda_layer_version.dependencies.arn]
+
   environment_variables = {
     BUCKET_NAME = var.bucket_name
     TABLE_NAME  = var.table_name
@@ -515,8 +656,17 @@ module "lambda_cleanup" {
     {
       effect = "Allow"
       actions = [
-        "dynamodb:Scan",
-        "dynamodb:DeleteItem"
+        "dynamodb:DescribeStream",
+        "dynamodb:GetRecords",
+        "dynamodb:GetShardIterator",
+        "dynamodb:ListStreams"
+      ]
+      resources = [var.table_stream_arn]
+    },
+    {
+      effect = "Allow"
+      actions = [
+        "dynamodb:UpdateItem"
       ]
       resources = [var.table_arn]
     }
@@ -525,6 +675,124 @@ module "lambda_cleanup" {
   tags = var.tags
 }
 
+# DynamoDB Streams trigger for stream-cleanup.
+# Only TTL removals, downloaded flips and PIN share removals (live PIN ID count)
+# reach the function; failed records are retried from the first failed
+# sequence number (ReportBatchItemFailures).
+resource "aws_lambda_event_source_mapping" "stream_cleanup" {
+  event_source_arn                   = var.table_stream_arn
+  function_name                      = module.lambda_stream_cleanup.arn
+  starting_position                  = "LATEST"
+  batch_size                         = 100
+  maximum_batching_window_in_seconds = 5
+  maximum_retry_attempts             = 10
+  bisect_batch_on_function_error     = true
+  function_response_types            = ["ReportBatchItemFailures"]
+
+  filter_criteria {
+    filter {
+      pattern = jsonencode({
+        eventName    = ["REMOVE"]
+        userIdentity = { type = ["Service"], principalId = ["dynamodb.amazonaws.com"] }
+      })
+    }
+    filter {
+      pattern = jsonencode({
+        eventName = ["MODIFY"]
+        dynamodb  = { NewImage = { downloaded = { BOOL = [true] } } }
+      })
+    }
+    filter {
+      pattern = jsonencode({
+        eventName = ["REMOVE"]
+        dynamodb  = { OldImage = { access_mode = { S = ["pin"] } } }
+      })
+    }
+  }
+}
+
+# Deferred side effects (statistics, eager cleanup, abuse auto-delete).
+# Handlers enqueue with shared.deferred.defer; the worker drains batches and
+# reports failed messages (ReportBatchItemFailures), which move to the DLQ
+# after maxReceiveCount attempts.
+resource "aws_sqs_queue" "deferred_dlq" {
+  name                      = "${var.project_name}-${var.environment}-deferred-dlq"
+  message_retention_seconds = 1209600 # 14 days
+
+  tags = var.tags
+}
+
+resource "aws_sqs_queue" "deferred" {
+  name                       = "${var.project_name}-${var.environment}-deferred"
+  visibility_timeout_seconds = 360 # 6x the worker timeout
+  message_retention_seconds  = 86400
+
+  redrive_policy = jsonencode({
+    deadLetterTargetArn = aws_sqs_queue.deferred_dlq.arn
+    maxReceiveCount     = 5
+  })
+
+  tags = var.tags
+}
+
+module "lambda_deferred_worker" {
+  source = "./modules/lambda"
+
+  function_name = "${var.project_name}-${var.environment}-deferred-worker"
+  handler       = "handler.handler"
+  runtime       = var.lambda_runtime
+  timeout       = 60
+  memory_size   = var.lambda_memory_size
+  source_dir    = "${path.root}/../../../backend/lambdas/deferred_worker"
+  layers        = [aws_lambda_layer_version.dependencies.arn]
+
+  environment_variables = {
+    ENVIRONMENT        = var.environment
+    STATS_SHARDS       = var.stats_shards
+    DEFERRED_QUEUE_URL = aws_sqs_queue.deferred.url
+  }
+
+  iam_policy_statements = [
+    {
+      # SendMessage re-enqueues vault downloads whose global count failed
+      effect = "Allow"
+      actions = [
+        "sqs:ReceiveMessage",
+        "sqs:DeleteMessage",
+        "sqs:GetQueueAttributes",
+        "sqs:SendMessage"
+      ]
+      resources = [aws_sqs_queue.deferred.arn]
+    },
+    {
+      effect = "Allow"
+      actions = [
+        "s3:DeleteObject"
+      ]
+      resources = ["${var.bucket_arn}/*"]
+    },
+    {
+      effect = "Allow"
+      actions = [
+        "dynamodb:UpdateItem",
+        "dynamodb:GetItem",
+        "dynamodb:BatchWriteItem"
+      ]
+      resources = [var.table_arn]
+    }
+  ]
+
+  tags = var.tags
+}
+
+resource "aws_lambda_event_source_mapping" "deferred_worker" {
+  event_source_arn                   = aws_sqs_queue.deferred.arn
+  function_name                      = module.lambda_deferred_worker.arn
+  batch_size                         = 100
+  maximum_batching_window_in_seconds = 10
+  function_response_types            = ["ReportBatchItemFailures"]
+}
+
 module "lambda_report_abuse" {
   source = "./modules/lambda"
 
@@ -537,10 +805,14 @@ module "lambda_report_abuse" {
   layers        = [aws_lambda_layer_version.dependencies.arn]
 
   environment_variables = {
+    BUCKET_NAME          = var.bucket_name
     TABLE_NAME           = var.table_name
     ENVIRONMENT          = var.environment
     CLOUDFRONT_SECRET    = var.cloudfront_secret
     RECAPTCHA_SECRET_KEY = var.recaptcha_secret_key
+    DEFERRED_QUEUE_URL   = aws_sqs_queue.deferred.url
+    IP_HASH_SALT_PARAM   = "/${var.project_name}/${var.environment}/ip-hash-salt"
+    ABUSE_AUTO_DELETE    = tostring(var.abuse_auto_delete)
   }
 
   iam_policy_statements = [
@@ -548,9 +820,32 @@ module "lambda_report_abuse" {
       effect = "Allow"
       actions = [
         "dynamodb:UpdateItem",
-        "dynamodb:GetItem"
+        "dynamodb:GetItem",
+        "dynamodb:BatchWriteItem"
       ]
       resources = [var.table_arn]
+    },
+    {
+      # Inline fallback of the deferred abuse auto-delete
+      effect = "Allow"
+      actions = [
+        "s3:DeleteObject"
+      ]
+      resources = ["${var.bucket_arn}/*"]
+    },
+    {
+      effect = "Allow"
+      actions = [
+        "sqs:SendMessage"
+      ]
+      resources = [aws_sqs_queue.deferred.arn]
+    },
+    {
+      effect = "Allow"
+      actions = [
+        "ssm:GetParameter"
+      ]
+      resources = ["arn:aws:ssm:${data.aws_region.current.name}:${data.aws_caller_identity.current.account_id}:parameter/${var.project_name}/${var.environment}/ip-hash-salt"]
     }
   ]
 
@@ -572,13 +867,15 @@ module "lambda_get_stats" {
     TABLE_NAME        = var.table_name
     ENVIRONMENT       = var.environment
     CLOUDFRONT_SECRET = var.cloudfront_secret
+    STATS_SHARDS      = var.stats_shards
   }
 
   iam_policy_statements = [
     {
       effect = "Allow"
       actions = [
-        "dynamodb:GetItem"
+        "dynamodb:GetItem",
+        "dynamodb:BatchGetItem"
       ]
       resources = [var.table_arn]
     }
@@ -603,10 +900,12 @@ module "lambda_pin_upload_init" {
     TABLE_NAME           = var.table_name
     ENVIRONMENT          = var.environment
     MAX_FILE_SIZE        = var.max_file_size_bytes
+    TEXT_OFFLOAD_BYTES   = var.text_offload_bytes
     CLOUDFRONT_SECRET    = var.cloudfront_secret
     RECAPTCHA_SECRET_KEY = var.recaptcha_secret_key
     IP_HASH_SALT_PARAM   = "/${var.project_name}/${var.environment}/ip-hash-salt"
     AUTH_TABLE_NAME      = aws_dynamodb_table.auth.name
+    PIN_HASH_SCHEME      = var.pin_hash_scheme
   }
 
   iam_policy_statements = [
@@ -617,7 +916,7 @@ module "lambda_pin_upload_init" {
     },
     {
       effect    = "Allow"
-      actions   = ["dynamodb:PutItem", "dynamodb:GetItem"]
+      actions   = ["dynamodb:PutItem", "dynamodb:GetItem", "dynamodb:UpdateItem", "dynamodb:DeleteItem"]
       resources = [var.table_arn]
     },
     {
@@ -697,6 +996,8 @@ module "lambda_pin_verify" {
     CLOUDFRONT_SECRET    = var.cloudfront_secret
     RECAPTCHA_SECRET_KEY = var.recaptcha_secret_key
     AUTH_TABLE_NAME      = aws_dynamodb_table.auth.name
+    STATS_SHARDS         = var.stats_shards
+    DEFERRED_QUEUE_URL   = aws_sqs_queue.deferred.url
   }
 
   iam_policy_statements = [
@@ -714,6 +1015,13 @@ module "lambda_pin_verify" {
       effect    = "Allow"
       actions   = ["dynamodb:GetItem"]
       resources = [aws_dynamodb_table.auth.arn]
+    },
+    {
+      effect = "Allow"
+      actions = [
+        "sqs:SendMessage"
+      ]
+      resources = [aws_sqs_queue.deferred.arn]
     }
   ]
 
@@ -822,6 +1130,23 @@ resource "aws_api_gateway_integration" "upload_init" {
   uri                     = module.lambda_upload_init.invoke_arn
 }
 
+# POST /upload/{file_id}/{action}
+resource "aws_api_gateway_method" "upload_multipart_post" {
+  rest_api_id   = aws_api_gateway_rest_api.main.id
+  resource_id   = aws_api_gateway_resource.upload_multipart.id
+  http_method   = "POST"
+  authorization = "NONE"
+}
+
+resource "aws_api_gateway_integration" "upload_multipart" {
+  rest_api_id             = aws_api_gateway_rest_api.main.id
+  resource_id             = aws_api_gateway_resource.upload_multipart.id
+  http_method             = aws_api_gateway_method.upload_multipart_post.http_method
+  integration_http_method = "POST"
+  type                    = "AWS_PROXY"
+  uri                     = module.lambda_upload_multipart.invoke_arn
+}
+
 # GET /files/{file_id}/metadata
 resource "aws_api_gateway_method" "metadata_get" {
   rest_api_id   = aws_api_gateway_rest_api.main.id
@@ -1003,6 +1328,14 @@ resource "aws_lambda_permission" "upload_init" {
   source_arn    = "${aws_api_gateway_rest_api.main.execution_arn}/*/*"
 }
 
+resource "aws_lambda_permission" "upload_multipart" {
+  statement_id  = "AllowAPIGatewayInvoke"
+  action        = "lambda:InvokeFunction"
+  function_name = module.lambda_upload_multipart.function_name
+  principal     = "apigateway.amazonaws.com"
+  source_arn    = "${aws_api_gateway_rest_api.main.execution_arn}/*/*"
+}
+
 resource "aws_lambda_permission" "metadata" {
   statement_id  = "AllowAPIGatewayInvoke"
   action        = "lambda:InvokeFunction"
@@ -1092,6 +1425,9 @@ resource "aws_api_gateway_deployment" "main" {
       aws_api_gateway_resource.upload_init.id,
       aws_api_gateway_method.upload_init_post.id,
       aws_api_gateway_integration.upload_init.id,
+      aws_api_gateway_resource.upload_multipart.id,
+      aws_api_gateway_method.upload_multipart_post.id,
+      aws_api_gateway_integration.upload_multipart.id,
       aws_api_gateway_method.metadata_get.id,
       aws_api_gateway_integration.metadata.id,
       aws_api_gateway_method.download_post.id,
@@ -1123,6 +1459,7 @@ resource "aws_api_gateway_deployment" "main" {
 
   depends_on = [
     aws_api_gateway_integration.upload_init,
+    aws_api_gateway_integration.upload_multipart,
     aws_api_gateway_integration.metadata,
     aws_api_gateway_integration.download,
     aws_api_gateway_integration.confirm,
@@ -1205,3 +1542,28 @@ resource "aws_lambda_permission" "cleanup_eventbridge" {
   principal     = "events.amazonaws.com"
   source_arn    = aws_cloudwatch_event_rule.cleanup.arn
 }
+
+# Daily full-table sweep: catches records without an expiry_bucket
+# (written before the expiry index existed) and any stragglers
+resource "aws_cloudwatch_event_rule" "cleanup_sweep" {
+  name                = "${var.project_name}-${var.environment}-cleanup-sweep"
+  description         = "Trigger full-scan cleanup sweep once a day"
+  schedule_expression = "rate(1 day)"
+
+  tags = var.tags
+}
+
+resource "aws_cloudwatch_event_target" "cleanup_sweep" {
+  rule      = aws_cloudwatch_event_rule.cleanup_sweep.name
+  target_id = "cleanup-sweep-lambda"
+  arn       = module.lambda_cleanup.arn
+  input     = jsonencode({ mode = "scan" })
+}
+
+resource "aws_lambda_permission" "cleanup_sweep_eventbridge" {
+  statement_id  = "AllowEventBridgeInvokeSweep"
+  action        = "lambda:InvokeFunction"
+  function_name = module.lambda_cleanup.function_name
+  principal     = "events.amazonaws.com"
+  source_arn    = aws_cloudwatch_event_rule.cleanup_sweep.arn
+}
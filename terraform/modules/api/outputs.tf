@@ -17,9 +17,12 @@ output "lambda_function_names" {
   description = "List of Lambda function names"
   value = [
     module.lambda_upload_init.function_name,
+    module.lambda_upload_multipart.function_name,
     module.lambda_get_metadata.function_name,
     module.lambda_download.function_name,
     module.lambda_cleanup.function_name,
+    module.lambda_stream_cleanup.function_name,
+    module.lambda_deferred_worker.function_name,
     module.lambda_report_abuse.function_name,
   ]
 }
@@ -27,10 +30,13 @@ output "lambda_function_names" {
 output "lambda_function_arns" {
   description = "Map of Lambda function ARNs"
   value = {
-    upload_init  = module.lambda_upload_init.arn
-    get_metadata = module.lambda_get_metadata.arn
-    download     = module.lambda_download.arn
-    cleanup      = module.lambda_cleanup.arn
-    report_abuse = module.lambda_report_abuse.arn
+    upload_init      = module.lambda_upload_init.arn
+    upload_multipart = module.lambda_upload_multipart.arn
+    get_metadata     = module.lambda_get_metadata.arn
+    download         = module.lambda_download.arn
+    cleanup          = module.lambda_cleanup.arn
+    stream_cleanup   = module.lambda_stream_cleanup.arn
+    deferred_worker  = module.lambda_deferred_worker.arn
+    report_abuse     = module.lambda_report_abuse.arn
   }
 }
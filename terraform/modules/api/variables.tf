@@ -34,12 +34,64 @@ variable "table_arn" {
   type        = string
 }
 
+variable "table_stream_arn" {
+  description = "DynamoDB table stream ARN consumed by stream-cleanup"
+  type        = string
+}
+
+variable "expiry_index_name" {
+  description = "DynamoDB expiry GSI name used by cleanup (empty disables index queries)"
+  type        = string
+  default     = ""
+}
+
 variable "max_file_size_bytes" {
   description = "Maximum file size in bytes"
   type        = number
   default     = 104857600 # 100 MB
 }
 
+variable "pin_hash_scheme" {
+  description = "KDF and cost for new PIN hashes (see backend/benchmarks/pin_kdf.py)"
+  type        = string
+  default     = "pbkdf2-sha256$100000"
+}
+
+variable "stats_shards" {
+  description = "Write shards of the global download counter (raise only; at most 99)"
+  type        = number
+  default     = 10
+
+  validation {
+    condition     = var.stats_shards >= 1 && var.stats_shards <= 99
+    error_message = "stats_shards must be between 1 and 99 (one BatchGetItem reads all shards)."
+  }
+}
+
+variable "direct_upload_max_bytes" {
+  description = "Largest file ciphertext upload_init accepts inline instead of a presigned PUT (0 = disabled)"
+  type        = number
+  default     = 262144
+}
+
+variable "text_offload_bytes" {
+  description = "Store text secrets larger than this in S3 instead of DynamoDB (0 = disabled; enable only once clients follow download_url for text)"
+  type        = number
+  default     = 0
+}
+
+variable "abuse_auto_delete" {
+  description = "Delete shares reported by the abuse threshold of distinct reporters (otherwise only flagged)"
+  type        = bool
+  default     = false
+}
+
+variable "vault_count_deferred" {
+  description = "Count repeat vault downloads through the deferred queue instead of updating the record"
+  type        = bool
+  default     = false
+}
+
 variable "cloudfront_secret" {
   description = "Secret for CloudFront origin verification"
   type        = string
@@ -208,8 +208,8 @@ resource "aws_cloudfront_distribution" "main" {
     viewer_protocol_policy     = "redirect-to-https"
     response_headers_policy_id = aws_cloudfront_response_headers_policy.security_headers.id
     min_ttl                    = 0
-    default_ttl                = 0 # Don't cache API responses
-    max_ttl                    = 0
+    default_ttl                = 0  # Don't cache API responses by default
+    max_ttl                    = 60 # 404/410 for missing/consumed IDs opt in via Cache-Control
     compress                   = true
   }
 
@@ -232,8 +232,8 @@ resource "aws_cloudfront_distribution" "main" {
     viewer_protocol_policy     = "redirect-to-https"
     response_headers_policy_id = aws_cloudfront_response_headers_policy.security_headers.id
     min_ttl                    = 0
-    default_ttl                = 0 # Don't cache API responses
-    max_ttl                    = 0
+    default_ttl                = 0  # Don't cache API responses by default
+    max_ttl                    = 60 # 404/410 for missing/consumed IDs opt in via Cache-Control
     compress                   = true
   }
 
@@ -112,11 +112,35 @@ resource "aws_dynamodb_table" "files" {
   billing_mode = "PAY_PER_REQUEST" # On-demand pricing
   hash_key     = "file_id"
 
+  # Stream feeds the stream-cleanup Lambda (S3 deletes on TTL expiry / download)
+  stream_enabled   = true
+  stream_view_type = "NEW_AND_OLD_IMAGES"
+
   attribute {
     name = "file_id"
     type = "S"
   }
 
+  attribute {
+    name = "expiry_bucket"
+    type = "S"
+  }
+
+  attribute {
+    name = "expires_at"
+    type = "N"
+  }
+
+  # Write-sharded expiry index: hourly bucket + shard suffix ("<epoch_hour>#<shard>")
+  # Cleanup queries only the buckets that are due instead of scanning the table
+  global_secondary_index {
+    name               = "expiry-index"
+    hash_key           = "expiry_bucket"
+    range_key          = "expires_at"
+    projection_type    = "INCLUDE"
+    non_key_attributes = ["content_type", "s3_key", "downloaded", "payload_split", "upload_id"]
+  }
+
   # Enable TTL for automatic expiration
   ttl {
     attribute_name = "expires_at"
@@ -42,3 +42,13 @@ output "table_arn" {
   description = "ARN of the DynamoDB table"
   value       = aws_dynamodb_table.files.arn
 }
+
+output "table_stream_arn" {
+  description = "ARN of the DynamoDB table stream"
+  value       = aws_dynamodb_table.files.stream_arn
+}
+
+output "expiry_index_name" {
+  description = "Name of the DynamoDB expiry GSI used by cleanup"
+  value       = "expiry-index"
+}